@@ -0,0 +1,61 @@
+from django.contrib import admin
+
+from .models import ViewStats
+
+
+@admin.register(ViewStats)
+class ViewStatsAdmin(admin.ModelAdmin):
+    """Самые нагруженные view - сверху: по суммарному времени за день."""
+    list_display = (
+        'view',
+        'date',
+        'requests',
+        'errors',
+        'total_s',
+        'average_ms',
+        'max_ms',
+        'average_queries',
+        'average_db_ms',
+        'cache_hit_rate',
+        'average_template_ms',
+        'thumbnail_ms',
+    )
+    list_filter = ('date',)
+    search_fields = ('view',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def _average(self, obj, field):
+        if not obj.requests:
+            return 0
+        return round(getattr(obj, field) / obj.requests, 1)
+
+    def total_s(self, obj):
+        return round(obj.total_ms / 1000, 1)
+    total_s.short_description = 'Время, с'
+    total_s.admin_order_field = 'total_ms'
+
+    def average_ms(self, obj):
+        return self._average(obj, 'total_ms')
+    average_ms.short_description = 'Среднее время, мс'
+
+    def average_queries(self, obj):
+        return self._average(obj, 'db_queries')
+    average_queries.short_description = 'Запросов к БД на запрос'
+
+    def average_db_ms(self, obj):
+        return self._average(obj, 'db_ms')
+    average_db_ms.short_description = 'Время БД на запрос, мс'
+
+    def average_template_ms(self, obj):
+        return self._average(obj, 'template_ms')
+    average_template_ms.short_description = 'Время шаблонов на запрос, мс'
+
+    def cache_hit_rate(self, obj):
+        total = obj.cache_hits + obj.cache_misses
+        return f'{obj.cache_hits / total:.0%}' if total else '-'
+    cache_hit_rate.short_description = 'Попадания в кэш'
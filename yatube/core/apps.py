@@ -1,5 +1,14 @@
 from django.apps import AppConfig
+from django.core.signals import request_finished
+from django.db.backends.signals import connection_created
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from . import metrics, sqlite
+        metrics.install()
+        connection_created.connect(sqlite.apply_pragmas)
+        connection_created.connect(metrics.instrument_connection)
+        request_finished.connect(metrics.flush_if_due)
@@ -0,0 +1,165 @@
+"""
+ASGI-приложение поверх WSGI-приложения Django.
+
+Django 2.2 не умеет асинхронные view, поэтому запрос целиком
+(view, чтение потокового ответа и его закрытие) выполняется в одном
+потоке из пула ASGI_THREADS потоков: соединения с БД привязаны
+к потоку. Цикл событий только принимает тело запроса и отдает части
+ответа, так что медленные клиенты не занимают потоки, а медленная БД
+занимает не больше ASGI_THREADS потоков - остальные запросы ждут
+в очереди пула.
+"""
+import asyncio
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+
+
+class AsgiUnsupported(Exception):
+    pass
+
+
+def _latin1(value):
+    # WSGI передает строки запроса как байты в latin-1 (PEP 3333)
+    return value.encode().decode('latin-1')
+
+
+def get_environ(scope, body):
+    """WSGI environ для HTTP-запроса ASGI."""
+    server_name, server_port = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': _latin1(scope.get('root_path', '')),
+        'PATH_INFO': _latin1(scope['path']),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server_name,
+        'SERVER_PORT': str(server_port),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    client = scope.get('client')
+    if client:
+        environ['REMOTE_ADDR'], environ['REMOTE_PORT'] = client[0], str(
+            client[1],
+        )
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = f'HTTP_{name}'
+        if name in environ:
+            separator = '; ' if name == 'HTTP_COOKIE' else ','
+            value = f'{environ[name]}{separator}{value}'
+        environ[name] = value
+    return environ
+
+
+class AsgiHandler:
+    """ASGI-приложение, выполняющее wsgi_application в пуле потоков."""
+
+    def __init__(self, wsgi_application, max_workers=None):
+        self.wsgi_application = wsgi_application
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers or settings.ASGI_THREADS,
+            thread_name_prefix='asgi',
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] != 'http':
+            raise AsgiUnsupported(f"Неподдерживаемый тип: {scope['type']}")
+        body = await self.read_body(receive)
+        if body is None:
+            return
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(
+                self.executor,
+                self.run_wsgi,
+                get_environ(scope, body),
+                send,
+                loop,
+            )
+        finally:
+            body.close()
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def read_body(self, receive):
+        """Тело запроса; None, если клиент отключился."""
+        body = SpooledTemporaryFile(
+            max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE,
+        )
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                body.close()
+                return None
+            body.write(message.get('body', b''))
+            if not message.get('more_body'):
+                break
+        body.seek(0)
+        return body
+
+    def run_wsgi(self, environ, send, loop):
+        """Выполняет запрос и отдает ответ; вызывается в потоке пула."""
+        def send_message(message):
+            # поток ждет отправки: медленный клиент тормозит только
+            # свой запрос, а ответ не копится в памяти
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started['status'] = int(status.split(' ', 1)[0])
+            started['headers'] = [
+                (name.lower().encode('latin-1'), value.encode('latin-1'))
+                for name, value in headers
+            ]
+
+        def send_start():
+            send_message({'type': 'http.response.start', **started})
+
+        result = self.wsgi_application(environ, start_response)
+        try:
+            chunks = iter(result)
+            for chunk in chunks:
+                if chunk:
+                    # заголовки уходят с первой непустой частью
+                    send_start()
+                    send_message({
+                        'type': 'http.response.body',
+                        'body': chunk,
+                        'more_body': True,
+                    })
+                    break
+            else:
+                send_start()
+            for chunk in chunks:
+                if chunk:
+                    send_message({
+                        'type': 'http.response.body',
+                        'body': chunk,
+                        'more_body': True,
+                    })
+            send_message({'type': 'http.response.body', 'body': b''})
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
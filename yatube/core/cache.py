@@ -0,0 +1,270 @@
+"""
+Кэширование ответов view с инвалидацией по тегам.
+
+Каждый тег (например, 'posts' или 'group:cats') имеет в кэше номер
+версии. Закэшированный ответ хранит версии своих тегов на момент
+отрисовки и отдается, только пока они не изменились. Изменение данных
+увеличивает версии затронутых тегов (invalidate), поэтому устаревшие
+ответы не отдаются, даже если их срок жизни не истек.
+
+Те же версии служат валидатором ETag: браузер, приславший
+If-None-Match с текущим ETag, получает 304 без тела ответа.
+
+cache_stream кэширует потоковые ответы, одинаковые для всех
+пользователей: ответ отдается по частям и одновременно собирается
+в кэш.
+"""
+import hashlib
+from http import HTTPStatus
+import time
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers,
+)
+
+from . import metrics
+from .replicas import is_replica_read
+
+TAG_VERSION_KEY = 'cache_tag:{}'
+# v2: в записи кэша хранится и ETag ответа
+VIEW_KEY = 'view:v2:{name}:{variant}:{path}'
+REQUEST_TAGS_ATTR = '_cache_tags'
+
+
+def _new_version():
+    # после вытеснения ключа версии из кэша номер не должен повториться,
+    # поэтому начальная версия берется от текущего времени
+    return int(time.time() * 1000)
+
+
+def get_versions(tags):
+    """Текущие версии тегов; отсутствующие версии создаются."""
+    keys = {tag: TAG_VERSION_KEY.format(tag) for tag in tags}
+    stored = cache.get_many(keys.values())
+    versions = {}
+    for tag, key in keys.items():
+        if key not in stored:
+            cache.add(key, _new_version(), None)
+            stored[key] = cache.get(key)
+        versions[tag] = stored[key]
+    return versions
+
+
+def invalidate(*tags):
+    """Делает устаревшими все ответы, помеченные любым из тегов."""
+    for tag in set(tags):
+        key = TAG_VERSION_KEY.format(tag)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _new_version(), None)
+
+
+def invalidate_on_commit(*tags):
+    """
+    Как invalidate, но версии тегов увеличиваются еще раз после фиксации
+    текущей транзакции: ответ, закэшированный параллельным запросом
+    до фиксации, содержит старые данные под уже новыми версиями.
+    """
+    invalidate(*tags)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: invalidate(*tags))
+
+
+def add_cache_tags(request, *tags):
+    """Добавляет теги к ответу, кэшируемому декоратором cache_view."""
+    getattr(request, REQUEST_TAGS_ATTR, []).extend(tags)
+
+
+def _request_variant(request, cache_authenticated):
+    if not request.user.is_authenticated:
+        return 'anon'
+    if cache_authenticated:
+        return f'user:{request.user.pk}'
+    return None
+
+
+def _is_cacheable(request, response):
+    """Ответы с cookie и CSRF-токеном нельзя отдавать другим запросам."""
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        and not request.META.get('CSRF_COOKIE_USED')
+    )
+
+
+def get_etag(variant, versions, content=b''):
+    """
+    ETag ответа: меняется вместе с версиями любого из тегов и с самим
+    ответом (content), если тот меняется и без смены версий.
+    """
+    if is_replica_read():
+        # ответ по данным отстающей реплики не должен совпасть с ответом
+        # по тем же версиям тегов, отрисованным позже
+        return f'"{uuid.uuid4().hex}"'
+    state = f'{variant}:{sorted(versions.items())}'.encode()
+    return f'"{hashlib.md5(state + content).hexdigest()}"'
+
+
+def _conditional_response(request, response, variant, etag):
+    """
+    Добавляет ETag и отвечает 304, если он совпал с If-None-Match.
+    Ответ зависит от пользователя и устаревает при любом изменении
+    данных, поэтому кэши должны проверять его при каждом запросе.
+    """
+    response['ETag'] = etag
+    patch_vary_headers(response, ('Cookie',))
+    patch_cache_control(response, no_cache=True, private=variant != 'anon')
+    return get_conditional_response(
+        request, etag=response['ETag'], response=response,
+    )
+
+
+def cache_view(*tags, cache_authenticated=True, timeout=None):
+    """
+    Кэширует GET-ответы view с учетом аргументов, строки запроса и
+    пользователя. Теги могут быть шаблонами от аргументов view:
+    @cache_view('group:{slug}'). timeout ограничивает срок жизни ответа
+    с данными, которые меняются без смены версий тегов.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            variant = _request_variant(request, cache_authenticated)
+            if request.method not in ('GET', 'HEAD') or variant is None:
+                return view(request, *args, **kwargs)
+
+            path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+            key = VIEW_KEY.format(
+                name=view.__name__, variant=variant, path=path,
+            )
+            entry = cache.get(key)
+            if entry is not None:
+                versions, content, content_type, etag = entry
+                if get_versions(versions) == versions:
+                    metrics.add('cache_hits')
+                    return _conditional_response(
+                        request,
+                        HttpResponse(content, content_type=content_type),
+                        variant,
+                        etag,
+                    )
+            metrics.add('cache_misses')
+
+            view_tags = [tag.format(*args, **kwargs) for tag in tags]
+            versions = get_versions(view_tags)
+            setattr(request, REQUEST_TAGS_ATTR, [])
+            response = view(request, *args, **kwargs)
+            extra_tags = getattr(request, REQUEST_TAGS_ATTR)
+            if extra_tags:
+                versions.update(get_versions(extra_tags))
+
+            if _is_cacheable(request, response):
+                # ответ с ограниченным timeout меняется и без смены
+                # версий тегов: его ETag зависит от содержимого
+                etag = get_etag(
+                    variant,
+                    versions,
+                    response.content if timeout else b'',
+                )
+                entry = (
+                    versions,
+                    response.content,
+                    response['Content-Type'],
+                    etag,
+                )
+                cache.set(key, entry, _cache_timeout(timeout))
+                return _conditional_response(request, response, variant, etag)
+            return response
+        return wrapper
+    return decorator
+
+
+def _cache_timeout(timeout=None):
+    timeout = min(timeout or settings.VIEW_CACHE_TIMEOUT,
+                  settings.VIEW_CACHE_TIMEOUT)
+    if is_replica_read():
+        # реплика могла еще не получить изменения,
+        # из-за которых сменились версии тегов
+        timeout = min(timeout, settings.DATABASE_REPLICA_LAG)
+    return timeout
+
+
+def _cache_when_consumed(chunks, key, versions, content_type, etag,
+                         timeout):
+    """Отдает части ответа и кэширует его, когда отданы все части."""
+    content = []
+    for chunk in chunks:
+        content.append(chunk)
+        yield chunk
+    cache.set(
+        key, (versions, b''.join(content), content_type, etag), timeout,
+    )
+
+
+def cache_stream(*tags):
+    """
+    Кэширует потоковые GET-ответы view, которые не зависят
+    от пользователя. Теги - как у cache_view, add_cache_tags
+    не поддерживается.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+
+            # адрес с хостом: потоковые ответы (ленты) содержат
+            # абсолютные ссылки
+            path = hashlib.md5(
+                request.build_absolute_uri().encode(),
+            ).hexdigest()
+            key = VIEW_KEY.format(
+                name=view.__name__, variant='stream', path=path,
+            )
+            versions = get_versions([
+                tag.format(*args, **kwargs) for tag in tags
+            ])
+            entry = cache.get(key)
+            if entry is not None and entry[0] == versions:
+                metrics.add('cache_hits')
+                _, content, content_type, etag = entry
+                return _conditional_response(
+                    request,
+                    HttpResponse(content, content_type=content_type),
+                    'anon',
+                    etag,
+                )
+            metrics.add('cache_misses')
+
+            etag = get_etag('anon', versions)
+            # совпавший ETag проверяется до view: ее запросы не нужны,
+            # а начатый потоковый ответ пришлось бы закрывать
+            not_modified = _conditional_response(
+                request, HttpResponse(), 'anon', etag,
+            )
+            if not_modified.status_code == HTTPStatus.NOT_MODIFIED:
+                return not_modified
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200 and response.streaming:
+                response.streaming_content = _cache_when_consumed(
+                    response.streaming_content,
+                    key,
+                    versions,
+                    response['Content-Type'],
+                    etag,
+                    _cache_timeout(),
+                )
+                return _conditional_response(request, response, 'anon', etag)
+            return response
+        return wrapper
+    return decorator
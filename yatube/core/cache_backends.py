@@ -0,0 +1,219 @@
+"""
+Двухуровневый кэш для запуска в несколько процессов.
+
+Первый уровень - небольшой LRU-кэш в памяти процесса, второй - общий
+для всех процессов кэш (файловый, memcached, redis), заданный отдельным
+алиасом в CACHES. Записи первого уровня живут не дольше LOCAL_TIMEOUT.
+Изменения и удаления ключей записываются в общий журнал инвалидации:
+раз в SYNC_INTERVAL секунд каждый процесс читает новые записи журнала
+и удаляет устаревшие ключи из своего первого уровня.
+"""
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+SEQUENCE_KEY = 'two_tier:sequence'
+JOURNAL_KEY = 'two_tier:journal:{}'
+CLEAR_ALL = '*'
+
+_missing = object()
+
+
+class TwoTierCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._shared_alias = options.get('SHARED_ALIAS', 'shared')
+        self._local_max_entries = options.get('LOCAL_MAX_ENTRIES', 1000)
+        self._local_timeout = options.get('LOCAL_TIMEOUT', 5)
+        self._sync_interval = options.get('SYNC_INTERVAL', 1)
+        self._journal_size = options.get('JOURNAL_SIZE', 1000)
+        self._journal_timeout = options.get('JOURNAL_TIMEOUT', 600)
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self._sequence = None
+        self._synced_at = 0
+
+    @property
+    def shared(self):
+        return caches[self._shared_alias]
+
+    def _local_key(self, key, version):
+        return self.shared.make_key(key, version=version)
+
+    # первый уровень
+
+    def _local_get(self, local_key):
+        with self._lock:
+            entry = self._local.get(local_key)
+            if entry is None:
+                return _missing
+            pickled, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._local[local_key]
+                return _missing
+            self._local.move_to_end(local_key)
+        return pickle.loads(pickled)
+
+    def _local_set(self, local_key, value, timeout=DEFAULT_TIMEOUT):
+        lifetime = self._local_timeout
+        if timeout is not DEFAULT_TIMEOUT and timeout is not None:
+            lifetime = min(lifetime, timeout)
+        if lifetime <= 0:
+            self._local_delete(local_key)
+            return
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._local[local_key] = (pickled, time.monotonic() + lifetime)
+            self._local.move_to_end(local_key)
+            while len(self._local) > self._local_max_entries:
+                self._local.popitem(last=False)
+
+    def _local_delete(self, *local_keys):
+        with self._lock:
+            for local_key in local_keys:
+                self._local.pop(local_key, None)
+
+    # журнал инвалидации
+
+    def _publish(self, *local_keys):
+        """Сообщает другим процессам об изменении ключей."""
+        shared = self.shared
+        shared.add(SEQUENCE_KEY, 0, None)
+        for local_key in local_keys:
+            sequence = shared.incr(SEQUENCE_KEY)
+            shared.set(
+                JOURNAL_KEY.format(sequence),
+                local_key,
+                self._journal_timeout,
+            )
+            if self._sequence == sequence - 1:
+                # собственные изменения уже учтены
+                self._sequence = sequence
+
+    def _sync(self):
+        """Удаляет из первого уровня ключи, измененные другими процессами."""
+        now = time.monotonic()
+        if now - self._synced_at < self._sync_interval:
+            return
+        self._synced_at = now
+        sequence = self.shared.get(SEQUENCE_KEY, 0)
+        if self._sequence is None or sequence < self._sequence:
+            self._sequence = sequence
+            self._local_clear()
+            return
+        if sequence == self._sequence:
+            return
+        if sequence - self._sequence > self._journal_size:
+            self._local_clear()
+        else:
+            journal = self.shared.get_many([
+                JOURNAL_KEY.format(number)
+                for number in range(self._sequence + 1, sequence + 1)
+            ])
+            complete = len(journal) == sequence - self._sequence
+            if not complete or CLEAR_ALL in journal.values():
+                self._local_clear()
+            else:
+                self._local_delete(*journal.values())
+        self._sequence = sequence
+
+    def _local_clear(self):
+        with self._lock:
+            self._local.clear()
+
+    # API кэша
+
+    def get(self, key, default=None, version=None):
+        self._sync()
+        local_key = self._local_key(key, version)
+        value = self._local_get(local_key)
+        if value is not _missing:
+            return value
+        value = self.shared.get(key, _missing, version=version)
+        if value is _missing:
+            return default
+        self._local_set(local_key, value)
+        return value
+
+    def get_many(self, keys, version=None):
+        self._sync()
+        found = {}
+        missed = []
+        for key in keys:
+            value = self._local_get(self._local_key(key, version))
+            if value is _missing:
+                missed.append(key)
+            else:
+                found[key] = value
+        if missed:
+            shared_found = self.shared.get_many(missed, version=version)
+            for key, value in shared_found.items():
+                self._local_set(self._local_key(key, version), value)
+            found.update(shared_found)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        local_key = self._local_key(key, version)
+        self.shared.set(key, value, timeout, version=version)
+        self._publish(local_key)
+        self._local_set(local_key, value, timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.shared.add(key, value, timeout, version=version)
+        if added:
+            local_key = self._local_key(key, version)
+            self._publish(local_key)
+            self._local_set(local_key, value, timeout)
+        return added
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.shared.set_many(data, timeout, version=version)
+        local_keys = [self._local_key(key, version) for key in data]
+        self._publish(*local_keys)
+        for key, value in data.items():
+            if key not in failed:
+                self._local_set(self._local_key(key, version), value, timeout)
+        return failed
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, timeout, version=version)
+
+    def delete(self, key, version=None):
+        local_key = self._local_key(key, version)
+        self.shared.delete(key, version=version)
+        self._local_delete(local_key)
+        self._publish(local_key)
+
+    def delete_many(self, keys, version=None):
+        local_keys = [self._local_key(key, version) for key in keys]
+        self.shared.delete_many(keys, version=version)
+        self._local_delete(*local_keys)
+        self._publish(*local_keys)
+
+    def has_key(self, key, version=None):
+        self._sync()
+        local_key = self._local_key(key, version)
+        if self._local_get(local_key) is not _missing:
+            return True
+        return self.shared.has_key(key, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        local_key = self._local_key(key, version)
+        value = self.shared.incr(key, delta, version=version)
+        self._publish(local_key)
+        self._local_set(local_key, value)
+        return value
+
+    def decr(self, key, delta=1, version=None):
+        return self.incr(key, -delta, version=version)
+
+    def clear(self):
+        self.shared.clear()
+        self._local_clear()
+        self._sequence = None
+        self._publish(CLEAR_ALL)
@@ -0,0 +1,122 @@
+"""
+Число объектов выборок для пагинации без полного COUNT(*).
+
+Выборка считается точно, только пока в ней не больше COUNT_EXACT_LIMIT
+объектов: COUNT(*) идет по подзапросу с LIMIT, поэтому его цена
+ограничена. Для больших выборок берется оценка: поддерживаемый
+счетчик, переданный вызывающим (например, число постов группы, или
+функция, которая его считает), или статистика таблицы из БД для
+выборок без фильтров. Результат кэшируется на COUNT_STALENESS секунд -
+столько число объектов может отставать от данных.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+COUNT_CACHE_KEY = 'count:{}'
+
+# (БД, таблица) -> (число строк по статистике, время запроса)
+_table_rows = {}
+
+
+def estimate_rows(model, using):
+    """
+    Число строк таблицы по статистике БД (без чтения таблицы)
+    или None, если статистики нет. Статистику обновляет analyze().
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    if connection.vendor == 'postgresql':
+        sql = 'SELECT reltuples FROM pg_class WHERE relname = %s'
+    elif connection.vendor == 'sqlite':
+        # первое число stat - число строк таблицы
+        sql = 'SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1'
+    elif connection.vendor == 'mysql':
+        sql = (
+            'SELECT table_rows FROM information_schema.tables '
+            'WHERE table_schema = DATABASE() AND table_name = %s'
+        )
+    else:
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [table])
+            row = cursor.fetchone()
+    except DatabaseError:
+        # sqlite_stat1 нет, пока не выполнялся ANALYZE
+        return None
+    if row is None or row[0] is None:
+        return None
+    rows = int(str(row[0]).split()[0])
+    return rows if rows >= 0 else None
+
+
+def get_table_rows(model, using):
+    """
+    estimate_rows, запомненная в памяти процесса на COUNT_STALENESS
+    секунд: статистика меняется редко, только при analyze().
+    """
+    key = (using, model._meta.db_table)
+    rows, checked_at = _table_rows.get(key, (None, None))
+    if checked_at is None or (
+        time.monotonic() - checked_at >= settings.COUNT_STALENESS
+    ):
+        rows = estimate_rows(model, using)
+        _table_rows[key] = (rows, time.monotonic())
+    return rows
+
+
+def analyze(using=DEFAULT_DB_ALIAS):
+    """Обновляет статистику таблиц, по которой оцениваются выборки."""
+    connection = connections[using]
+    if connection.vendor in ('postgresql', 'sqlite'):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+    for key in list(_table_rows):
+        if key[0] == using:
+            del _table_rows[key]
+
+
+def _is_whole_table(queryset):
+    query = queryset.query
+    return (
+        not query.where
+        and not query.distinct
+        and query.low_mark == 0
+        and query.high_mark is None
+    )
+
+
+def _count(queryset, estimate):
+    limit = settings.COUNT_EXACT_LIMIT
+    exact = queryset.order_by()[:limit + 1].count()
+    if exact <= limit:
+        return exact
+    if callable(estimate):
+        estimate = estimate()
+    if estimate is None and _is_whole_table(queryset):
+        estimate = get_table_rows(queryset.model, queryset.db)
+    if estimate is None:
+        return queryset.count()
+    # оценка не меньше уже известного точного минимума
+    return max(estimate, exact)
+
+
+def count(queryset, estimate=None):
+    """
+    Число объектов queryset: точное до COUNT_EXACT_LIMIT, дальше -
+    estimate (число или функция), статистика таблицы или, если оценки
+    нет, полный COUNT(*).
+    """
+    sql, params = queryset.query.sql_with_params()
+    key = COUNT_CACHE_KEY.format(
+        hashlib.md5(f'{queryset.db}:{sql}:{params}'.encode()).hexdigest(),
+    )
+    result = cache.get(key)
+    if result is None:
+        result = _count(queryset, estimate)
+        cache.set(key, result, settings.COUNT_STALENESS)
+    return result
@@ -0,0 +1,60 @@
+"""
+Защита от ленивых загрузок (N+1) в списках.
+
+Объекты, выбранные через strict(queryset), помечаются вместе со
+связанными объектами из select_related. Догрузка незагруженного
+связанного объекта или отложенного only() поля читает БД с подсказкой
+instance, поэтому LazyLoadRouter видит, для какого объекта она идет.
+Для помеченных объектов при LAZY_LOAD_GUARD (включается при DEBUG
+и в тестах, см. core.test_runner) выбрасывается LazyLoadError - вместо
+тихого лишнего запроса на каждую карточку. Остальные объекты, в том
+числе в админке и сторонних приложениях, не проверяются.
+"""
+from django.conf import settings
+from django.db.models.query import ModelIterable
+
+STRICT_ATTR = '_strict_loading'
+
+
+class LazyLoadError(Exception):
+    pass
+
+
+def _mark(obj):
+    setattr(obj, STRICT_ATTR, True)
+    for related in obj._state.fields_cache.values():
+        if related is not None:
+            _mark(related)
+
+
+class StrictModelIterable(ModelIterable):
+    def __iter__(self):
+        for obj in super().__iter__():
+            _mark(obj)
+            yield obj
+
+
+def strict(queryset):
+    """Queryset, объекты которого нельзя догружать лениво."""
+    queryset = queryset.all()
+    queryset._iterable_class = StrictModelIterable
+    return queryset
+
+
+class LazyLoadRouter:
+    """
+    Роутер БД, стоящий первым: выбор БД оставляет следующим роутерам,
+    а чтение для помеченного объекта запрещает.
+    """
+
+    def db_for_read(self, model, instance=None, **hints):
+        if (
+            settings.LAZY_LOAD_GUARD
+            and getattr(instance, STRICT_ATTR, False)
+        ):
+            raise LazyLoadError(
+                f'{model._meta.label} для {instance._meta.label} '
+                f'загружается отдельным запросом: добавьте его '
+                f'в select_related или only()'
+            )
+        return None
@@ -0,0 +1,193 @@
+"""
+Метрики запросов: время view, запросы к БД, попадания в кэш,
+отрисовка шаблонов и генерация миниатюр.
+
+MetricsMiddleware собирает метрики каждого запроса в контекстную
+переменную, отдает их в заголовке Server-Timing (при SERVER_TIMING
+или персоналу), пишет в лог строкой JSON и копит суммы по view
+в памяти процесса. Раз в VIEW_STATS_FLUSH_INTERVAL секунд суммы
+переносятся в ViewStats, статистика которых видна в админке: после
+отправки ответа (request_finished), а не во время запроса.
+"""
+import json
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.template.backends.django import Template
+from django.utils import timezone
+
+METRICS = (
+    'total_ms',
+    'db_queries',
+    'db_ms',
+    'cache_hits',
+    'cache_misses',
+    'template_ms',
+    'thumbnail_ms',
+)
+SUM_FIELDS = ('requests', 'errors', *METRICS)
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar('request_metrics', default=None)
+_pending = {}
+_pending_lock = threading.Lock()
+_flushed_at = time.monotonic()
+
+
+def add(name, value=1):
+    """Добавляет value к метрике name текущего запроса."""
+    metrics = _current.get()
+    if metrics is not None:
+        metrics[name] += value
+
+
+@contextmanager
+def timer(name):
+    """Добавляет время блока в миллисекундах к метрике name."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add(name, (time.perf_counter() - start) * 1000)
+
+
+@contextmanager
+def collect():
+    """Собирает метрики кода внутри блока в Counter."""
+    metrics = Counter()
+    token = _current.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current.reset(token)
+
+
+def _db_wrapper(execute, sql, params, many, context):
+    add('db_queries')
+    with timer('db_ms'):
+        return execute(sql, params, many, context)
+
+
+def instrument_connection(sender, connection, **kwargs):
+    """Подключает счетчик запросов к новому соединению с БД."""
+    if _db_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_db_wrapper)
+
+
+def _timed_render(render):
+    def timed(self, *args, **kwargs):
+        with timer('template_ms'):
+            return render(self, *args, **kwargs)
+    return timed
+
+
+def install():
+    """Замеряет отрисовку шаблонов: вложенные шаблоны не повторяются."""
+    if getattr(Template, '_metrics_installed', False):
+        return
+    Template.render = _timed_render(Template.render)
+    Template._metrics_installed = True
+
+
+def record(view, metrics):
+    """Добавляет метрики запроса к суммам view в памяти процесса."""
+    key = (view, timezone.localdate())
+    with _pending_lock:
+        stats = _pending.setdefault(key, Counter())
+        stats.update({field: metrics[field] for field in SUM_FIELDS})
+        stats['max_ms'] = max(stats['max_ms'], metrics['total_ms'])
+
+
+def flush():
+    """Переносит накопленные суммы в ViewStats."""
+    from .models import ViewStats
+
+    global _flushed_at
+    with _pending_lock:
+        pending = dict(_pending)
+        _pending.clear()
+        _flushed_at = time.monotonic()
+    for (view, date), stats in pending.items():
+        rows = ViewStats.objects.filter(view=view, date=date)
+        changes = {field: F(field) + stats[field] for field in SUM_FIELDS}
+        changes['max_ms'] = Greatest('max_ms', stats['max_ms'])
+        if rows.update(**changes):
+            continue
+        try:
+            with transaction.atomic():
+                ViewStats.objects.create(view=view, date=date, **stats)
+        except IntegrityError:
+            # запись успел создать другой процесс
+            rows.update(**changes)
+
+
+def _should_flush():
+    interval = settings.VIEW_STATS_FLUSH_INTERVAL
+    return interval is not None and time.monotonic() - _flushed_at >= interval
+
+
+def flush_if_due(**kwargs):
+    """Обработчик request_finished: переносит суммы, если пора."""
+    if _should_flush():
+        flush()
+
+
+def get_server_timing(metrics):
+    """Значение заголовка Server-Timing."""
+    return ', '.join([
+        f"total;dur={metrics['total_ms']:.1f}",
+        f"db;dur={metrics['db_ms']:.1f};desc=\"{metrics['db_queries']} "
+        f"queries\"",
+        f"cache;desc=\"hit={metrics['cache_hits']} "
+        f"miss={metrics['cache_misses']}\"",
+        f"template;dur={metrics['template_ms']:.1f}",
+        f"thumbnail;dur={metrics['thumbnail_ms']:.1f}",
+    ])
+
+
+class MetricsMiddleware:
+    """Замеряет запросы. Стоит первой, чтобы учесть все остальные."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        with collect() as metrics:
+            response = self.get_response(request)
+        metrics['total_ms'] = (time.perf_counter() - start) * 1000
+        metrics['requests'] = 1
+        metrics['errors'] = int(response.status_code >= 500)
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+
+        if self.show_timing(request):
+            response['Server-Timing'] = get_server_timing(metrics)
+        level = logging.INFO
+        if metrics['total_ms'] >= settings.SLOW_REQUEST_MS:
+            level = logging.WARNING
+        if logger.isEnabledFor(level):
+            logger.log(level, json.dumps({
+                'view': view,
+                'method': request.method,
+                'status': response.status_code,
+                **{field: round(metrics[field], 2) for field in METRICS},
+            }))
+        record(view, metrics)
+        return response
+
+    def show_timing(self, request):
+        # время и число запросов к БД не показываются посторонним
+        if settings.SERVER_TIMING:
+            return True
+        user = getattr(request, 'user', None)
+        return user is not None and user.is_staff
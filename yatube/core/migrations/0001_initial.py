@@ -0,0 +1,41 @@
+# Generated by Django 2.2.16 on 2026-10-18 05:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ViewStats',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('view', models.CharField(max_length=200, verbose_name='View')),
+                ('date', models.DateField(verbose_name='Дата')),
+                ('requests', models.PositiveIntegerField(default=0, verbose_name='Запросов')),
+                ('errors', models.PositiveIntegerField(default=0, verbose_name='Ошибок сервера')),
+                ('total_ms', models.FloatField(default=0, verbose_name='Время, мс')),
+                ('max_ms', models.FloatField(default=0, verbose_name='Максимальное время, мс')),
+                ('db_queries', models.PositiveIntegerField(default=0, verbose_name='Запросов к БД')),
+                ('db_ms', models.FloatField(default=0, verbose_name='Время БД, мс')),
+                ('cache_hits', models.PositiveIntegerField(default=0, verbose_name='Попаданий в кэш')),
+                ('cache_misses', models.PositiveIntegerField(default=0, verbose_name='Промахов кэша')),
+                ('template_ms', models.FloatField(default=0, verbose_name='Время шаблонов, мс')),
+                ('thumbnail_ms', models.FloatField(default=0, verbose_name='Время миниатюр, мс')),
+            ],
+            options={
+                'verbose_name': 'Статистика view',
+                'verbose_name_plural': 'Статистика view',
+                'ordering': ['-date', '-total_ms'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='viewstats',
+            constraint=models.UniqueConstraint(fields=('view', 'date'), name='unique_view_stats'),
+        ),
+    ]
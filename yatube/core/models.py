@@ -0,0 +1,50 @@
+from django.db import models
+
+
+class ViewStats(models.Model):
+    """
+    Суммарные метрики запросов к view за день. Заполняется
+    из памяти процессов (core.metrics.flush).
+    """
+    view = models.CharField(max_length=200, verbose_name='View')
+    date = models.DateField(verbose_name='Дата')
+    requests = models.PositiveIntegerField(
+        default=0, verbose_name='Запросов',
+    )
+    errors = models.PositiveIntegerField(
+        default=0, verbose_name='Ошибок сервера',
+    )
+    total_ms = models.FloatField(default=0, verbose_name='Время, мс')
+    max_ms = models.FloatField(
+        default=0, verbose_name='Максимальное время, мс',
+    )
+    db_queries = models.PositiveIntegerField(
+        default=0, verbose_name='Запросов к БД',
+    )
+    db_ms = models.FloatField(default=0, verbose_name='Время БД, мс')
+    cache_hits = models.PositiveIntegerField(
+        default=0, verbose_name='Попаданий в кэш',
+    )
+    cache_misses = models.PositiveIntegerField(
+        default=0, verbose_name='Промахов кэша',
+    )
+    template_ms = models.FloatField(
+        default=0, verbose_name='Время шаблонов, мс',
+    )
+    thumbnail_ms = models.FloatField(
+        default=0, verbose_name='Время миниатюр, мс',
+    )
+
+    def __str__(self):
+        return f'{self.view} {self.date}'
+
+    class Meta:
+        ordering = ['-date', '-total_ms']
+        verbose_name = 'Статистика view'
+        verbose_name_plural = 'Статистика view'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['view', 'date'],
+                name='unique_view_stats',
+            ),
+        ]
@@ -0,0 +1,84 @@
+"""
+Чтение из реплик БД для view только на чтение.
+
+View, помеченные replica_reads, читают из случайной реплики
+из DATABASE_REPLICAS, все остальные запросы и любые записи идут
+в основную БД. Пользователь, который только что что-то записал, в течение
+DATABASE_REPLICA_LAG секунд читает из основной БД (cookie PIN_COOKIE),
+чтобы сразу видеть свои изменения, пока реплики догоняют основную БД.
+"""
+import random
+import threading
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+PIN_COOKIE = 'db_primary'
+
+_state = threading.local()
+
+
+def is_replica_read():
+    """Текущий запрос читает из реплик."""
+    return getattr(_state, 'replica_reads', False)
+
+
+def replica_reads(view):
+    """Помечает view, которой достаточно данных из реплики."""
+    view.replica_reads = True
+    return view
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if is_replica_read() and settings.DATABASE_REPLICAS:
+            return random.choice(settings.DATABASE_REPLICAS)
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        _state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        return obj1._state.db in databases and obj2._state.db in databases
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaMiddleware:
+    """
+    Включает чтение из реплик для помеченных view и закрепляет
+    за основной БД пользователя, запрос которого что-то записал.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _state.replica_reads = False
+        _state.wrote = False
+        try:
+            response = self.get_response(request)
+            wrote = _state.wrote
+        finally:
+            _state.replica_reads = False
+            _state.wrote = False
+        if wrote:
+            response.set_cookie(
+                PIN_COOKIE, '1',
+                max_age=settings.DATABASE_REPLICA_LAG,
+                httponly=True,
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # без реплик чтение идет из основной БД: кэш страниц и ETag
+        # не нужно ограничивать отставанием реплик
+        _state.replica_reads = (
+            bool(settings.DATABASE_REPLICAS)
+            and getattr(view_func, 'replica_reads', False)
+            and request.method in ('GET', 'HEAD')
+            and PIN_COOKIE not in request.COOKIES
+        )
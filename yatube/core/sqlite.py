@@ -0,0 +1,14 @@
+"""
+Прагмы SQLite для каждого нового соединения (SQLITE_PRAGMAS).
+
+Подключается к сигналу connection_created в CoreConfig.ready.
+"""
+from django.conf import settings
+
+
+def apply_pragmas(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite' or not settings.SQLITE_PRAGMAS:
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
@@ -0,0 +1,146 @@
+"""
+Стеммер Snowball для русского языка и разбиение текста на слова.
+
+Окончания ищутся только в области RV (после первой гласной),
+словообразовательный суффикс -ость - в области R2.
+Окончания первой группы снимаются, только если перед ними стоит а или я.
+"""
+import re
+from functools import lru_cache
+
+VOWELS = 'аеиоуыэюя'
+WORD_RE = re.compile(r'\w+')
+CYRILLIC_RE = re.compile(r'[а-яё]+')
+# словарь текстов ограничен, основы частых слов запоминаются
+STEM_CACHE_SIZE = 100000
+
+PERFECTIVE_GERUND = (
+    ('в', 'вши', 'вшись'),
+    ('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись'),
+)
+ADJECTIVE = (
+    (),
+    (
+        'ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем',
+        'им', 'ым', 'ом', 'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую', 'юю',
+        'ая', 'яя', 'ою', 'ею',
+    ),
+)
+PARTICIPLE = (
+    ('ем', 'нн', 'вш', 'ющ', 'щ'),
+    ('ивш', 'ывш', 'ующ'),
+)
+REFLEXIVE = ((), ('ся', 'сь'))
+VERB = (
+    (
+        'ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но',
+        'ет', 'ют', 'ны', 'ть', 'ешь', 'нно',
+    ),
+    (
+        'ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей', 'уй',
+        'ил', 'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено', 'ят', 'ует', 'уют',
+        'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю',
+    ),
+)
+NOUN = (
+    (),
+    (
+        'а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии',
+        'и', 'ией', 'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием', 'ем', 'ам',
+        'ом', 'о', 'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю', 'ия',
+        'ья', 'я',
+    ),
+)
+DERIVATIONAL = ((), ('ост', 'ость'))
+SUPERLATIVE = ((), ('ейш', 'ейше'))
+
+
+def _skip(word, position, vowels):
+    """Позиция после первой буквы (гласной или согласной) от position."""
+    while position < len(word):
+        position += 1
+        if (word[position - 1] in VOWELS) == vowels:
+            return position
+    return None
+
+
+def _regions(word):
+    """Начала областей RV и R2."""
+    rv = _skip(word, 0, True)
+    if rv is None:
+        return len(word), len(word)
+    position = rv
+    for vowels in (False, True, False):
+        position = _skip(word, position, vowels)
+        if position is None:
+            return rv, len(word)
+    return rv, position
+
+
+def _remove(word, start, endings):
+    """
+    Снимает самое длинное из окончаний, лежащее в области от start.
+    Возвращает None, если подходящего окончания нет.
+    """
+    after_a, plain = endings
+    matched = max(
+        (
+            ending for ending in after_a + plain
+            if word.endswith(ending) and len(word) - len(ending) >= start
+        ),
+        key=len,
+        default=None,
+    )
+    if matched is None:
+        return None
+    stem = word[:-len(matched)]
+    if matched in after_a and (
+        not stem.endswith(('а', 'я')) or len(stem) - 1 < start
+    ):
+        return None
+    return stem
+
+
+def _remove_adjectival(word, start):
+    stem = _remove(word, start, ADJECTIVE)
+    if stem is None:
+        return None
+    return _remove(stem, start, PARTICIPLE) or stem
+
+
+@lru_cache(maxsize=STEM_CACHE_SIZE)
+def stem(word):
+    """Основа русского слова."""
+    word = word.lower().replace('ё', 'е')
+    rv, r2 = _regions(word)
+
+    result = _remove(word, rv, PERFECTIVE_GERUND)
+    if result is None:
+        word = _remove(word, rv, REFLEXIVE) or word
+        result = (
+            _remove_adjectival(word, rv)
+            or _remove(word, rv, VERB)
+            or _remove(word, rv, NOUN)
+        )
+    word = result or word
+
+    if word.endswith('и') and len(word) - 1 >= rv:
+        word = word[:-1]
+    word = _remove(word, r2, DERIVATIONAL) or word
+
+    superlative = _remove(word, rv, SUPERLATIVE)
+    if superlative is not None:
+        word = superlative
+    if word.endswith('нн') and len(word) - 2 >= rv:
+        word = word[:-1]
+    elif superlative is None and word.endswith('ь') and len(word) - 1 >= rv:
+        word = word[:-1]
+    return word
+
+
+def get_terms(text):
+    """Основы слов текста в порядке появления."""
+    return [
+        stem(word) if CYRILLIC_RE.fullmatch(word) else word
+        for word in WORD_RE.findall(text.lower())
+    ]
@@ -0,0 +1,10 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class GuardedTestRunner(DiscoverRunner):
+    """Запускает тесты с защитой от ленивых загрузок (LAZY_LOAD_GUARD)."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        settings.LAZY_LOAD_GUARD = True
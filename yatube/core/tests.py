@@ -1,6 +1,23 @@
+import asyncio
+import json
+import threading
+from unittest import mock
 from http import HTTPStatus
 
-from django.test import TestCase
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, router
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+from . import counting, metrics
+from .asgi import AsgiHandler
+from .cache import cache_stream, get_etag
+from .cache_backends import TwoTierCache
+from .models import ViewStats
+from .replicas import PIN_COOKIE, ReplicaMiddleware, replica_reads
+from .utils import WindowedPaginator
 
 
 class ViewTestClass(TestCase):
@@ -8,3 +25,443 @@ class ViewTestClass(TestCase):
         response = self.client.get('/nonexist-page/')
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
         self.assertTemplateUsed(response, 'core/404.html')
+
+
+@override_settings(CACHES={
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'two-tier-shared',
+    },
+})
+class TwoTierCacheTest(TestCase):
+    """Два экземпляра кэша имитируют два процесса с общим кэшем."""
+
+    def setUp(self):
+        params = {'OPTIONS': {'SHARED_ALIAS': 'shared', 'SYNC_INTERVAL': 0}}
+        self.worker1 = TwoTierCache('', params)
+        self.worker2 = TwoTierCache('', params)
+        self.worker1.clear()
+
+    def test_value_shared_between_workers(self):
+        """Значение, записанное одним процессом, видно другому."""
+        self.worker1.set('key', 'value')
+
+        self.assertEqual(self.worker2.get('key'), 'value')
+        self.assertEqual(
+            self.worker2.get_many(['key', 'missing']),
+            {'key': 'value'},
+        )
+
+    def test_local_tier_serves_repeated_reads(self):
+        """Повторное чтение обслуживается первым уровнем."""
+        self.worker1.set('key', 'value')
+        self.worker2.get('key')
+        self.worker2.shared.set(
+            'key', 'changed-behind-the-back', version=None,
+        )
+
+        self.assertEqual(self.worker2.get('key'), 'value')
+
+    def test_changes_invalidate_other_workers(self):
+        """Изменение и удаление ключа сбрасывают его в других процессах."""
+        self.worker1.set('key', 'old')
+        self.worker2.get('key')
+
+        self.worker1.set('key', 'new')
+        self.assertEqual(self.worker2.get('key'), 'new')
+
+        self.worker1.delete('key')
+        self.assertIsNone(self.worker2.get('key'))
+
+    def test_incr_visible_to_other_workers(self):
+        """Счетчики (версии тегов кэша) согласованы между процессами."""
+        self.worker1.set('version', 1)
+        self.worker2.get('version')
+
+        self.worker1.incr('version')
+
+        self.assertEqual(self.worker2.get('version'), 2)
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaRoutingTest(TestCase):
+    read_view = staticmethod(lambda request: HttpResponse())
+    replica_view = staticmethod(
+        replica_reads(lambda request: HttpResponse())
+    )
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def call(self, view, request):
+        """Запрос через middleware; возвращает (ответ, БД для чтения)."""
+        used = []
+
+        def get_response(request):
+            middleware.process_view(request, view, (), {})
+            used.append(router.db_for_read(get_user_model()))
+            return view(request)
+
+        middleware = ReplicaMiddleware(get_response)
+        response = middleware(request)
+        return response, used[0]
+
+    def test_marked_view_reads_from_replica(self):
+        _, db = self.call(self.replica_view, self.factory.get('/'))
+
+        self.assertEqual(db, 'replica1')
+        self.assertEqual(router.db_for_read(get_user_model()), 'default')
+
+    def test_other_requests_read_from_primary(self):
+        view = self.replica_view
+        pinned = self.factory.get('/')
+        pinned.COOKIES[PIN_COOKIE] = '1'
+
+        for request, request_view in (
+            (self.factory.get('/'), self.read_view),
+            (self.factory.post('/'), view),
+            (pinned, view),
+        ):
+            with self.subTest(method=request.method, view=request_view):
+                _, db = self.call(request_view, request)
+                self.assertEqual(db, 'default')
+
+    def test_write_pins_user_to_primary(self):
+        def write_view(request):
+            router.db_for_write(get_user_model())
+            return HttpResponse()
+
+        read_response, _ = self.call(self.replica_view, self.factory.get('/'))
+        write_response, db = self.call(write_view, self.factory.post('/'))
+
+        self.assertNotIn(PIN_COOKIE, read_response.cookies)
+        self.assertEqual(db, 'default')
+        self.assertIn(PIN_COOKIE, write_response.cookies)
+        self.assertEqual(
+            write_response.cookies[PIN_COOKIE]['max-age'], 5,
+        )
+
+    def test_replica_pages_get_unique_etags(self):
+        """ETag страницы с реплики не совпадет с ETag свежей страницы."""
+        versions = {'posts': 1}
+        etags = []
+
+        def get_response(request):
+            middleware.process_view(request, self.replica_view, (), {})
+            etags.append(get_etag('anon', versions))
+            return HttpResponse()
+
+        middleware = ReplicaMiddleware(get_response)
+        middleware(self.factory.get('/'))
+
+        self.assertNotEqual(etags[0], get_etag('anon', versions))
+        self.assertEqual(
+            get_etag('anon', versions), get_etag('anon', versions),
+        )
+
+
+class SqlitePragmasTest(TestCase):
+
+    def get_busy_timeout(self):
+        new_connection = connection.copy()
+        try:
+            with new_connection.cursor() as cursor:
+                cursor.execute('PRAGMA busy_timeout')
+                return cursor.fetchone()[0]
+        finally:
+            new_connection.close()
+
+    @override_settings(SQLITE_PRAGMAS={'busy_timeout': 1234})
+    def test_pragmas_apply_to_new_connections(self):
+        self.assertEqual(self.get_busy_timeout(), 1234)
+
+    @override_settings(SQLITE_PRAGMAS={})
+    def test_no_pragmas_by_default(self):
+        self.assertNotEqual(self.get_busy_timeout(), 1234)
+
+
+class MetricsTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        # суммы запросов предыдущих тестов
+        metrics.flush()
+        ViewStats.objects.all().delete()
+
+    def test_server_timing_header(self):
+        response = self.client.get('/')
+
+        timing = response['Server-Timing']
+        self.assertIn('total;dur=', timing)
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="[1-9]\d* queries"')
+        self.assertIn('cache;desc="hit=0 miss=1"', timing)
+        self.assertRegex(timing, r'template;dur=[1-9]')
+
+    @override_settings(SERVER_TIMING=False)
+    def test_server_timing_only_for_staff(self):
+        self.assertNotIn('Server-Timing', self.client.get('/'))
+
+        staff = get_user_model().objects.create_user(
+            'staff', is_staff=True,
+        )
+        self.client.force_login(staff)
+        self.assertIn('Server-Timing', self.client.get('/'))
+
+    @override_settings(VIEW_STATS_FLUSH_INTERVAL=0)
+    def test_stats_flushed_after_response(self):
+        """Суммы пишутся в БД после отправки ответа."""
+        self.client.get('/')
+
+        self.assertEqual(
+            ViewStats.objects.get(view='posts:index').requests, 1,
+        )
+
+    def test_stats_flushed_to_database(self):
+        self.client.get('/')
+        self.client.get('/')
+
+        metrics.flush()
+        self.client.get('/')
+        metrics.flush()
+
+        stats = ViewStats.objects.get(view='posts:index')
+        self.assertEqual(stats.requests, 3)
+        self.assertEqual(stats.cache_hits, 2)
+        self.assertEqual(stats.cache_misses, 1)
+        self.assertGreater(stats.db_queries, 0)
+        self.assertGreaterEqual(stats.total_ms, stats.max_ms)
+
+    def test_request_logged_as_json(self):
+        with self.assertLogs('core.metrics', 'INFO') as logs:
+            self.client.get('/nonexist-page/')
+
+        entry = json.loads(logs.records[0].getMessage())
+        self.assertEqual(entry['view'], 'unresolved')
+        self.assertEqual(entry['status'], HTTPStatus.NOT_FOUND)
+        self.assertIn('db_queries', entry)
+
+    def test_stats_admin_page(self):
+        self.client.get('/')
+        metrics.flush()
+        admin = get_user_model().objects.create_superuser(
+            'admin', 'admin@example.com', 'password',
+        )
+        self.client.force_login(admin)
+
+        response = self.client.get('/admin/core/viewstats/')
+
+        self.assertContains(response, 'posts:index')
+
+
+class WindowedPaginatorTest(TestCase):
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_page_window(self):
+        """Номера страниц - начало, конец и окно вокруг текущей."""
+        paginator = WindowedPaginator(list(range(100)), 1)
+        cases = {
+            1: [1, 2, 3, None, 100],
+            5: [1, 2, 3, 4, 5, 6, 7, None, 100],
+            50: [1, None, 48, 49, 50, 51, 52, None, 100],
+            100: [1, None, 98, 99, 100],
+        }
+        for number, window in cases.items():
+            with self.subTest(number=number):
+                self.assertEqual(paginator.page(number).page_window, window)
+        self.assertEqual(
+            WindowedPaginator([1, 2, 3], 1).page(2).page_window, [1, 2, 3],
+        )
+
+    def test_count_cached(self):
+        """Число объектов выборки берется из кэша."""
+        User = get_user_model()
+        User.objects.create_user(username='first')
+        WindowedPaginator(User.objects.order_by('id'), 2).count
+        User.objects.create_user(username='second')
+        paginator = WindowedPaginator(User.objects.order_by('id'), 2)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(paginator.count, 1)
+        # устаревшее число объектов не обрезает последнюю страницу
+        self.assertEqual(len(paginator.page(1)), 2)
+
+
+@override_settings(COUNT_EXACT_LIMIT=2)
+class CountingTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        for number in range(4):
+            User.objects.create_user(username=f'user{number}')
+        cls.users = User.objects.order_by('id')
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_small_sets_counted_exactly(self):
+        """Выборка до порога считается точно, оценка не нужна."""
+        def estimate():
+            raise AssertionError('оценка не нужна')
+
+        users = self.users.filter(username__in=['user0', 'user1'])
+        self.assertEqual(counting.count(users, estimate), 2)
+
+    def test_large_sets_use_estimate(self):
+        """Выборка больше порога берет переданную оценку."""
+        self.assertEqual(counting.count(self.users.all(), 40), 40)
+        users = self.users.filter(id__gt=0)
+        self.assertEqual(counting.count(users, lambda: 30), 30)
+        # оценка не может быть меньше уже посчитанного минимума
+        users = self.users.exclude(username='user0')
+        self.assertEqual(counting.count(users, 1), 3)
+
+    def test_large_sets_without_estimate(self):
+        """Без оценки - статистика таблицы или полный подсчет."""
+        users = self.users.exclude(username='user0')
+        self.assertEqual(counting.count(users), 3)
+        counting.analyze()
+        self.assertEqual(
+            counting.estimate_rows(self.users.model, 'default'), 4,
+        )
+        self.assertEqual(counting.count(self.users.all()), 4)
+
+
+@override_settings(DATABASE_REPLICAS=[])
+class CacheWithoutReplicasTest(TestCase):
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_full_timeout_without_replicas(self):
+        """Без реплик ответы кэшируются на весь VIEW_CACHE_TIMEOUT."""
+        timeouts = []
+        set_entry = cache.set
+
+        def spy(key, value, timeout=None, **kwargs):
+            if key.startswith('view:'):
+                timeouts.append(timeout)
+            return set_entry(key, value, timeout, **kwargs)
+
+        with mock.patch.object(cache, 'set', spy):
+            self.client.get('/')
+
+        self.assertEqual(timeouts, [settings.VIEW_CACHE_TIMEOUT])
+
+    @override_settings(VIEW_CACHE_TIMEOUT=0)
+    def test_etag_stable_across_render(self):
+        """Заново отрисованная страница с теми же данными получает 304."""
+        etag = self.client.get('/')['ETag']
+
+        response = self.client.get('/', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+
+class CacheStreamTest(TestCase):
+
+    def setUp(self):
+        self.calls = 0
+
+        @cache_stream('posts')
+        def view(request):
+            self.calls += 1
+            return StreamingHttpResponse(iter([b'a', b'b']))
+
+        self.view = view
+        self.factory = RequestFactory()
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_matching_etag_skips_view(self):
+        """Совпавший ETag получает 304 без вызова view и при промахе кэша."""
+        response = self.view(self.factory.get('/feed/?page=1'))
+        self.assertEqual(b''.join(response.streaming_content), b'ab')
+
+        response = self.view(self.factory.get(
+            '/feed/?page=2', HTTP_IF_NONE_MATCH=response['ETag'],
+        ))
+
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        self.assertEqual(self.calls, 1)
+
+
+def wsgi_echo(environ, start_response):
+    """WSGI-приложение: отвечает телом и строкой запроса по частям."""
+    start_response('201 Created', [
+        ('Content-Type', 'text/plain'),
+        ('X-Thread', threading.current_thread().name),
+        ('X-Cookie', environ.get('HTTP_COOKIE', '')),
+    ])
+    query = environ['QUERY_STRING'].encode()
+    return [b'', environ['wsgi.input'].read(), b'?', query]
+
+
+class AsgiTest(TestCase):
+
+    def call(self, application, scope, messages):
+        """Вызывает ASGI-приложение, возвращает отправленные сообщения."""
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(application(scope, receive, send))
+        return sent
+
+    def test_request_runs_in_pool(self):
+        """Запрос выполняется в потоке пула, ответ отдается по частям."""
+        application = AsgiHandler(wsgi_echo, max_workers=1)
+        scope = {
+            'type': 'http',
+            'method': 'POST',
+            'path': '/echo/',
+            'query_string': b'page=2',
+            'headers': [(b'cookie', b'a=1'), (b'cookie', b'b=2')],
+        }
+        sent = self.call(application, scope, [
+            {'type': 'http.request', 'body': b'te', 'more_body': True},
+            {'type': 'http.request', 'body': b'xt'},
+        ])
+
+        start, *body = sent
+        headers = dict(start['headers'])
+        self.assertEqual(start['status'], HTTPStatus.CREATED)
+        self.assertTrue(headers[b'x-thread'].startswith(b'asgi'))
+        self.assertEqual(headers[b'x-cookie'], b'a=1; b=2')
+        self.assertEqual(
+            [message['body'] for message in body],
+            [b'text', b'?', b'page=2', b''],
+        )
+        self.assertFalse(body[-1].get('more_body'))
+
+    def test_lifespan_and_disconnect(self):
+        application = AsgiHandler(wsgi_echo, max_workers=1)
+        sent = self.call(application, {'type': 'lifespan'}, [
+            {'type': 'lifespan.startup'},
+            {'type': 'lifespan.shutdown'},
+        ])
+        self.assertEqual([message['type'] for message in sent], [
+            'lifespan.startup.complete', 'lifespan.shutdown.complete',
+        ])
+
+        application = AsgiHandler(wsgi_echo, max_workers=1)
+        sent = self.call(
+            application,
+            {'type': 'http', 'method': 'GET', 'path': '/'},
+            [{'type': 'http.disconnect'}],
+        )
+        self.assertEqual(sent, [])
+
+    def test_project_application(self):
+        from yatube.asgi import application
+        self.assertIsInstance(application, AsgiHandler)
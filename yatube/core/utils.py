@@ -1,7 +1,197 @@
-from django.core.paginator import Paginator
+import base64
+import binascii
+import json
 
+from django.core.exceptions import ValidationError
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
 
-def get_page_obj(obj_list, posts_per_page_limit, request):
-    paginator = Paginator(obj_list, posts_per_page_limit)
+from . import counting
+
+CURSOR_PARAM = 'cursor'
+CURSOR_NEXT = 'n'
+CURSOR_PREVIOUS = 'p'
+DEFAULT_CURSOR_ORDERING = ('-pub_date', '-id')
+# номера страниц по сторонам от текущей и в начале и конце списка
+PAGE_WINDOW_ON_EACH_SIDE = 2
+PAGE_WINDOW_ON_ENDS = 1
+
+
+def get_page_window(page, on_each_side=PAGE_WINDOW_ON_EACH_SIDE,
+                    on_ends=PAGE_WINDOW_ON_ENDS):
+    """
+    Номера страниц для навигации: первые и последние on_ends
+    и по on_each_side вокруг текущей. Пропуск обозначается None.
+    """
+    num_pages = page.paginator.num_pages
+    start = max(1, page.number - on_each_side)
+    end = min(num_pages, page.number + on_each_side)
+    window = []
+    if start > on_ends + 2:
+        window.extend(range(1, on_ends + 1))
+        window.append(None)
+    else:
+        window.extend(range(1, start))
+    window.extend(range(start, end + 1))
+    if end < num_pages - on_ends - 1:
+        window.append(None)
+        window.extend(range(num_pages - on_ends + 1, num_pages + 1))
+    else:
+        window.extend(range(end + 1, num_pages + 1))
+    return window
+
+
+class WindowedPaginator(Paginator):
+    """
+    Пагинатор с окном номеров страниц (page.page_window) и
+    приблизительным числом объектов (см. core.counting); estimate -
+    известная оценка числа объектов, например поддерживаемый счетчик.
+    Страница всегда берет per_page объектов, поэтому устаревшее число
+    объектов не прячет конец списка.
+    """
+
+    def __init__(self, object_list, per_page, estimate=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.estimate = estimate
+
+    @cached_property
+    def count(self):
+        if not hasattr(self.object_list, 'query'):
+            return len(self.object_list)
+        return counting.count(self.object_list, self.estimate)
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        page = self._get_page(
+            self.object_list[bottom:bottom + self.per_page], number, self,
+        )
+        page.page_window = get_page_window(page)
+        return page
+
+
+class CursorPage(Page):
+    """
+    Страница курсорной пагинации.
+    Номера страницы нет - вместо него курсоры соседних страниц.
+    """
+
+    def __init__(self, object_list, paginator, next_cursor, previous_cursor):
+        super().__init__(object_list, None, paginator)
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return '<CursorPage>'
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+class CursorPaginator(Paginator):
+    """
+    Keyset-пагинация по набору полей (по умолчанию pub_date, id).
+    Не выполняет COUNT(*) и OFFSET: страница выбирается диапазонным
+    запросом от крайнего объекта соседней страницы.
+    """
+
+    def __init__(self, object_list, per_page,
+                 ordering=DEFAULT_CURSOR_ORDERING):
+        super().__init__(object_list, per_page)
+        self.ordering = tuple(
+            (name.lstrip('-'), name.startswith('-')) for name in ordering
+        )
+
+    def _order_by(self, reverse):
+        return [
+            name if descending == reverse else f'-{name}'
+            for name, descending in self.ordering
+        ]
+
+    def _after(self, values, reverse):
+        """Условие "строго после values" в порядке сортировки."""
+        condition = Q()
+        equal = {}
+        for (name, descending), value in zip(self.ordering, values):
+            lookup = 'lt' if descending != reverse else 'gt'
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        return condition
+
+    def encode_cursor(self, direction, obj):
+        values = []
+        for name, descending in self.ordering:
+            value = getattr(obj, name)
+            if hasattr(value, 'isoformat'):
+                value = value.isoformat()
+            values.append(value)
+        raw = json.dumps([direction, values]).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        """Возвращает (direction, values) или None для первой страницы."""
+        if not cursor:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            direction, values = json.loads(raw.decode())
+            model = self.object_list.model
+            values = [
+                model._meta.get_field(name).to_python(value)
+                for (name, descending), value in zip(self.ordering, values)
+            ]
+        except (binascii.Error, UnicodeDecodeError, ValueError, TypeError,
+                ValidationError):
+            return None
+        if (direction not in (CURSOR_NEXT, CURSOR_PREVIOUS)
+                or len(values) != len(self.ordering)):
+            return None
+        return direction, values
+
+    def get_page(self, cursor):
+        """
+        Возвращает страницу после (или перед) курсором.
+        Некорректный курсор ведет на первую страницу.
+        """
+        position = self.decode_cursor(cursor)
+        reverse = position is not None and position[0] == CURSOR_PREVIOUS
+        object_list = self.object_list
+        if position is not None:
+            object_list = object_list.filter(self._after(position[1], reverse))
+        object_list = object_list.order_by(*self._order_by(reverse))
+
+        objects = list(object_list[:self.per_page + 1])
+        has_more = len(objects) > self.per_page
+        objects = objects[:self.per_page]
+        if reverse:
+            objects.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, position is not None
+
+        next_cursor = previous_cursor = None
+        if objects and has_next:
+            next_cursor = self.encode_cursor(CURSOR_NEXT, objects[-1])
+        if objects and has_previous:
+            previous_cursor = self.encode_cursor(CURSOR_PREVIOUS, objects[0])
+        return CursorPage(objects, self, next_cursor, previous_cursor)
+
+    page = get_page
+
+
+def get_page_obj(obj_list, posts_per_page_limit, request, estimate=None):
+    """
+    Возвращает страницу списка; estimate - оценка числа объектов.
+    При наличии в запросе параметра cursor включается курсорный режим.
+    """
+    if CURSOR_PARAM in request.GET:
+        paginator = CursorPaginator(obj_list, posts_per_page_limit)
+        return paginator.get_page(request.GET.get(CURSOR_PARAM))
+
+    paginator = WindowedPaginator(obj_list, posts_per_page_limit, estimate)
     page_number = request.GET.get('page')
     return paginator.get_page(page_number)
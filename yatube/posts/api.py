@@ -0,0 +1,190 @@
+"""
+JSON API лент и постов для мобильных и одностраничных клиентов.
+
+Клиент выбирает поля параметром fields (?fields=id,text,author):
+из БД читаются только колонки этих полей, связанные автор и группа
+загружаются тем же запросом, только если запрошены. Ленты
+постраничны по курсору (cursor), как в CursorPaginator; шаблоны
+не отрисовываются.
+"""
+from http import HTTPStatus
+
+from django.db.models import F
+from django.http import JsonResponse
+from django.urls import reverse
+
+from core.cache import add_cache_tags, cache_view
+from core.lazy_loads import strict
+from core.replicas import replica_reads
+from core.utils import CURSOR_PARAM, DEFAULT_CURSOR_ORDERING, CursorPaginator
+from .feed import get_follow_feed
+from .models import Group, Post, User
+
+API_PAGE_LIMIT = 20
+FIELDS_PARAM = 'fields'
+# поле ответа -> поля модели для only()
+API_FIELDS = {
+    'id': ('id',),
+    'text': ('text',),
+    'pub_date': ('pub_date',),
+    'updated': ('updated',),
+    'author': (
+        'author',
+        'author__username',
+        'author__first_name',
+        'author__last_name',
+    ),
+    'group': ('group', 'group__slug', 'group__title'),
+    'image': ('image',),
+    'comments_count': ('comments_count',),
+}
+DEFAULT_API_FIELDS = ('id', 'text', 'pub_date', 'author', 'group')
+RELATED_API_FIELDS = ('author', 'group')
+JSON_PARAMS = {'ensure_ascii': False, 'separators': (',', ':')}
+
+
+class FieldsError(Exception):
+    pass
+
+
+def get_fields(request):
+    """Запрошенные поля ответа; неизвестное поле - FieldsError."""
+    value = request.GET.get(FIELDS_PARAM)
+    if not value:
+        return DEFAULT_API_FIELDS
+    fields = tuple(dict.fromkeys(
+        field.strip() for field in value.split(',') if field.strip()
+    ))
+    available = f'Доступны: {", ".join(API_FIELDS)}'
+    if not fields:
+        raise FieldsError(f'Не указано ни одного поля. {available}')
+    unknown = [field for field in fields if field not in API_FIELDS]
+    if unknown:
+        raise FieldsError(
+            f'Неизвестные поля: {", ".join(unknown)}. {available}'
+        )
+    return fields
+
+
+def select_fields(posts, fields):
+    """Выборка только колонок полей fields (и колонок курсора)."""
+    only = {name.lstrip('-') for name in DEFAULT_CURSOR_ORDERING}
+    for field in fields:
+        only.update(API_FIELDS[field])
+    related = [field for field in RELATED_API_FIELDS if field in fields]
+    if related:
+        posts = posts.select_related(*related)
+    return strict(posts.only(*only))
+
+
+def _author(user):
+    return {
+        'username': user.username,
+        'name': user.get_full_name() or user.username,
+        'url': reverse('posts:profile', args=[user.username]),
+    }
+
+
+def _group(group):
+    if group is None:
+        return None
+    return {
+        'slug': group.slug,
+        'title': group.title,
+        'url': reverse('posts:group_list', args=[group.slug]),
+    }
+
+
+SERIALIZERS = {
+    'id': lambda post: post.id,
+    'text': lambda post: post.text,
+    'pub_date': lambda post: post.pub_date.isoformat(),
+    'updated': lambda post: post.updated.isoformat(),
+    'author': lambda post: _author(post.author),
+    'group': lambda post: _group(post.group),
+    'image': lambda post: post.image.url if post.image else None,
+    'comments_count': lambda post: post.comments_count,
+}
+
+
+def serialize(post, fields):
+    return {field: SERIALIZERS[field](post) for field in fields}
+
+
+def _json(data, status=HTTPStatus.OK):
+    return JsonResponse(data, status=status, json_dumps_params=JSON_PARAMS)
+
+
+def _error(message, status):
+    return _json({'error': message}, status)
+
+
+def _feed_response(request, posts):
+    try:
+        fields = get_fields(request)
+    except FieldsError as error:
+        return _error(str(error), HTTPStatus.BAD_REQUEST)
+    paginator = CursorPaginator(select_fields(posts, fields), API_PAGE_LIMIT)
+    page = paginator.get_page(request.GET.get(CURSOR_PARAM))
+    return _json({
+        'results': [serialize(post, fields) for post in page],
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    })
+
+
+@replica_reads
+@cache_view('posts')
+def index(request):
+    """Лента всех постов"""
+    return _feed_response(request, Post.objects.all())
+
+
+@replica_reads
+@cache_view('group:{slug}')
+def group_posts(request, slug):
+    """Лента сообщества"""
+    group = Group.objects.filter(slug=slug).only('id').first()
+    if group is None:
+        return _error('Сообщество не найдено', HTTPStatus.NOT_FOUND)
+    return _feed_response(request, Post.objects.filter(group=group))
+
+
+@replica_reads
+@cache_view('profile:{username}')
+def profile(request, username):
+    """Лента автора"""
+    author = User.objects.filter(username=username).only('id').first()
+    if author is None:
+        return _error('Автор не найден', HTTPStatus.NOT_FOUND)
+    return _feed_response(request, Post.objects.filter(author=author))
+
+
+@replica_reads
+def follow_index(request):
+    """Лента подписок"""
+    if not request.user.is_authenticated:
+        return _error('Требуется вход', HTTPStatus.UNAUTHORIZED)
+    return _feed_response(request, get_follow_feed(request.user))
+
+
+@replica_reads
+@cache_view('post:{post_id}')
+def post_detail(request, post_id):
+    """Пост"""
+    try:
+        fields = get_fields(request)
+    except FieldsError as error:
+        return _error(str(error), HTTPStatus.BAD_REQUEST)
+    # username автора и slug группы нужны для тегов кэша, даже если
+    # автора и группы нет в ответе: они читаются тем же запросом
+    post = select_fields(Post.objects.filter(id=post_id), fields).annotate(
+        author_username=F('author__username'),
+        group_slug=F('group__slug'),
+    ).first()
+    if post is None:
+        return _error('Пост не найден', HTTPStatus.NOT_FOUND)
+    add_cache_tags(request, f'profile:{post.author_username}')
+    if post.group_slug:
+        add_cache_tags(request, f'group:{post.group_slug}')
+    return _json(serialize(post, fields))
@@ -0,0 +1,326 @@
+"""
+Бенчмарк страниц приложения posts.
+
+Заполняет БД заданными объемами данных и для каждого адреса
+из posts/urls.py замеряет число SQL-запросов, задержку (p50, p95)
+и пиковую память на запрос. Перед каждым замером кэш очищается:
+измеряется сама view, а не отдача из кэша. Результаты сравниваются
+с базовыми значениями из JSON-файла (команда benchmark_views).
+Число запросов от машины не зависит и хранится в базовом файле
+репозитория; время и память зависят, поэтому сравниваются, только
+если сняты в базовый файл на той же машине.
+
+run_concurrent замеряет пропускную способность чтения страницы
+под одновременной записью комментариев (команда benchmark_sqlite).
+"""
+import math
+import random
+import threading
+import time
+import tracemalloc
+
+from django.core.cache import caches
+from django.db import DatabaseError, connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core import metrics
+from .models import Comment, Follow, Group, Post, User
+from .seeding import bulk_create, get_vocabulary
+from .transfer import finish_import
+from .urls import app_name, urlpatterns
+
+DEFAULT_VOLUMES = {
+    'users': 200,
+    'groups': 20,
+    'posts': 10000,
+    'follows': 20,
+    'comments': 20000,
+}
+METRICS = ('p50_ms', 'p95_ms', 'peak_kb')
+# допустимый рост метрик сверх доли threshold: шум коротких замеров
+METRIC_SLACK = {'p50_ms': 2, 'p95_ms': 2, 'peak_kb': 16}
+
+
+def seed(volumes, random_seed=0):
+    """
+    Заполняет БД пользователями, группами, постами, подписками
+    (follows - подписок на пользователя) и комментариями.
+    Счетчики, ленты и поисковый индекс затем пересобираются целиком.
+    """
+    rng = random.Random(random_seed)
+    words = get_vocabulary(random_seed)
+
+    def text(min_words, max_words):
+        words_count = rng.randint(min_words, max_words)
+        return ' '.join(rng.choices(words, k=words_count))
+
+    bulk_create(User, (
+        User(username=f'user{number}', password='!')
+        for number in range(volumes['users'])
+    ))
+    bulk_create(Group, (
+        Group(title=f'Группа {number}', slug=f'group{number}',
+              description=text(5, 20))
+        for number in range(volumes['groups'])
+    ))
+    user_ids = list(User.objects.values_list('id', flat=True))
+    group_ids = list(Group.objects.values_list('id', flat=True)) + [None]
+    bulk_create(Post, (
+        Post(text=text(5, 60), author_id=rng.choice(user_ids),
+             group_id=rng.choice(group_ids))
+        for _ in range(volumes['posts'])
+    ))
+    bulk_create(Follow, (
+        Follow(user_id=user_id, author_id=author_id)
+        for user_id in user_ids
+        for author_id in rng.sample(
+            user_ids, min(volumes['follows'], len(user_ids)),
+        )
+        if author_id != user_id
+    ))
+    post_ids = list(Post.objects.values_list('id', flat=True))
+    bulk_create(Comment, (
+        Comment(text=text(3, 30), post_id=rng.choice(post_ids),
+                author_id=rng.choice(user_ids))
+        for _ in range(volumes['comments'] if post_ids else 0)
+    ))
+    finish_import()
+
+
+def get_requests():
+    """
+    Запросы бенчмарка для каждого адреса posts/urls.py:
+    имя -> (адрес, пользователь или None).
+    Берутся самые "тяжелые" объекты: группа и автор с наибольшим числом
+    постов, пост с наибольшим числом комментариев, читатель
+    с наибольшим числом подписок.
+    """
+    group = Group.objects.order_by('-posts_count').first()
+    author = User.objects.order_by('-stats__posts_count').first()
+    reader = User.objects.order_by('-stats__following_count').first()
+    post = Post.objects.filter(author=author).order_by(
+        '-comments_count',
+    ).first()
+    stranger = User.objects.exclude(id=reader.id).exclude(
+        following__user=reader,
+    ).first() or author
+    word = post.text.split()[0]
+    return {
+        'index': (reverse('posts:index'), None),
+        'post_create': (reverse('posts:post_create'), author),
+        'follow_index': (reverse('posts:follow_index'), reader),
+        'search': (f"{reverse('posts:search')}?q={word}", None),
+        'group_index': (reverse('posts:group_index'), None),
+        'group_list': (reverse('posts:group_list', args=[group.slug]), None),
+        'profile': (reverse('posts:profile', args=[author.username]), None),
+        'profile_follow': (
+            reverse('posts:profile_follow', args=[stranger.username]),
+            reader,
+        ),
+        'profile_unfollow': (
+            reverse('posts:profile_unfollow', args=[stranger.username]),
+            reader,
+        ),
+        'post_detail': (reverse('posts:post_detail', args=[post.id]), None),
+        'post_comments': (
+            reverse('posts:post_comments', args=[post.id]), None,
+        ),
+        'post_edit': (reverse('posts:post_edit', args=[post.id]), author),
+        'add_comment': (reverse('posts:add_comment', args=[post.id]), reader),
+        'index_feed': (reverse('posts:index_feed', args=['atom']), None),
+        'group_feed': (
+            reverse('posts:group_feed', args=[group.slug, 'rss']), None,
+        ),
+        'profile_feed': (
+            reverse('posts:profile_feed', args=[author.username, 'atom']),
+            None,
+        ),
+        'api_index': (reverse('posts:api_index'), None),
+        'api_follow_index': (reverse('posts:api_follow_index'), reader),
+        'api_group_list': (
+            reverse('posts:api_group_list', args=[group.slug]), None,
+        ),
+        'api_profile': (
+            reverse('posts:api_profile', args=[author.username]), None,
+        ),
+        'api_post_detail': (
+            reverse('posts:api_post_detail', args=[post.id]), None,
+        ),
+    }
+
+
+def get_missing_requests(requests):
+    """Адреса posts/urls.py, для которых нет запроса бенчмарка."""
+    return [
+        f'{app_name}:{pattern.name}' for pattern in urlpatterns
+        if pattern.name not in requests
+    ]
+
+
+def percentile(values, percent):
+    """Процентиль методом ближайшего ранга."""
+    values = sorted(values)
+    return values[max(0, math.ceil(len(values) * percent / 100) - 1)]
+
+
+def _get(client, url):
+    response = client.get(url)
+    if response.streaming:
+        # потоковый ответ формируется при чтении
+        b''.join(response.streaming_content)
+    return response
+
+
+def measure(url, user=None, repeat=20):
+    """Метрики GET-запроса к url."""
+    client = Client()
+    if user is not None:
+        client.force_login(user)
+    # первый запрос компилирует шаблоны и прогревает импорты
+    _get(client, url)
+    # накопленная статистика view записывается в БД сейчас, а не
+    # посреди замера
+    metrics.flush()
+    timings = []
+    for _ in range(repeat):
+        caches['default'].clear()
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            _get(client, url)
+            timings.append((time.perf_counter() - start) * 1000)
+        # список запросов берется из журнала соединения, который
+        # очищается в начале следующего запроса
+        queries_count = len(queries)
+
+    caches['default'].clear()
+    tracemalloc.start()
+    try:
+        _get(client, url)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        'queries': queries_count,
+        'p50_ms': round(percentile(timings, 50), 2),
+        'p95_ms': round(percentile(timings, 95), 2),
+        'peak_kb': peak // 1024,
+    }
+
+
+def run(repeat=20):
+    """Метрики всех запросов бенчмарка."""
+    return {
+        name: measure(url, user, repeat)
+        for name, (url, user) in get_requests().items()
+    }
+
+
+def compare(results, baseline, threshold):
+    """
+    Регрессии относительно базовых значений. Число запросов не должно
+    расти совсем, время и память - больше чем на долю threshold
+    (и больше чем на METRIC_SLACK), если они есть в базовых значениях.
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if result['queries'] > base['queries']:
+            regressions.append(
+                f"{name}: запросов {result['queries']} "
+                f"вместо {base['queries']}"
+            )
+        for metric in METRICS:
+            if metric not in base:
+                continue
+            limit = max(
+                base[metric] * (1 + threshold),
+                base[metric] + METRIC_SLACK[metric],
+            )
+            if result[metric] > limit:
+                regressions.append(
+                    f'{name}: {metric} {result[metric]} '
+                    f'вместо {base[metric]}'
+                )
+    return regressions
+
+
+class _Load:
+    """Общее состояние потоков run_concurrent."""
+
+    def __init__(self):
+        self.stop = threading.Event()
+        self.lock = threading.Lock()
+        self.timings = []
+        self.writes = 0
+        self.errors = 0
+
+    def add(self, name):
+        with self.lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+
+def _read(load, url):
+    client = Client()
+    number = 0
+    try:
+        while not load.stop.is_set():
+            number += 1
+            start = time.perf_counter()
+            try:
+                client.get(f'{url}?nocache={threading.get_ident()}-{number}')
+            except DatabaseError:
+                load.add('errors')
+                continue
+            with load.lock:
+                load.timings.append((time.perf_counter() - start) * 1000)
+    finally:
+        connection.close()
+
+
+def _write(load, url, user):
+    client = Client()
+    client.force_login(user)
+    try:
+        while not load.stop.is_set():
+            try:
+                client.post(url, {'text': 'Комментарий'})
+            except DatabaseError:
+                load.add('errors')
+            else:
+                load.add('writes')
+    finally:
+        connection.close()
+
+
+def run_concurrent(read_url, write_url, writers, readers=4, duration=5):
+    """
+    readers потоков без пауз читают read_url, по потоку на каждого
+    пользователя из writers отправляют комментарии на write_url.
+    Уникальная строка запроса обходит кэш view: читается БД.
+    """
+    load = _Load()
+    threads = [
+        threading.Thread(target=_read, args=[load, read_url])
+        for _ in range(readers)
+    ] + [
+        threading.Thread(target=_write, args=[load, write_url, user])
+        for user in writers
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    load.stop.set()
+    for thread in threads:
+        thread.join()
+    timings = load.timings or [0]
+    return {
+        'reads_per_s': round(len(load.timings) / duration, 1),
+        'read_p50_ms': round(percentile(timings, 50), 2),
+        'read_p95_ms': round(percentile(timings, 95), 2),
+        'writes_per_s': round(load.writes / duration, 1),
+        'errors': load.errors,
+    }
@@ -0,0 +1,68 @@
+"""Теги кэша страниц приложения posts (см. core.cache)."""
+from core.cache import get_versions, invalidate_on_commit
+from .models import Group, User
+
+
+def profile_tags(user_ids):
+    """Теги кэша страниц профилей пользователей."""
+    usernames = User.objects.filter(id__in=user_ids).values_list(
+        'username', flat=True,
+    )
+    return [f'profile:{username}' for username in usernames]
+
+
+def group_tags(group_ids):
+    """Теги кэша страниц сообществ."""
+    slugs = Group.objects.filter(id__in=group_ids).values_list(
+        'slug', flat=True,
+    )
+    return [f'group:{slug}' for slug in slugs]
+
+
+def invalidate_post_pages(post_id, author_ids, group_ids):
+    """
+    Сбрасывает кэш всех страниц, на которых показан пост, после
+    фиксации транзакции.
+    """
+    invalidate_on_commit(
+        'posts',
+        f'post:{post_id}',
+        *profile_tags(author_ids),
+        *group_tags(group_ids),
+    )
+
+
+def user_card_tag(user_id):
+    """Тег данных пользователя, показанных в карточках его постов."""
+    return f'user:{user_id}'
+
+
+def group_card_tag(group_id):
+    """Тег данных сообщества, показанных в карточках его постов."""
+    return f'group-entity:{group_id}'
+
+
+def card_tags(post):
+    """Теги, от которых зависит карточка поста."""
+    tags = [user_card_tag(post.author_id)]
+    if post.group_id:
+        tags.append(group_card_tag(post.group_id))
+    return tags
+
+
+def get_card_version(post, versions):
+    """Версия карточки поста для ключа ее кэша."""
+    return '-'.join(str(versions[tag]) for tag in card_tags(post))
+
+
+def prime_card_versions(posts):
+    """
+    Находит версии карточек всех постов страницы одним запросом к кэшу
+    и сохраняет их в post.card_version для шаблонов.
+    """
+    posts = list(posts)
+    versions = get_versions(
+        {tag for post in posts for tag in card_tags(post)},
+    )
+    for post in posts:
+        post.card_version = get_card_version(post, versions)
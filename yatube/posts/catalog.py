@@ -0,0 +1,43 @@
+"""
+Каталог групп: название, описание, число постов и дата последнего поста.
+
+Каталог целиком хранится в кэше под версией тега 'groups', которую
+меняют изменения самих групп. Число постов и дата последнего поста
+меняются с каждым постом и в каталоге обновляются раз
+в COUNT_STALENESS секунд. Формы постов и страница сообществ не читают
+таблицу групп и не считают их посты.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from core import metrics
+from core.cache import get_versions
+from core.replicas import is_replica_read
+from .models import Group
+
+CATALOG_KEY = 'group_catalog:{version}'
+CATALOG_FIELDS = (
+    'id',
+    'slug',
+    'title',
+    'description',
+    'posts_count',
+    'last_post_date',
+)
+
+
+def get_group_catalog():
+    """Список групп (словари полей CATALOG_FIELDS) в порядке id."""
+    key = CATALOG_KEY.format(version=get_versions(['groups'])['groups'])
+    catalog = cache.get(key)
+    if catalog is not None:
+        metrics.add('cache_hits')
+        return catalog
+    metrics.add('cache_misses')
+    catalog = list(Group.objects.order_by('id').values(*CATALOG_FIELDS))
+    timeout = settings.COUNT_STALENESS
+    if is_replica_read():
+        # реплика могла еще не получить изменения групп
+        timeout = min(timeout, settings.DATABASE_REPLICA_LAG)
+    cache.set(key, catalog, timeout)
+    return catalog
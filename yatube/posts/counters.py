@@ -0,0 +1,176 @@
+"""
+Денормализованные счетчики постов, комментариев и подписок.
+
+Счетчики меняются F-выражениями в момент создания и удаления
+объектов, поэтому страницы не считают COUNT(*) при отображении.
+Смена автора у существующего поста счетчики не переносит -
+такие расхождения исправляет reconcile(). Счетчик не опускается ниже
+нуля, даже если уже разошелся с реальным числом.
+
+У групп вместе с числом постов хранится дата последнего поста:
+из них собирается каталог групп (см. catalog). Посты не сбрасывают
+закэшированный каталог, он отстает от счетчиков не больше
+COUNT_STALENESS секунд.
+"""
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from core import counting
+from core.cache import invalidate
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+RECONCILE_BATCH_SIZE = 1000
+USER_COUNTERS = (
+    ('posts_count', Post, 'author'),
+    ('comments_count', Comment, 'author'),
+    ('followers_count', Follow, 'author'),
+    ('following_count', Follow, 'user'),
+)
+
+
+def get_user_stats(user):
+    """Счетчики пользователя; создает запись, если ее еще нет."""
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        return UserStats.objects.get_or_create(user=user)[0]
+
+
+def _add(field, delta):
+    # уменьшение разошедшегося нулевого счетчика нарушило бы
+    # ограничение PositiveIntegerField и сорвало удаление объекта
+    return Greatest(F(field) + delta, 0)
+
+
+def _change_user(user_id, delta, *fields):
+    UserStats.objects.filter(user_id=user_id).update(
+        **{field: _add(field, delta) for field in fields}
+    )
+
+
+def _last_post_date():
+    # последний пост группы находится по индексу (group, -pub_date)
+    return Subquery(
+        Post.objects.filter(group=OuterRef('pk')).order_by(
+            '-pub_date',
+        ).values('pub_date')[:1]
+    )
+
+
+def _change_group(group_id, delta):
+    if group_id is None:
+        return
+    Group.objects.filter(id=group_id).update(
+        posts_count=_add('posts_count', delta),
+        last_post_date=_last_post_date(),
+    )
+
+
+def post_added(post, delta=1):
+    with transaction.atomic():
+        _change_user(post.author_id, delta, 'posts_count')
+        _change_group(post.group_id, delta)
+
+
+def post_moved(post, group_id):
+    """Переносит пост в счетчиках из группы group_id в его группу."""
+    if group_id == post.group_id:
+        return
+    with transaction.atomic():
+        _change_group(group_id, -1)
+        _change_group(post.group_id, 1)
+
+
+def comment_added(comment, delta=1):
+    with transaction.atomic():
+        Post.objects.filter(id=comment.post_id).update(
+            comments_count=_add('comments_count', delta),
+        )
+        _change_user(comment.author_id, delta, 'comments_count')
+
+
+def follow_added(follow, delta=1):
+    with transaction.atomic():
+        _change_user(follow.author_id, delta, 'followers_count')
+        _change_user(follow.user_id, delta, 'following_count')
+
+
+def _real_count(model, field):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef('pk')}).order_by().values(
+                field,
+            ).annotate(total=Count('pk')).values('total')
+        ),
+        0,
+    )
+
+
+def _reconcile(queryset, counters):
+    """Исправляет записи, где счетчик разошелся с реальным числом."""
+    queryset = queryset.annotate(**{
+        f'real_{field}': _real_count(model, related)
+        for field, model, related in counters
+    })
+    in_sync = Q(**{
+        field: F(f'real_{field}') for field, model, related in counters
+    })
+    fixed = []
+    for obj in queryset.exclude(in_sync).iterator():
+        for field, model, related in counters:
+            setattr(obj, field, getattr(obj, f'real_{field}'))
+        fixed.append(obj)
+    fields = [field for field, model, related in counters]
+    queryset.model.objects.bulk_update(
+        fixed, fields, batch_size=RECONCILE_BATCH_SIZE,
+    )
+    return len(fixed)
+
+
+def _reconcile_last_post_dates():
+    # сравнение с NULL в SQL не истинно и не ложно, поэтому пустые даты
+    # проверяются отдельно
+    groups = Group.objects.annotate(real_last=_last_post_date()).filter(
+        Q(last_post_date__isnull=True, real_last__isnull=False)
+        | Q(last_post_date__isnull=False, real_last__isnull=True)
+        | ~Q(last_post_date=F('real_last'))
+    )
+    fixed = []
+    for group in groups.iterator():
+        group.last_post_date = group.real_last
+        fixed.append(group)
+    Group.objects.bulk_update(
+        fixed, ['last_post_date'], batch_size=RECONCILE_BATCH_SIZE,
+    )
+    return len(fixed)
+
+
+def reconcile():
+    """
+    Пересчитывает все счетчики по реальным данным и обновляет
+    статистику таблиц для оценок числа объектов (core.counting).
+    Возвращает число исправленных записей.
+    """
+    missing = User.objects.filter(stats__isnull=True).values_list(
+        'pk', flat=True,
+    )
+    UserStats.objects.bulk_create(
+        # размер пачки выбирает Django: явный batch_size не уменьшается
+        # до ограничений SQLite на число строк в одном INSERT
+        [UserStats(user_id=user_id) for user_id in missing],
+        ignore_conflicts=True,
+    )
+    fixed = _reconcile(UserStats.objects.all(), USER_COUNTERS)
+    fixed += _reconcile(
+        Post.objects.all(),
+        [('comments_count', Comment, 'post')],
+    )
+    fixed_groups = _reconcile(
+        Group.objects.all(),
+        [('posts_count', Post, 'group')],
+    ) + _reconcile_last_post_dates()
+    if fixed_groups:
+        invalidate('groups')
+    counting.analyze()
+    return fixed + fixed_groups
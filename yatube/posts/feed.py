@@ -0,0 +1,152 @@
+"""
+Материализованная лента подписок (fan-out on write).
+
+При публикации поста он раскладывается в FeedItem всех подписчиков
+автора, при подписке - в ленту подписчика добавляются посты автора.
+Посты авторов, у которых подписчиков больше
+FEED_FANOUT_FOLLOWERS_LIMIT, не раскладываются: такие авторы
+подмешиваются в ленту при чтении (fan-out on read).
+"""
+from itertools import islice
+
+from django.conf import settings
+from django.db import connections, router
+from django.db.models import Q, Sum
+
+from .models import FeedItem, Follow, Post, UserStats
+
+FEED_BATCH_SIZE = 1000
+
+
+def is_fanout_author(author_id):
+    """Автор раскладывает посты подписчикам при публикации."""
+    followers = UserStats.objects.filter(user_id=author_id).values_list(
+        'followers_count', flat=True,
+    ).first()
+    return (followers or 0) <= settings.FEED_FANOUT_FOLLOWERS_LIMIT
+
+
+def _bulk_create_items(items):
+    """Сохраняет записи ленты пачками, пропуская уже существующие."""
+    items = iter(items)
+    batch = list(islice(items, FEED_BATCH_SIZE))
+    while batch:
+        FeedItem.objects.bulk_create(batch, ignore_conflicts=True)
+        batch = list(islice(items, FEED_BATCH_SIZE))
+
+
+def fan_out_post(post):
+    """Раскладывает пост в ленты подписчиков автора."""
+    if not is_fanout_author(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id,
+    ).values_list('user_id', flat=True)
+    _bulk_create_items(
+        FeedItem(user_id=user_id, post=post, pub_date=post.pub_date)
+        for user_id in list(followers)
+    )
+
+
+def sync_post(post):
+    """Переносит пост в ленты подписчиков его нового автора."""
+    FeedItem.objects.filter(post=post).exclude(
+        user__follower__author_id=post.author_id,
+    ).delete()
+    fan_out_post(post)
+
+
+def fan_out_author(author_id, user_ids):
+    """Раскладывает все посты автора в ленты указанных читателей."""
+    posts = list(Post.objects.filter(
+        author_id=author_id,
+    ).values_list('id', 'pub_date'))
+    _bulk_create_items(
+        FeedItem(user_id=user_id, post_id=post_id, pub_date=pub_date)
+        for post_id, pub_date in posts
+        for user_id in user_ids
+    )
+
+
+def add_follow(follow):
+    """Заполняет ленту нового подписчика постами автора."""
+    if is_fanout_author(follow.author_id):
+        fan_out_author(follow.author_id, [follow.user_id])
+
+
+def remove_follow(follow):
+    """Убирает посты автора из ленты отписавшегося читателя."""
+    FeedItem.objects.filter(
+        user_id=follow.user_id,
+        post__author_id=follow.author_id,
+    ).delete()
+    followers = UserStats.objects.filter(
+        user_id=follow.author_id,
+    ).values_list('followers_count', flat=True).first()
+    if followers == settings.FEED_FANOUT_FOLLOWERS_LIMIT:
+        # автор только что перестал быть "популярным": его посты,
+        # опубликованные без раскладки, нужно разложить подписчикам
+        fan_out_author(
+            follow.author_id,
+            list(Follow.objects.filter(
+                author_id=follow.author_id,
+            ).values_list('user_id', flat=True)),
+        )
+
+
+def get_fanout_on_read_authors(user):
+    """Популярные авторы из подписок, чьи посты читаются напрямую."""
+    return list(
+        Follow.objects.filter(
+            user=user,
+            author__stats__followers_count__gt=(
+                settings.FEED_FANOUT_FOLLOWERS_LIMIT
+            ),
+        ).values_list('author_id', flat=True)
+    )
+
+
+def get_follow_feed(user):
+    """Посты ленты подписок пользователя."""
+    read_authors = get_fanout_on_read_authors(user)
+    if not read_authors:
+        return Post.objects.filter(
+            feed_items__user=user,
+        ).order_by('-feed_items__pub_date')
+    feed_posts = FeedItem.objects.filter(user=user).values('post_id')
+    return Post.objects.filter(
+        Q(id__in=feed_posts) | Q(author_id__in=read_authors)
+    )
+
+
+def estimate_follow_feed(user):
+    """Число постов ленты подписок по счетчикам постов авторов."""
+    return UserStats.objects.filter(
+        user__following__user=user,
+    ).aggregate(total=Sum('posts_count'))['total'] or 0
+
+
+def rebuild():
+    """
+    Пересобирает все ленты по подпискам, например после массовой
+    загрузки данных без сигналов. Возвращает число записей лент.
+    Записи вставляются одним INSERT ... SELECT, без загрузки в Python.
+    """
+    FeedItem.objects.all().delete()
+    items = Follow.objects.filter(
+        author__stats__followers_count__lte=(
+            settings.FEED_FANOUT_FOLLOWERS_LIMIT
+        ),
+        author__posts__isnull=False,
+    ).order_by().values_list(
+        'user_id', 'author__posts__id', 'author__posts__pub_date',
+    )
+    using = router.db_for_write(FeedItem)
+    sql, params = items.query.get_compiler(using).as_sql()
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {FeedItem._meta.db_table} '
+            f'(user_id, post_id, pub_date) {sql}',
+            params,
+        )
+    return FeedItem.objects.count()
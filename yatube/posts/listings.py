@@ -0,0 +1,35 @@
+"""
+Выборка постов для лент: главной, группы, профиля, подписок и поиска.
+
+Автор и группа загружаются тем же запросом, из таблиц читаются только
+колонки, которые показывает карточка поста (includes/post.html).
+Ленивая догрузка чего-либо еще у этих постов - ошибка
+(см. core.lazy_loads), поэтому страница ленты - постоянное число
+запросов независимо от числа постов на ней.
+"""
+from core.lazy_loads import strict
+from .models import Post
+
+LISTING_FIELDS = (
+    'id',
+    'text',
+    'pub_date',
+    'updated',
+    'image',
+    'author',
+    'author__username',
+    'author__first_name',
+    'author__last_name',
+    'group',
+    'group__title',
+    'group__slug',
+)
+
+
+def get_listing(posts=None):
+    """Посты для ленты; posts - исходная выборка (по умолчанию все)."""
+    if posts is None:
+        posts = Post.objects.all()
+    return strict(
+        posts.select_related('author', 'group').only(*LISTING_FIELDS)
+    )
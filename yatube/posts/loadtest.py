@@ -0,0 +1,217 @@
+"""
+Синтетическая нагрузка на страницы posts (команда load_test).
+
+Виртуальные пользователи в потоках без пауз выполняют сценарии
+в пропорциях TRAFFIC_MIX: читают ленты, посты и комментарии и изредка
+пишут комментарии. Посты, группы и авторы выбираются по закону Ципфа
+от самых популярных, как в настоящем трафике. Запросы выполняются
+тестовым клиентом Django в том же процессе или по HTTP к запущенному
+серверу, который работает с той же БД: сессии пользователей
+создаются в ней.
+"""
+import random
+import threading
+import time
+from itertools import accumulate
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+from urllib.request import HTTPRedirectHandler, Request, build_opener
+
+from django.conf import settings
+from django.db import connection
+from django.middleware.csrf import CSRF_SECRET_LENGTH
+from django.test import Client
+from django.urls import reverse
+from django.utils.crypto import get_random_string
+
+from .benchmark import percentile
+from .models import Group, Post, User
+from .seeding import zipf_weights
+
+TRAFFIC_MIX = {
+    'index': 25,
+    'follow_index': 15,
+    'group_list': 10,
+    'profile': 10,
+    'post_detail': 25,
+    'post_comments': 10,
+    'add_comment': 5,
+}
+# сценарии только для вошедших пользователей
+AUTHENTICATED_ONLY = ('follow_index', 'add_comment')
+ANONYMOUS_SHARE = 0.3
+TARGETS_LIMIT = 1000
+REQUEST_TIMEOUT = 30
+
+
+class ClientTransport:
+    """Запросы тестовым клиентом Django в том же процессе."""
+
+    def __init__(self, user):
+        self.client = Client()
+        if user is not None:
+            self.client.force_login(user)
+
+    def request(self, method, url, data=None):
+        return getattr(self.client, method)(url, data).status_code
+
+
+class _NoRedirect(HTTPRedirectHandler):
+    # замеряется сам запрос, а не страница после перенаправления
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class HttpTransport:
+    """Запросы по HTTP к серверу base_url."""
+
+    def __init__(self, base_url, user):
+        self.base_url = base_url.rstrip('/')
+        # CSRF-проверка принимает секрет из cookie, совпадающий с полем
+        self.csrf_token = get_random_string(CSRF_SECRET_LENGTH)
+        cookies = {settings.CSRF_COOKIE_NAME: self.csrf_token}
+        if user is not None:
+            client = Client()
+            client.force_login(user)
+            cookies[settings.SESSION_COOKIE_NAME] = client.cookies[
+                settings.SESSION_COOKIE_NAME
+            ].value
+        self.cookie = '; '.join(f'{name}={value}' for name, value in
+                                cookies.items())
+        self.opener = build_opener(_NoRedirect)
+
+    def request(self, method, url, data=None):
+        body = None
+        if method == 'post':
+            body = urlencode(
+                dict(data, csrfmiddlewaretoken=self.csrf_token),
+            ).encode()
+        request = Request(
+            self.base_url + url, data=body, headers={'Cookie': self.cookie},
+        )
+        try:
+            with self.opener.open(request, timeout=REQUEST_TIMEOUT) as resp:
+                resp.read()
+                return resp.status
+        except HTTPError as error:
+            return error.code
+
+
+def get_targets():
+    """Посты, группы, авторы и читатели по убыванию популярности."""
+    return {
+        'posts': list(Post.objects.order_by(
+            '-comments_count',
+        ).values_list('id', flat=True)[:TARGETS_LIMIT]),
+        'groups': list(Group.objects.order_by('-posts_count').values_list(
+            'slug', flat=True,
+        )[:TARGETS_LIMIT]),
+        'authors': list(User.objects.order_by(
+            '-stats__followers_count',
+        ).values_list('username', flat=True)[:TARGETS_LIMIT]),
+        'readers': list(User.objects.order_by(
+            '-stats__following_count',
+        )[:TARGETS_LIMIT]),
+    }
+
+
+def _make_request(name, choose):
+    """Метод, адрес и данные запроса сценария name."""
+    if name in ('index', 'follow_index'):
+        return 'get', reverse(f'posts:{name}'), None
+    target = {'group_list': 'groups', 'profile': 'authors'}.get(name, 'posts')
+    url = reverse(f'posts:{name}', args=[choose(target)])
+    if name == 'add_comment':
+        return 'post', url, {'text': 'Комментарий под нагрузкой'}
+    return 'get', url, None
+
+
+class _Stats:
+    """Время и ошибки запросов по сценариям, общие для потоков."""
+
+    def __init__(self):
+        self.stop = threading.Event()
+        self.lock = threading.Lock()
+        self.timings = {name: [] for name in TRAFFIC_MIX}
+        self.errors = {name: 0 for name in TRAFFIC_MIX}
+
+    def add(self, name, elapsed, ok):
+        with self.lock:
+            self.timings[name].append(elapsed * 1000)
+            if not ok:
+                self.errors[name] += 1
+
+
+def _user_loop(stats, transport, user, targets, random_seed):
+    rng = random.Random(random_seed)
+    names = [
+        name for name in TRAFFIC_MIX
+        if user is not None or name not in AUTHENTICATED_ONLY
+    ]
+    mix = list(accumulate(TRAFFIC_MIX[name] for name in names))
+    weights = {key: zipf_weights(len(values))
+               for key, values in targets.items()}
+
+    def choose(key):
+        return rng.choices(targets[key], cum_weights=weights[key])[0]
+
+    try:
+        while not stats.stop.is_set():
+            name = rng.choices(names, cum_weights=mix)[0]
+            method, url, data = _make_request(name, choose)
+            start = time.perf_counter()
+            try:
+                ok = transport.request(method, url, data) < 400
+            except Exception:
+                # любая ошибка view или соединения - неудачный запрос
+                ok = False
+            stats.add(name, time.perf_counter() - start, ok)
+    finally:
+        connection.close()
+
+
+def run(concurrency=8, duration=10, base_url=None, random_seed=0):
+    """
+    concurrency виртуальных пользователей duration секунд нагружают
+    приложение (по HTTP, если задан base_url). Возвращает пропускную
+    способность и задержку по сценариям.
+    """
+    rng = random.Random(random_seed)
+    targets = get_targets()
+    readers = targets.pop('readers')
+    stats = _Stats()
+    threads = []
+    for number in range(concurrency):
+        user = None
+        if readers and rng.random() >= ANONYMOUS_SHARE:
+            user = rng.choices(readers, cum_weights=zipf_weights(
+                len(readers),
+            ))[0]
+        if base_url:
+            transport = HttpTransport(base_url, user)
+        else:
+            transport = ClientTransport(user)
+        threads.append(threading.Thread(target=_user_loop, args=[
+            stats, transport, user, targets, random_seed + number,
+        ]))
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stats.stop.set()
+    for thread in threads:
+        thread.join()
+    scenarios = {
+        name: {
+            'requests': len(timings),
+            'errors': stats.errors[name],
+            'p50_ms': round(percentile(timings, 50), 2),
+            'p95_ms': round(percentile(timings, 95), 2),
+        }
+        for name, timings in stats.timings.items() if timings
+    }
+    total = sum(result['requests'] for result in scenarios.values())
+    return {
+        'requests_per_s': round(total / duration, 1),
+        'errors': sum(result['errors'] for result in scenarios.values()),
+        'scenarios': scenarios,
+    }
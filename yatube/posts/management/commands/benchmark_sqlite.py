@@ -0,0 +1,89 @@
+import json
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import (
+    override_settings,
+    setup_test_environment,
+    teardown_test_environment,
+)
+from django.urls import reverse
+
+from posts import benchmark
+from posts.models import Post, User
+
+PROFILES = {
+    'default': ({}, 0),
+    'production': (settings.PRODUCTION_SQLITE_PRAGMAS, 600),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет пропускную способность чтения главной страницы '
+        'под одновременной записью комментариев для профилей SQLite '
+        '(по умолчанию и продакшен: WAL и прагмы из settings)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--profile', choices=[*PROFILES, 'both'], default='both',
+        )
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--duration', type=float, default=5)
+        parser.add_argument('--posts', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        profiles = PROFILES if options['profile'] == 'both' else {
+            options['profile']: PROFILES[options['profile']],
+        }
+        volumes = dict(
+            benchmark.DEFAULT_VOLUMES,
+            posts=options['posts'],
+            comments=options['posts'],
+        )
+        setup_test_environment(debug=False)
+        try:
+            for name, (pragmas, conn_max_age) in profiles.items():
+                with override_settings(SQLITE_PRAGMAS=pragmas):
+                    result = self.run(volumes, conn_max_age, options)
+                self.stdout.write(f'{name}: {json.dumps(result)}')
+        finally:
+            teardown_test_environment()
+
+    def run(self, volumes, conn_max_age, options):
+        """
+        Замер на временной файловой БД: в памяти SQLite не использует
+        журнал и блокировки файла.
+        """
+        settings_dict = connection.settings_dict
+        old_name = settings_dict['NAME']
+        old_test_name = settings_dict['TEST']['NAME']
+        old_conn_max_age = settings_dict['CONN_MAX_AGE']
+        directory = tempfile.mkdtemp()
+        settings_dict['TEST']['NAME'] = os.path.join(directory, 'db.sqlite3')
+        settings_dict['CONN_MAX_AGE'] = conn_max_age
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False,
+        )
+        try:
+            benchmark.seed(volumes)
+            post = Post.objects.order_by('id').first()
+            return benchmark.run_concurrent(
+                reverse('posts:index'),
+                reverse('posts:add_comment', args=[post.id]),
+                User.objects.order_by('id')[:options['writers']],
+                readers=options['readers'],
+                duration=options['duration'],
+            )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            settings_dict['TEST']['NAME'] = old_test_name
+            settings_dict['CONN_MAX_AGE'] = old_conn_max_age
+            for file_name in os.listdir(directory):
+                os.remove(os.path.join(directory, file_name))
+            os.rmdir(directory)
@@ -0,0 +1,109 @@
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (
+    setup_test_environment,
+    teardown_test_environment,
+)
+
+from posts import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет число запросов, задержку и память страниц posts '
+        'на тестовой БД с заданными объемами данных и сравнивает '
+        'с базовыми значениями'
+    )
+
+    def add_arguments(self, parser):
+        for name, default in benchmark.DEFAULT_VOLUMES.items():
+            parser.add_argument(f'--{name}', type=int, default=default)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument(
+            '--threshold', type=float, default=0.5,
+            help='Допустимый рост времени и памяти (доля)',
+        )
+        parser.add_argument(
+            '--baseline', default=settings.BENCHMARK_BASELINE_FILE,
+        )
+        parser.add_argument(
+            '--update-baseline', action='store_true',
+            help='Записать результаты как новые базовые значения',
+        )
+        parser.add_argument(
+            '--with-timings', action='store_true',
+            help=(
+                'Записать в базовые значения и время с памятью: только '
+                'для своего файла --baseline на этой машине'
+            ),
+        )
+
+    def handle(self, *args, **options):
+        volumes = {
+            name: options[name] for name in benchmark.DEFAULT_VOLUMES
+        }
+        baseline = None
+        if not options['update_baseline']:
+            baseline = self.load_baseline(options['baseline'], volumes)
+
+        results = self.run(volumes, options['repeat'])
+        for name, result in results.items():
+            self.stdout.write(f'{name}: {json.dumps(result)}')
+
+        if options['update_baseline']:
+            if not options['with_timings']:
+                results = {
+                    name: {'queries': result['queries']}
+                    for name, result in results.items()
+                }
+            with open(options['baseline'], 'w') as baseline_file:
+                json.dump(
+                    {'volumes': volumes, 'views': results},
+                    baseline_file, indent=2, sort_keys=True,
+                )
+                baseline_file.write('\n')
+            self.stdout.write(self.style.SUCCESS('Базовые значения обновлены'))
+            return
+
+        regressions = benchmark.compare(
+            results, baseline['views'], options['threshold'],
+        )
+        if regressions:
+            raise CommandError('\n'.join(['Регрессии:'] + regressions))
+        self.stdout.write(self.style.SUCCESS('Регрессий нет'))
+
+    def load_baseline(self, path, volumes):
+        if not os.path.exists(path):
+            raise CommandError(
+                f'Нет файла {path}, запустите команду с --update-baseline'
+            )
+        with open(path) as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline['volumes'] != volumes:
+            raise CommandError(
+                f"Базовые значения сняты на объемах {baseline['volumes']}"
+            )
+        return baseline
+
+    def run(self, volumes, repeat):
+        """Замеры на временной тестовой БД, рабочая БД не меняется."""
+        old_name = connection.settings_dict['NAME']
+        setup_test_environment(debug=False)
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False,
+        )
+        try:
+            benchmark.seed(volumes)
+            missing = benchmark.get_missing_requests(benchmark.get_requests())
+            if missing:
+                raise CommandError(
+                    f"Нет сценария бенчмарка для {', '.join(missing)}"
+                )
+            return benchmark.run(repeat)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
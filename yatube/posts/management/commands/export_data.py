@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает группы, посты, комментарии или подписки '
+        'в JSON Lines или CSV'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', choices=list(transfer.MODELS))
+        parser.add_argument(
+            '--format', choices=transfer.FORMATS, default='jsonl',
+        )
+        parser.add_argument(
+            '--output', default='-', help='Файл или - для stdout',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=transfer.TRANSFER_BATCH_SIZE,
+        )
+
+    def handle(self, *args, **options):
+        if options['output'] == '-':
+            self.export(self.stdout, options)
+            return
+        with open(options['output'], 'w', newline='',
+                  encoding='utf-8') as stream:
+            count = self.export(stream, options)
+        self.stdout.write(self.style.SUCCESS(f'Выгружено записей: {count}'))
+
+    def export(self, stream, options):
+        return transfer.export_data(
+            options['name'], stream, options['format'],
+            chunk_size=options['chunk_size'],
+        )
@@ -0,0 +1,50 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает группы, посты, комментарии или подписки '
+        'из JSON Lines или CSV. Загружать в порядке groups, posts, '
+        'comments, follows'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', choices=list(transfer.MODELS))
+        parser.add_argument('path', help='Файл или - для stdin')
+        parser.add_argument(
+            '--format', choices=transfer.FORMATS, default='jsonl',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=transfer.TRANSFER_BATCH_SIZE,
+        )
+        parser.add_argument(
+            '--no-rebuild', action='store_true',
+            help=(
+                'Не пересобирать счетчики, ленты и поисковый индекс '
+                '(например, до загрузки последнего файла)'
+            ),
+        )
+
+    def handle(self, *args, **options):
+        try:
+            if options['path'] == '-':
+                count = self.load(sys.stdin, options)
+            else:
+                with open(options['path'], newline='',
+                          encoding='utf-8') as stream:
+                    count = self.load(stream, options)
+        except (transfer.TransferError, KeyError, ValueError) as error:
+            raise CommandError(f'Ошибка загрузки: {error}')
+        if not options['no_rebuild']:
+            transfer.finish_import()
+        self.stdout.write(self.style.SUCCESS(f'Прочитано записей: {count}'))
+
+    def load(self, stream, options):
+        return transfer.import_data(
+            options['name'], stream, options['format'],
+            batch_size=options['batch_size'],
+        )
@@ -0,0 +1,41 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import loadtest
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагружает страницы posts смесью запросов виртуальных '
+        'пользователей и выводит пропускную способность и задержку'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--duration', type=float, default=10)
+        parser.add_argument(
+            '--base-url',
+            help=(
+                'Адрес запущенного сервера, например http://127.0.0.1:8000; '
+                'по умолчанию запросы выполняются в этом процессе'
+            ),
+        )
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if not Post.objects.exists():
+            raise CommandError('Нет постов: сначала выполните seed_data')
+        result = loadtest.run(
+            concurrency=options['concurrency'],
+            duration=options['duration'],
+            base_url=options['base_url'],
+            random_seed=options['seed'],
+        )
+        for name, scenario in result['scenarios'].items():
+            self.stdout.write(f'{name}: {json.dumps(scenario)}')
+        self.stdout.write(
+            f"Запросов в секунду: {result['requests_per_s']}, "
+            f"ошибок: {result['errors']}"
+        )
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from posts.counters import reconcile
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счетчики постов, комментариев и подписок'
+
+    def handle(self, *args, **options):
+        fixed = reconcile()
+        self.stdout.write(
+            self.style.SUCCESS(f'Исправлено записей со счетчиками: {fixed}')
+        )
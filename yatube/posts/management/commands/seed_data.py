@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from posts import seeding
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет БД пользователями, группами, постами, комментариями '
+        'и подписками со степенным распределением активности'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--posts-per-user', type=int, default=20)
+        parser.add_argument('--comments-per-post', type=int, default=2)
+        parser.add_argument('--follows-per-user', type=int, default=10)
+        parser.add_argument(
+            '--groups', type=int, default=None,
+            help='По умолчанию - одна группа на 50 пользователей',
+        )
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='За сколько дней распределены даты постов',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        created = seeding.seed(
+            options['users'],
+            posts_per_user=options['posts_per_user'],
+            comments_per_post=options['comments_per_post'],
+            follows_per_user=options['follows_per_user'],
+            groups=options['groups'],
+            days=options['days'],
+            random_seed=options['seed'],
+        )
+        for name, count in created.items():
+            self.stdout.write(f'{name}: {count}')
+        self.stdout.write(self.style.SUCCESS('БД заполнена'))
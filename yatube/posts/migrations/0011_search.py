@@ -0,0 +1,228 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:57
+
+import re
+from collections import Counter
+from itertools import islice
+
+from django.db import DatabaseError, migrations, models, transaction
+import django.db.models.deletion
+
+FTS_TABLE = 'posts_post_fts'
+BATCH_SIZE = 1000
+
+# Копия core.stemmer на момент миграции: дальнейшие изменения стеммера
+# не должны менять то, что создает эта миграция. Индекс, собранный
+# другой версией стеммера, обновляет команда rebuild_search_index
+VOWELS = 'аеиоуыэюя'
+WORD_RE = re.compile(r'\w+')
+CYRILLIC_RE = re.compile(r'[а-яё]+')
+
+PERFECTIVE_GERUND = (
+    ('в', 'вши', 'вшись'),
+    ('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись'),
+)
+ADJECTIVE = (
+    (),
+    (
+        'ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем',
+        'им', 'ым', 'ом', 'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую', 'юю',
+        'ая', 'яя', 'ою', 'ею',
+    ),
+)
+PARTICIPLE = (
+    ('ем', 'нн', 'вш', 'ющ', 'щ'),
+    ('ивш', 'ывш', 'ующ'),
+)
+REFLEXIVE = ((), ('ся', 'сь'))
+VERB = (
+    (
+        'ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но',
+        'ет', 'ют', 'ны', 'ть', 'ешь', 'нно',
+    ),
+    (
+        'ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей', 'уй',
+        'ил', 'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено', 'ят', 'ует', 'уют',
+        'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю',
+    ),
+)
+NOUN = (
+    (),
+    (
+        'а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии',
+        'и', 'ией', 'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием', 'ем', 'ам',
+        'ом', 'о', 'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю', 'ия',
+        'ья', 'я',
+    ),
+)
+DERIVATIONAL = ((), ('ост', 'ость'))
+SUPERLATIVE = ((), ('ейш', 'ейше'))
+
+
+def _skip(word, position, vowels):
+    """Позиция после первой буквы (гласной или согласной) от position."""
+    while position < len(word):
+        position += 1
+        if (word[position - 1] in VOWELS) == vowels:
+            return position
+    return None
+
+
+def _regions(word):
+    """Начала областей RV и R2."""
+    rv = _skip(word, 0, True)
+    if rv is None:
+        return len(word), len(word)
+    position = rv
+    for vowels in (False, True, False):
+        position = _skip(word, position, vowels)
+        if position is None:
+            return rv, len(word)
+    return rv, position
+
+
+def _remove(word, start, endings):
+    """
+    Снимает самое длинное из окончаний, лежащее в области от start.
+    Возвращает None, если подходящего окончания нет.
+    """
+    after_a, plain = endings
+    matched = max(
+        (
+            ending for ending in after_a + plain
+            if word.endswith(ending) and len(word) - len(ending) >= start
+        ),
+        key=len,
+        default=None,
+    )
+    if matched is None:
+        return None
+    stem = word[:-len(matched)]
+    if matched in after_a and (
+        not stem.endswith(('а', 'я')) or len(stem) - 1 < start
+    ):
+        return None
+    return stem
+
+
+def _remove_adjectival(word, start):
+    stem = _remove(word, start, ADJECTIVE)
+    if stem is None:
+        return None
+    return _remove(stem, start, PARTICIPLE) or stem
+
+
+def stem(word):
+    """Основа русского слова."""
+    word = word.lower().replace('ё', 'е')
+    rv, r2 = _regions(word)
+
+    result = _remove(word, rv, PERFECTIVE_GERUND)
+    if result is None:
+        word = _remove(word, rv, REFLEXIVE) or word
+        result = (
+            _remove_adjectival(word, rv)
+            or _remove(word, rv, VERB)
+            or _remove(word, rv, NOUN)
+        )
+    word = result or word
+
+    if word.endswith('и') and len(word) - 1 >= rv:
+        word = word[:-1]
+    word = _remove(word, r2, DERIVATIONAL) or word
+
+    superlative = _remove(word, rv, SUPERLATIVE)
+    if superlative is not None:
+        word = superlative
+    if word.endswith('нн') and len(word) - 2 >= rv:
+        word = word[:-1]
+    elif superlative is None and word.endswith('ь') and len(word) - 1 >= rv:
+        word = word[:-1]
+    return word
+
+
+def get_terms(text):
+    """Основы слов текста в порядке появления."""
+    return [
+        stem(word) if CYRILLIC_RE.fullmatch(word) else word
+        for word in WORD_RE.findall(text.lower())
+    ]
+
+
+def create_search_index(apps, schema_editor):
+    """
+    На SQLite с FTS5 создает полнотекстовый индекс, на остальных СУБД
+    заполняет таблицу SearchTerm. Индексируются уже существующие посты.
+    """
+    Post = apps.get_model('posts', 'Post')
+    SearchTerm = apps.get_model('posts', 'SearchTerm')
+    connection = schema_editor.connection
+    posts = Post.objects.values_list('id', 'text').iterator(
+        chunk_size=BATCH_SIZE,
+    )
+    if connection.vendor == 'sqlite':
+        try:
+            with transaction.atomic(using=connection.alias):
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        f'CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5('
+                        f"body, tokenize='unicode61 remove_diacritics 0')"
+                    )
+                    batch = list(islice(posts, BATCH_SIZE))
+                    while batch:
+                        cursor.executemany(
+                            f'INSERT INTO {FTS_TABLE}(rowid, body) '
+                            f'VALUES (%s, %s)',
+                            [
+                                (post_id, ' '.join(get_terms(text)))
+                                for post_id, text in batch
+                            ],
+                        )
+                        batch = list(islice(posts, BATCH_SIZE))
+            return
+        except DatabaseError:
+            # SQLite собран без FTS5
+            pass
+    terms = []
+    for post_id, text in posts:
+        frequencies = Counter(term[:100] for term in get_terms(text))
+        terms.extend(
+            SearchTerm(post_id=post_id, term=term, frequency=frequency)
+            for term, frequency in frequencies.items()
+        )
+        if len(terms) >= BATCH_SIZE:
+            SearchTerm.objects.bulk_create(terms)
+            terms = []
+    SearchTerm.objects.bulk_create(terms)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_post_updated'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=100, verbose_name='Основа слова')),
+                ('frequency', models.PositiveIntegerField(verbose_name='Число вхождений')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='posts.Post', verbose_name='Публикация')),
+            ],
+            options={
+                'verbose_name': 'Запись поискового индекса',
+                'verbose_name_plural': 'Записи поискового индекса',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='searchterm',
+            constraint=models.UniqueConstraint(fields=('term', 'post'), name='unique_search_term'),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
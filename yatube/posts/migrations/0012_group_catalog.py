@@ -0,0 +1,46 @@
+# Generated by Django 2.2.16 on 2026-10-18 05:57
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_groups(apps, schema_editor):
+    """Считает посты и дату последнего поста существующих групп."""
+    Group = apps.get_model('posts', 'Group')
+    Post = apps.get_model('posts', 'Post')
+    posts = Post.objects.filter(group=OuterRef('pk')).order_by()
+    Group.objects.update(
+        posts_count=Coalesce(
+            Subquery(
+                posts.values('group').annotate(
+                    total=Count('pk'),
+                ).values('total')
+            ),
+            0,
+        ),
+        last_post_date=Subquery(
+            posts.order_by('-pub_date').values('pub_date')[:1]
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='group',
+            name='last_post_date',
+            field=models.DateTimeField(editable=False, null=True, verbose_name='Дата последнего поста'),
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='posts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество постов'),
+        ),
+        migrations.RunPython(fill_groups, migrations.RunPython.noop),
+    ]
@@ -8,6 +8,16 @@ class Group(models.Model):
     title = models.CharField(max_length=200, verbose_name='Название группы')
     slug = models.SlugField(max_length=20, unique=True)
     description = models.TextField(verbose_name='Описание группы')
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество постов',
+    )
+    last_post_date = models.DateTimeField(
+        null=True,
+        editable=False,
+        verbose_name='Дата последнего поста',
+    )
 
     def __str__(self):
         return self.title
@@ -27,6 +37,10 @@ class Post(models.Model):
         auto_now_add=True,
         verbose_name='Дата публикации поста',
     )
+    updated = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения поста',
+    )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -48,6 +62,11 @@ class Post(models.Model):
         blank=True,
         help_text='Изображение прикрепленное к посту'
     )
+    comments_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество комментариев',
+    )
 
     def __str__(self):
         return self.text[:15]
@@ -56,6 +75,16 @@ class Post(models.Model):
         ordering = ['-pub_date']
         verbose_name = 'Публикация'
         verbose_name_plural = 'Публикации'
+        indexes = [
+            models.Index(
+                fields=['author', '-pub_date'],
+                name='post_author_pub_date_idx',
+            ),
+            models.Index(
+                fields=['group', '-pub_date'],
+                name='post_group_pub_date_idx',
+            ),
+        ]
 
 
 class Comment(models.Model):
@@ -85,6 +114,12 @@ class Comment(models.Model):
         ordering = ['-created']
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(
+                fields=['post', '-created'],
+                name='comment_post_created_idx',
+            ),
+        ]
 
 
 class Follow(models.Model):
@@ -101,3 +136,119 @@ class Follow(models.Model):
         related_name='following',
         verbose_name='Автор'
     )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'],
+                name='unique_follow',
+            ),
+        ]
+
+
+class FeedItem(models.Model):
+    """
+    Запись материализованной ленты подписок: пост автора,
+    на которого подписан пользователь. Заполняется при публикации
+    поста и при подписке (fan-out on write).
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_items',
+        verbose_name='Читатель',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='feed_items',
+        verbose_name='Публикация',
+    )
+    pub_date = models.DateTimeField(
+        verbose_name='Дата публикации поста',
+    )
+
+    class Meta:
+        ordering = ['-pub_date']
+        verbose_name = 'Запись ленты подписок'
+        verbose_name_plural = 'Записи ленты подписок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_feed_item',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date'],
+                name='feed_user_pub_date_idx',
+            ),
+        ]
+
+
+class UserStats(models.Model):
+    """
+    Денормализованные счетчики пользователя. Обновляются сигналами
+    при создании и удалении постов, комментариев и подписок,
+    расхождения исправляет команда reconcile_counters.
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Пользователь',
+    )
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество постов',
+    )
+    comments_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество комментариев',
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество подписчиков',
+    )
+    following_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество подписок',
+    )
+
+    def __str__(self):
+        return str(self.user)
+
+    class Meta:
+        verbose_name = 'Счетчики пользователя'
+        verbose_name_plural = 'Счетчики пользователей'
+
+
+class SearchTerm(models.Model):
+    """
+    Запись обратного индекса поиска: основа слова и число ее вхождений
+    в текст поста. Используется, когда БД не поддерживает FTS5.
+    """
+    term = models.CharField(
+        max_length=100,
+        verbose_name='Основа слова',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='search_terms',
+        verbose_name='Публикация',
+    )
+    frequency = models.PositiveIntegerField(
+        verbose_name='Число вхождений',
+    )
+
+    class Meta:
+        verbose_name = 'Запись поискового индекса'
+        verbose_name_plural = 'Записи поискового индекса'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['term', 'post'],
+                name='unique_search_term',
+            ),
+        ]
@@ -0,0 +1,228 @@
+"""
+Полнотекстовый поиск по постам.
+
+Текст поста разбивается на слова, русские слова приводятся к основе
+стеммером Snowball. На SQLite основы хранятся в виртуальной таблице
+FTS5 и ранжируются по bm25, на остальных СУБД - в обратном индексе
+SearchTerm с ранжированием tf-idf. Индекс обновляется сигналами
+сохранения и удаления постов, полностью пересобирается командой
+rebuild_search_index.
+"""
+import math
+from collections import Counter, defaultdict
+
+from django.db import connections, router, transaction
+from django.db.models import Count
+
+from core.stemmer import get_terms
+from .listings import get_listing
+from .models import Post, SearchTerm
+
+FTS_TABLE = 'posts_post_fts'
+SEARCH_RESULTS_LIMIT = 1000
+INDEX_BATCH_SIZE = 1000
+TERM_MAX_LENGTH = SearchTerm._meta.get_field('term').max_length
+
+_fts_available = {}
+
+
+def _get_frequencies(text):
+    return Counter(term[:TERM_MAX_LENGTH] for term in get_terms(text))
+
+
+class FTSIndex:
+    """Индекс в виртуальной таблице SQLite FTS5, rowid - id поста."""
+
+    def __init__(self, using):
+        self.connection = connections[using]
+
+    def remove(self, post_ids):
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                [(post_id,) for post_id in post_ids],
+            )
+
+    def add(self, posts):
+        """Индексирует пары (id, текст) вместо прежних записей."""
+        posts = list(posts)
+        self.remove(post_id for post_id, text in posts)
+        self.insert(posts)
+
+    def insert(self, posts):
+        """Индексирует пары (id, текст), которых еще нет в индексе."""
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE}(rowid, body) VALUES (%s, %s)',
+                [
+                    (post_id, ' '.join(get_terms(text)))
+                    for post_id, text in posts
+                ],
+            )
+
+    def clear(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+
+    @staticmethod
+    def _match(terms):
+        # каждая основа в кавычках: синтаксис запроса FTS5 не нужен
+        return ' '.join(f'"{term}"' for term in terms)
+
+    def search(self, terms, limit):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+                f'ORDER BY bm25({FTS_TABLE}), rowid DESC LIMIT %s',
+                [self._match(terms), limit],
+            )
+            return [post_id for post_id, in cursor.fetchall()]
+
+    def filter(self, queryset, terms):
+        """Посты queryset со всеми основами, отобранные подзапросом."""
+        # RawSQL в id__in Django 2.2 берет в двойные скобки, и SQLite
+        # читает из подзапроса только первую строку
+        post_id = '.'.join(
+            self.connection.ops.quote_name(name)
+            for name in (queryset.model._meta.db_table, 'id')
+        )
+        return queryset.extra(
+            where=[
+                f'{post_id} IN (SELECT rowid FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s)',
+            ],
+            params=[self._match(terms)],
+        )
+
+
+class TermIndex:
+    """Обратный индекс в таблице SearchTerm."""
+
+    def remove(self, post_ids):
+        SearchTerm.objects.filter(post_id__in=list(post_ids)).delete()
+
+    def add(self, posts):
+        posts = list(posts)
+        self.remove(post_id for post_id, text in posts)
+        self.insert(posts)
+
+    def insert(self, posts):
+        SearchTerm.objects.bulk_create(
+            [
+                SearchTerm(post_id=post_id, term=term, frequency=frequency)
+                for post_id, text in posts
+                for term, frequency in _get_frequencies(text).items()
+            ],
+            batch_size=INDEX_BATCH_SIZE,
+        )
+
+    def clear(self):
+        SearchTerm.objects.all().delete()
+
+    def search(self, terms, limit):
+        """Посты со всеми основами, по убыванию tf-idf."""
+        postings = SearchTerm.objects.filter(term__in=terms).values_list(
+            'term', 'post_id', 'frequency',
+        )
+        frequencies = defaultdict(dict)
+        documents = Counter()
+        for term, post_id, frequency in postings:
+            frequencies[post_id][term] = frequency
+            documents[term] += 1
+        total = Post.objects.count()
+        scores = {
+            post_id: sum(
+                (1 + math.log(frequency))
+                * math.log(1 + total / documents[term])
+                for term, frequency in post_terms.items()
+            )
+            for post_id, post_terms in frequencies.items()
+            if len(post_terms) == len(terms)
+        }
+        ranked = sorted(scores, key=lambda post: (-scores[post], -post))
+        return ranked[:limit]
+
+    def filter(self, queryset, terms):
+        """Посты queryset со всеми основами, отобранные подзапросом."""
+        post_ids = SearchTerm.objects.filter(term__in=terms).values(
+            'post_id',
+        ).annotate(
+            matched=Count('term'),
+        ).filter(matched=len(terms)).values('post_id')
+        return queryset.filter(id__in=post_ids)
+
+
+def get_index(using=None):
+    """
+    Индекс БД using (по умолчанию - БД для записи): FTS5, если таблица
+    индекса создана миграцией.
+    """
+    using = using or router.db_for_write(SearchTerm)
+    if using not in _fts_available:
+        connection = connections[using]
+        _fts_available[using] = (
+            connection.vendor == 'sqlite'
+            and FTS_TABLE in connection.introspection.table_names()
+        )
+    return FTSIndex(using) if _fts_available[using] else TermIndex()
+
+
+def get_query_terms(query):
+    """Уникальные основы слов запроса."""
+    return list(dict.fromkeys(
+        term[:TERM_MAX_LENGTH] for term in get_terms(query)
+    ))
+
+
+def index_post(post):
+    get_index().add([(post.id, post.text)])
+
+
+def remove_post(post_id):
+    get_index().remove([post_id])
+
+
+def rebuild_index():
+    """Пересобирает индекс по всем постам, возвращает их число."""
+    using = router.db_for_write(SearchTerm)
+    index = get_index(using)
+    index.clear()
+    posts = Post.objects.order_by().values_list('id', 'text')
+    indexed = 0
+    batch = []
+    for post in posts.iterator(chunk_size=INDEX_BATCH_SIZE):
+        batch.append(post)
+        if len(batch) == INDEX_BATCH_SIZE:
+            # одна транзакция на пачку, а не на каждую строку
+            with transaction.atomic(using=using):
+                index.insert(batch)
+            indexed += len(batch)
+            batch = []
+    with transaction.atomic(using=using):
+        index.insert(batch)
+    return indexed + len(batch)
+
+
+def search_posts(query, limit=SEARCH_RESULTS_LIMIT):
+    """Id постов, подходящих под запрос, от самых релевантных."""
+    terms = get_query_terms(query)
+    if not terms:
+        return []
+    return get_index(router.db_for_read(SearchTerm)).search(terms, limit)
+
+
+def filter_posts(queryset, query):
+    """
+    Посты queryset, подходящие под запрос, без ранжирования: индекс
+    читается подзапросом, а не списком id в параметрах.
+    """
+    terms = get_query_terms(query)
+    if not terms:
+        return queryset.none()
+    return get_index(queryset.db).filter(queryset, terms)
+
+
+def get_posts(post_ids):
+    """Посты с указанными id в том же порядке."""
+    posts = get_listing().in_bulk(post_ids)
+    return [posts[post_id] for post_id in post_ids if post_id in posts]
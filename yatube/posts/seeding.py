@@ -0,0 +1,172 @@
+"""
+Заполнение БД правдоподобными данными (команда seed_data).
+
+Активность пользователей распределена по степенному закону, как
+в настоящих соцсетях: немногие авторы пишут большую часть постов
+и собирают большую часть подписчиков, немногие посты собирают
+большую часть комментариев, число подписок пользователя распределено
+по Парето. Даты постов разбросаны по последним days дням,
+комментарии в основном появляются вскоре после поста.
+"""
+import random
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.utils import timezone
+from faker import Faker
+
+from .models import Comment, Follow, Group, Post, User
+from .transfer import finish_import, insert_dated
+
+SEED_BATCH_SIZE = 1000
+VOCABULARY_SIZE = 2000
+# показатель закона Ципфа для популярности авторов, групп и постов
+ZIPF_EXPONENT = 1.1
+# показатель распределения Парето для числа подписок пользователя
+FOLLOWS_ALPHA = 1.5
+# доля постов вне групп
+NO_GROUP_SHARE = 0.3
+
+
+def bulk_create(model, objects, dated=False):
+    """
+    Сохраняет объекты пачками без сигналов. dated - даты объектов
+    сохраняются вместо текущего времени.
+    """
+    def insert(batch):
+        if dated:
+            insert_dated(model, batch)
+        else:
+            model.objects.bulk_create(batch, ignore_conflicts=True)
+
+    batch = []
+    for obj in objects:
+        batch.append(obj)
+        if len(batch) == SEED_BATCH_SIZE:
+            insert(batch)
+            batch = []
+    insert(batch)
+
+
+def get_vocabulary(random_seed=0):
+    """Русские слова для текстов постов и комментариев."""
+    Faker.seed(random_seed)
+    return Faker('ru_RU').words(VOCABULARY_SIZE)
+
+
+def zipf_weights(count, exponent=ZIPF_EXPONENT):
+    """Накопленные веса рангов 1..count для random.choices."""
+    return list(accumulate(
+        1 / rank ** exponent for rank in range(1, count + 1)
+    ))
+
+
+def seed(users, posts_per_user=20, comments_per_post=2, follows_per_user=10,
+         groups=None, days=365, random_seed=0):
+    """
+    Создает users пользователей и в среднем posts_per_user постов,
+    comments_per_post комментариев на пост и follows_per_user подписок
+    на пользователя. Затем пересобирает счетчики, ленты и поисковый
+    индекс. Возвращает число созданных объектов по моделям.
+    """
+    rng = random.Random(random_seed)
+    words = get_vocabulary(random_seed)
+    fake = Faker('ru_RU')
+    now = timezone.now()
+
+    def text(mean_words):
+        words_count = max(1, int(rng.lognormvariate(0, 0.7) * mean_words))
+        return ' '.join(rng.choices(words, k=words_count))
+
+    bulk_create(User, (
+        User(
+            username=f'{fake.user_name()}{number}',
+            first_name=fake.first_name(),
+            last_name=fake.last_name(),
+            password=make_password(None),
+        )
+        for number in range(users)
+    ))
+    groups = max(1, users // 50) if groups is None else groups
+    bulk_create(Group, (
+        Group(
+            title=fake.sentence(nb_words=2).rstrip('.'),
+            slug=f'group{number}',
+            description=text(15),
+        )
+        for number in range(groups)
+    ))
+    # ранги популярности: первые в списках - самые активные. Самые
+    # читаемые авторы - не обязательно самые пишущие
+    user_ids = list(User.objects.values_list('id', flat=True))
+    rng.shuffle(user_ids)
+    user_weights = zipf_weights(len(user_ids))
+    followed_ids = user_ids.copy()
+    rng.shuffle(followed_ids)
+    group_ids = list(Group.objects.values_list('id', flat=True))
+    rng.shuffle(group_ids)
+    group_weights = zipf_weights(len(group_ids))
+
+    def post(author_id):
+        group_id = None
+        if group_ids and rng.random() >= NO_GROUP_SHARE:
+            group_id = rng.choices(group_ids, cum_weights=group_weights)[0]
+        pub_date = now - timedelta(days=rng.uniform(0, days))
+        return Post(
+            text=text(30),
+            author_id=author_id,
+            group_id=group_id,
+            pub_date=pub_date,
+            updated=pub_date,
+        )
+
+    bulk_create(Post, (
+        post(author_id) for author_id in rng.choices(
+            user_ids, cum_weights=user_weights,
+            k=users * posts_per_user,
+        )
+    ), dated=True)
+
+    follows_scale = follows_per_user * (FOLLOWS_ALPHA - 1) / FOLLOWS_ALPHA
+
+    def follows(user_id):
+        count = min(
+            len(user_ids) - 1,
+            int(follows_scale * rng.paretovariate(FOLLOWS_ALPHA)),
+        )
+        authors = set(rng.choices(followed_ids, cum_weights=user_weights,
+                                  k=count))
+        authors.discard(user_id)
+        return (
+            Follow(user_id=user_id, author_id=author) for author in authors
+        )
+
+    bulk_create(Follow, (
+        follow for user_id in user_ids for follow in follows(user_id)
+    ))
+
+    posts = list(Post.objects.values_list('id', 'pub_date'))
+    rng.shuffle(posts)
+
+    def comment(post_id, pub_date):
+        # большая часть комментариев появляется вскоре после поста
+        created = pub_date + (now - pub_date) * rng.random() ** 4
+        return Comment(
+            post_id=post_id,
+            author_id=rng.choices(user_ids, cum_weights=user_weights)[0],
+            text=text(12),
+            created=created,
+        )
+
+    bulk_create(Comment, (
+        comment(*post) for post in rng.choices(
+            posts, cum_weights=zipf_weights(len(posts)),
+            k=len(posts) * comments_per_post if posts else 0,
+        )
+    ), dated=True)
+    finish_import()
+    return {
+        model._meta.model_name: model.objects.count()
+        for model in (User, Group, Post, Comment, Follow)
+    }
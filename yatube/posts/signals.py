@@ -0,0 +1,155 @@
+from django.db import transaction
+from django.db.models.signals import (
+    post_delete,
+    post_init,
+    post_save,
+    pre_delete,
+)
+from django.dispatch import receiver
+
+from core.cache import invalidate_on_commit
+from . import counters, feed, search, thumbnails
+from .cache_tags import (
+    group_card_tag,
+    invalidate_post_pages,
+    profile_tags,
+    user_card_tag,
+)
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+
+@receiver(post_init, sender=Post)
+def post_loaded(sender, instance, **kwargs):
+    # автор и группа до редактирования нужны для инвалидации их страниц.
+    # Отложенные поля (only, defer) не читаются: их чтение само создает
+    # объект модели и снова вызывает этот обработчик
+    data = instance.__dict__
+    instance._initial_relations = (data.get('author_id'), data.get('group_id'))
+    image = data.get('image')
+    instance._initial_image = getattr(image, 'name', image)
+
+
+@receiver(post_init, sender=Group)
+def group_loaded(sender, instance, **kwargs):
+    instance._initial_slug = instance.__dict__.get('slug')
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, raw=False,
+               update_fields=None, **kwargs):
+    if raw:
+        return
+    if created:
+        UserStats.objects.get_or_create(user=instance)
+    elif update_fields != frozenset({'last_login'}):
+        # имя автора есть в кэшированных карточках его постов
+        invalidate_on_commit(
+            'posts',
+            f'profile:{instance.username}',
+            user_card_tag(instance.id),
+        )
+
+
+# счетчики, ленты и поиск меняются в одной транзакции (внутри
+# транзакции вызывающего кода, если она есть): ошибка откатывает все.
+# Кэш страниц сбрасывается и после фиксации: параллельный запрос мог
+# закэшировать под новыми версиями тегов еще старые данные
+@receiver(post_save, sender=Post)
+@transaction.atomic
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    author_id, group_id = instance._initial_relations
+    if created:
+        counters.post_added(instance)
+        feed.fan_out_post(instance)
+    else:
+        counters.post_moved(instance, group_id)
+        if instance.author_id != author_id:
+            feed.sync_post(instance)
+    search.index_post(instance)
+    if instance.image and instance.image.name != instance._initial_image:
+        thumbnails.schedule_thumbnail(instance)
+    invalidate_post_pages(
+        instance.id,
+        {author_id, instance.author_id},
+        {group_id, instance.group_id},
+    )
+    instance._initial_relations = (instance.author_id, instance.group_id)
+    instance._initial_image = instance.image.name
+
+
+@receiver(post_delete, sender=Post)
+@transaction.atomic
+def post_deleted(sender, instance, **kwargs):
+    counters.post_added(instance, delta=-1)
+    search.remove_post(instance.id)
+    invalidate_post_pages(
+        instance.id,
+        [instance.author_id],
+        [instance.group_id],
+    )
+
+
+@receiver(post_save, sender=Comment)
+@transaction.atomic
+def comment_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        counters.comment_added(instance)
+    invalidate_on_commit(f'post:{instance.post_id}')
+
+
+@receiver(post_delete, sender=Comment)
+@transaction.atomic
+def comment_deleted(sender, instance, **kwargs):
+    counters.comment_added(instance, delta=-1)
+    invalidate_on_commit(f'post:{instance.post_id}')
+
+
+def invalidate_group(group):
+    # название группы есть в кэшированных карточках ее постов
+    authors = group.posts.values_list('author_id', flat=True).distinct()
+    invalidate_on_commit(
+        'posts',
+        'groups',
+        f'group:{group._initial_slug}',
+        f'group:{group.slug}',
+        group_card_tag(group.id),
+        *profile_tags(authors),
+    )
+    group._initial_slug = group.slug
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate_group(instance)
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    # после удаления связь постов с группой уже обнулена
+    invalidate_group(instance)
+
+
+@receiver(post_save, sender=Follow)
+@transaction.atomic
+def follow_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.follow_added(instance)
+        feed.add_follow(instance)
+        invalidate_on_commit(
+            *profile_tags([instance.user_id, instance.author_id]),
+        )
+
+
+@receiver(post_delete, sender=Follow)
+@transaction.atomic
+def follow_deleted(sender, instance, **kwargs):
+    counters.follow_added(instance, delta=-1)
+    feed.remove_follow(instance)
+    invalidate_on_commit(
+        *profile_tags([instance.user_id, instance.author_id]),
+    )
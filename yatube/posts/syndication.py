@@ -0,0 +1,174 @@
+"""
+Ленты RSS и Atom: все посты, посты сообщества и посты автора.
+
+Лента отдается потоком: посты (не больше FEED_ITEMS_LIMIT) читаются
+внутри view одним запросом к одной БД, а XML записывается в ответ
+по одному посту и целиком в памяти не собирается. Готовая лента
+кэшируется (core.cache.cache_stream) до изменения постов: повторный
+запрос читает ее из кэша, а с тем же ETag получает 304.
+"""
+import io
+
+from django.http import Http404, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.feedgenerator import (
+    Atom1Feed,
+    Rss201rev2Feed,
+    SimplerXMLGenerator,
+)
+from django.utils.text import Truncator
+
+from core.cache import cache_stream
+from core.replicas import replica_reads
+from .listings import get_listing
+from .models import Group, Post, User
+
+FEED_ITEMS_LIMIT = 50
+FEED_TITLE_LEN_WORDS = 10
+FEED_ENCODING = 'utf-8'
+
+
+class StreamingFeedMixin:
+    """Запись ленты по частям: заголовок, посты по одному, окончание."""
+
+    def stream(self, items, latest_date):
+        """Части XML ленты; items - словари для add_item."""
+        self.latest_date = latest_date
+        buffer = io.StringIO()
+        handler = SimplerXMLGenerator(buffer, FEED_ENCODING)
+
+        def flush():
+            chunk = buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            return chunk
+
+        self.start_feed(handler)
+        yield flush()
+        for item in items:
+            self.items = []
+            self.add_item(**item)
+            self.write_items(handler)
+            yield flush()
+        self.end_feed(handler)
+        yield flush()
+
+    def latest_post_date(self):
+        return self.latest_date or super().latest_post_date()
+
+
+class StreamingRssFeed(StreamingFeedMixin, Rss201rev2Feed):
+
+    def start_feed(self, handler):
+        handler.startDocument()
+        handler.startElement('rss', self.rss_attributes())
+        handler.startElement('channel', self.root_attributes())
+        self.add_root_elements(handler)
+
+    def end_feed(self, handler):
+        self.endChannelElement(handler)
+        handler.endElement('rss')
+
+
+class StreamingAtomFeed(StreamingFeedMixin, Atom1Feed):
+
+    def start_feed(self, handler):
+        handler.startDocument()
+        handler.startElement('feed', self.root_attributes())
+        self.add_root_elements(handler)
+
+    def end_feed(self, handler):
+        handler.endElement('feed')
+
+
+FEED_FORMATS = {
+    'rss': StreamingRssFeed,
+    'atom': StreamingAtomFeed,
+}
+
+
+def _author_name(user):
+    return user.get_full_name() or user.username
+
+
+def _item(request, post):
+    link = request.build_absolute_uri(
+        reverse('posts:post_detail', args=[post.id]),
+    )
+    return {
+        'title': Truncator(post.text).words(FEED_TITLE_LEN_WORDS),
+        'link': link,
+        'description': post.text,
+        'unique_id': link,
+        'author_name': _author_name(post.author),
+        'pubdate': post.pub_date,
+        'updateddate': post.updated,
+        'categories': [post.group.title] if post.group else (),
+    }
+
+
+def feed_response(request, feed_format, posts, title, link, description):
+    """Потоковый ответ с лентой последних постов из posts."""
+    feed_class = FEED_FORMATS.get(feed_format)
+    if feed_class is None:
+        raise Http404('Неизвестный формат ленты')
+    feed = feed_class(
+        title=title,
+        link=request.build_absolute_uri(link),
+        description=description,
+        language='ru',
+        feed_url=request.build_absolute_uri(),
+    )
+    # посты читаются внутри view: после него ReplicaMiddleware уже
+    # не выбирает реплику, и лента смешала бы данные разных БД
+    posts = list(
+        get_listing(posts).order_by('-pub_date', '-id')[:FEED_ITEMS_LIMIT]
+    )
+    # отредактированный старый пост меняется позже новых
+    latest_date = max((post.updated for post in posts), default=None)
+    return StreamingHttpResponse(
+        feed.stream((_item(request, post) for post in posts), latest_date),
+        content_type=feed.content_type,
+    )
+
+
+@replica_reads
+@cache_stream('posts')
+def index_feed(request, feed_format):
+    return feed_response(
+        request,
+        feed_format,
+        Post.objects.all(),
+        'Yatube: последние записи',
+        reverse('posts:index'),
+        'Последние обновления на сайте',
+    )
+
+
+@replica_reads
+@cache_stream('group:{slug}')
+def group_feed(request, feed_format, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return feed_response(
+        request,
+        feed_format,
+        group.posts.all(),
+        f'Yatube: записи сообщества {group.title}',
+        reverse('posts:group_list', args=[group.slug]),
+        group.description,
+    )
+
+
+@replica_reads
+@cache_stream('profile:{username}')
+def profile_feed(request, feed_format, username):
+    author = get_object_or_404(User, username=username)
+    return feed_response(
+        request,
+        feed_format,
+        author.posts.all(),
+        f'Yatube: записи автора {_author_name(author)}',
+        reverse('posts:profile', args=[author.username]),
+        f'Все посты пользователя {_author_name(author)}',
+    )
@@ -0,0 +1,17 @@
+from django import template
+
+from core.cache import get_versions
+from ..cache_tags import card_tags, get_card_version
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_card_version(post):
+    """
+    Версия карточки поста: меняется при изменении его автора и группы.
+    Использует версии, найденные заранее prime_card_versions.
+    """
+    if hasattr(post, 'card_version'):
+        return post.card_version
+    return get_card_version(post, get_versions(card_tags(post)))
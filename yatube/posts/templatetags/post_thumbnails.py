@@ -0,0 +1,16 @@
+from django import template
+
+from ..thumbnails import get_ready_thumbnail
+
+register = template.Library()
+
+
+@register.simple_tag
+def ready_thumbnail(post):
+    """
+    Готовая миниатюра картинки поста или None, пока она создается.
+    Использует миниатюры, найденные заранее prime_thumbnails.
+    """
+    if hasattr(post, 'ready_thumbnail'):
+        return post.ready_thumbnail
+    return get_ready_thumbnail(post)
@@ -1,12 +1,28 @@
+from contextlib import contextmanager
 from typing import Any, Tuple
 
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import DEFAULT_DB_ALIAS, connections
 from django.test import TestCase
 from django.urls import reverse
 
 from ..models import Post
 
 
+@contextmanager
+def run_on_commit(using=DEFAULT_DB_ALIAS):
+    """
+    Выполняет функции transaction.on_commit, добавленные внутри блока
+    (как captureOnCommitCallbacks(execute=True) в Django 3.2): транзакция
+    TestCase не фиксируется, и сами они не выполнятся.
+    """
+    callbacks = connections[using].run_on_commit
+    start = len(callbacks)
+    yield
+    for sids, callback in callbacks[start:]:
+        callback()
+
+
 class TestCaseExtended(TestCase):
     """
     Дополняет класс шаблонами view-фикстур для тестов.
@@ -14,6 +30,7 @@ class TestCaseExtended(TestCase):
     """
     # переменные для views-фикстур
     index_view: Tuple[Any]
+    group_index_view: Tuple[Any]
     group_list_view: Tuple[Any]
     profile_view: Tuple[Any]
     post_detail_view: Tuple[Any]
@@ -34,6 +51,11 @@ class TestCaseExtended(TestCase):
             'posts/follow.html',
             '/auth/login/?next=/follow/',
         )
+        self.group_index_view = (
+            reverse('posts:group_index'),
+            'posts/groups.html',
+            None,
+        )
         self.group_list_view = (
             reverse('posts:group_list', args=[group.slug]),
             'posts/group_list.html',
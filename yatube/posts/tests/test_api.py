@@ -0,0 +1,142 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..api import API_PAGE_LIMIT, DEFAULT_API_FIELDS
+from ..models import Follow, Group, Post
+
+User = get_user_model()
+
+
+class ApiTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', first_name='Лев', last_name='Толстой',
+        )
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Классика', slug='classic', description='Описание',
+        )
+        Post.objects.bulk_create(
+            Post(text=f'Пост {number}', author=cls.author, group=cls.group)
+            for number in range(API_PAGE_LIMIT + 5)
+        )
+        cls.post = Post.objects.create(text='Без группы', author=cls.reader)
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_index_cursor_pages(self):
+        """Лента отдает все посты постранично по курсору."""
+        url = reverse('posts:api_index')
+
+        first = self.client.get(url).json()
+        second = self.client.get(url, {'cursor': first['next']}).json()
+
+        self.assertEqual(len(first['results']), API_PAGE_LIMIT)
+        self.assertIsNone(second['next'])
+        self.assertEqual(
+            [post['id'] for post in first['results'] + second['results']],
+            list(Post.objects.order_by('-pub_date', '-id').values_list(
+                'id', flat=True,
+            )),
+        )
+        self.assertEqual(tuple(first['results'][0]), DEFAULT_API_FIELDS)
+
+    def test_sparse_fields(self):
+        """Ответ и запрос к БД содержат только запрошенные поля."""
+        url = reverse('posts:api_group_list', args=[self.group.slug])
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'fields': 'id,text'})
+
+        post = response.json()['results'][0]
+        self.assertEqual(set(post), {'id', 'text'})
+        self.assertFalse([
+            query for query in queries
+            if 'auth_user' in query['sql']
+            or ('posts_group' in query['sql'] and 'posts_post' in query['sql'])
+        ])
+
+        response = self.client.get(url, {'fields': 'author,group'})
+        post = response.json()['results'][0]
+        self.assertEqual(post['author']['name'], 'Лев Толстой')
+        self.assertEqual(post['group']['slug'], self.group.slug)
+
+    def test_unknown_field(self):
+        response = self.client.get(
+            reverse('posts:api_index'), {'fields': 'id,password'},
+        )
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertIn('password', response.json()['error'])
+
+        response = self.client.get(reverse('posts:api_index'), {'fields': ','})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertIn('Не указано ни одного поля', response.json()['error'])
+
+    def test_post_detail_reads_only_requested_fields(self):
+        """Для тегов кэша читаются только username и slug."""
+        post = Post.objects.filter(group=self.group).first()
+        url = reverse('posts:api_post_detail', args=[post.id])
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'fields': 'id'})
+
+        self.assertEqual(response.json(), {'id': post.id})
+        sql = ' '.join(query['sql'] for query in queries)
+        self.assertNotIn('"auth_user"."first_name"', sql)
+        self.assertNotIn('"posts_group"."title"', sql)
+
+        self.group.title = 'Новое название'
+        self.group.save()
+        with self.assertNumQueries(1):
+            self.client.get(url, {'fields': 'id'})
+
+    def test_follow_feed_requires_login(self):
+        url = reverse('posts:api_follow_index')
+        self.assertEqual(
+            self.client.get(url).status_code, HTTPStatus.UNAUTHORIZED,
+        )
+
+        client = Client()
+        client.force_login(self.reader)
+        posts = client.get(url, {'fields': 'author'}).json()['results']
+
+        self.assertEqual(len(posts), API_PAGE_LIMIT)
+        self.assertEqual(
+            {post['author']['username'] for post in posts},
+            {self.author.username},
+        )
+
+    def test_post_detail(self):
+        """Пост отдается с актуальными данными или 404."""
+        url = reverse('posts:api_post_detail', args=[self.post.id])
+        post = self.client.get(url).json()
+        self.assertEqual(post['text'], self.post.text)
+        self.assertIsNone(post['group'])
+
+        self.post.text = 'Новый текст'
+        self.post.save()
+        self.assertEqual(self.client.get(url).json()['text'], 'Новый текст')
+
+        response = self.client.get(
+            reverse('posts:api_post_detail', args=[self.post.id + 1000]),
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_missing_group_and_author(self):
+        for url in (
+            reverse('posts:api_group_list', args=['missing']),
+            reverse('posts:api_profile', args=['missing']),
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
@@ -0,0 +1,76 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from .. import benchmark
+from ..models import Comment, FeedItem, Post
+
+VOLUMES = {
+    'users': 5,
+    'groups': 2,
+    'posts': 30,
+    'follows': 2,
+    'comments': 10,
+}
+
+
+class BenchmarkTests(TestCase):
+
+    def setUp(self):
+        benchmark.seed(VOLUMES)
+        cache.clear()
+
+    def test_seed_fills_volumes_and_feeds(self):
+        self.assertEqual(Post.objects.count(), VOLUMES['posts'])
+        self.assertEqual(Comment.objects.count(), VOLUMES['comments'])
+        self.assertTrue(FeedItem.objects.exists())
+
+    def test_every_url_has_benchmark_request(self):
+        """Для каждого адреса posts/urls.py есть запрос бенчмарка."""
+        requests = benchmark.get_requests()
+
+        self.assertEqual(benchmark.get_missing_requests(requests), [])
+        self.assertEqual(
+            benchmark.get_missing_requests({}),
+            [f'posts:{name}' for name in requests],
+        )
+
+    def test_measure_counts_queries(self):
+        url, user = benchmark.get_requests()['index']
+
+        result = benchmark.measure(url, user, repeat=3)
+
+        self.assertEqual(result['queries'], 2)
+        self.assertLessEqual(result['p50_ms'], result['p95_ms'])
+        self.assertGreater(result['peak_kb'], 0)
+
+    def test_index_page_queries(self):
+        """Число запросов главной страницы не зависит от числа постов."""
+        with self.assertNumQueries(2):
+            self.client.get('/')
+
+    def test_compare_reports_regressions(self):
+        base = {'queries': 5, 'p50_ms': 10, 'p95_ms': 20, 'peak_kb': 100}
+        results = {
+            'same': dict(base, p50_ms=11),
+            'more_queries': dict(base, queries=6),
+            'slower': dict(base, p95_ms=40),
+            'new': dict(base),
+        }
+        baseline = {name: base for name in ('same', 'more_queries', 'slower')}
+
+        regressions = benchmark.compare(results, baseline, threshold=0.5)
+
+        self.assertEqual(regressions, [
+            'more_queries: запросов 6 вместо 5',
+            'slower: p95_ms 40 вместо 20',
+        ])
+
+    def test_compare_without_timings(self):
+        """Без времени в базовых значениях сравнивается число запросов."""
+        result = {'queries': 6, 'p50_ms': 99, 'p95_ms': 99, 'peak_kb': 999}
+
+        regressions = benchmark.compare(
+            {'page': result}, {'page': {'queries': 5}}, threshold=0.5,
+        )
+
+        self.assertEqual(regressions, ['page: запросов 6 вместо 5'])
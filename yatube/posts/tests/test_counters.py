@@ -0,0 +1,168 @@
+import time
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from ..catalog import get_group_catalog
+from ..models import Comment, Follow, Group, Post, UserStats
+
+User = get_user_model()
+
+
+class CountersTests(TestCase):
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.post = Post.objects.create(text='Пост', author=self.author)
+
+    def get_stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_counters_follow_creates_and_deletes(self):
+        """Счетчики меняются при создании и удалении объектов."""
+        Comment.objects.create(
+            text='Комментарий', post=self.post, author=self.reader,
+        )
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.post.refresh_from_db()
+
+        self.assertEqual(self.get_stats(self.author).posts_count, 1)
+        self.assertEqual(self.get_stats(self.author).followers_count, 1)
+        self.assertEqual(self.get_stats(self.reader).following_count, 1)
+        self.assertEqual(self.get_stats(self.reader).comments_count, 1)
+        self.assertEqual(self.post.comments_count, 1)
+
+        Follow.objects.all().delete()
+        self.post.delete()
+
+        author_stats = self.get_stats(self.author)
+        reader_stats = self.get_stats(self.reader)
+        self.assertEqual(author_stats.posts_count, 0)
+        self.assertEqual(author_stats.followers_count, 0)
+        self.assertEqual(reader_stats.following_count, 0)
+        self.assertEqual(reader_stats.comments_count, 0)
+
+    def test_drifted_counter_does_not_break_delete(self):
+        """Удаление не уводит разошедшийся нулевой счетчик ниже нуля."""
+        UserStats.objects.filter(user=self.author).update(posts_count=0)
+
+        self.post.delete()
+
+        self.assertFalse(Post.objects.filter(id=self.post.id).exists())
+        self.assertEqual(self.get_stats(self.author).posts_count, 0)
+
+    def test_reconcile_counters_fixes_drift(self):
+        """Команда reconcile_counters исправляет расхождения счетчиков."""
+        UserStats.objects.filter(user=self.author).update(posts_count=42)
+        UserStats.objects.filter(user=self.reader).delete()
+        Post.objects.filter(id=self.post.id).update(comments_count=7)
+
+        call_command('reconcile_counters', stdout=StringIO())
+        self.post.refresh_from_db()
+
+        self.assertEqual(self.get_stats(self.author).posts_count, 1)
+        self.assertEqual(self.get_stats(self.reader).posts_count, 0)
+        self.assertEqual(self.post.comments_count, 0)
+
+    def test_profile_page_does_not_count_posts(self):
+        """Страница профиля берет число постов из счетчика."""
+        UserStats.objects.filter(user=self.author).update(posts_count=42)
+
+        response = self.client.get(f'/profile/{self.author.username}/')
+
+        self.assertEqual(response.context.get('posts_count'), 42)
+
+
+class GroupCatalogTests(TestCase):
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.cats = Group.objects.create(title='Коты', slug='cats')
+        self.dogs = Group.objects.create(title='Собаки', slug='dogs')
+        self.first = Post.objects.create(
+            text='Первый', author=self.author, group=self.cats,
+        )
+        self.last = Post.objects.create(
+            text='Второй', author=self.author, group=self.cats,
+        )
+
+    def tearDown(self):
+        cache.clear()
+
+    def get_catalog(self):
+        return {group['slug']: group for group in get_group_catalog()}
+
+    def get_fresh_catalog(self):
+        # каталог отстает от счетчиков до истечения срока жизни в кэше
+        cache.clear()
+        return self.get_catalog()
+
+    def test_group_counters_follow_posts(self):
+        """Число постов и дата последнего поста группы следуют за постами."""
+        cats = self.get_catalog()['cats']
+        self.assertEqual(cats['posts_count'], 2)
+        self.assertEqual(cats['last_post_date'], self.last.pub_date)
+
+        self.last.group = self.dogs
+        self.last.save()
+        catalog = self.get_fresh_catalog()
+        self.assertEqual(catalog['cats']['posts_count'], 1)
+        self.assertEqual(
+            catalog['cats']['last_post_date'], self.first.pub_date,
+        )
+        self.assertEqual(catalog['dogs']['posts_count'], 1)
+
+        self.first.delete()
+        cats = self.get_fresh_catalog()['cats']
+        self.assertEqual(cats['posts_count'], 0)
+        self.assertIsNone(cats['last_post_date'])
+
+    def test_group_catalog_cached(self):
+        """Каталог читается из кэша, новые посты его не сбрасывают."""
+        get_group_catalog()
+        Post.objects.create(text='Третий', author=self.author, group=self.cats)
+        with self.assertNumQueries(0):
+            get_group_catalog()
+
+        self.cats.title = 'Кошки'
+        self.cats.save()
+
+        self.assertEqual(self.get_catalog()['cats']['title'], 'Кошки')
+
+    def test_group_index_etag_follows_counts(self):
+        """Новое число постов на странице сообществ меняет ETag."""
+        url = reverse('posts:group_index')
+        etag = self.client.get(url)['ETag']
+
+        Post.objects.create(text='Третий', author=self.author, group=self.dogs)
+        # страница и каталог устарели
+        later = time.time() + settings.COUNT_STALENESS + 1
+        with mock.patch('time.time', return_value=later):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_reconcile_fixes_group_counters(self):
+        """reconcile исправляет счетчики групп и сбрасывает каталог."""
+        get_group_catalog()
+        Group.objects.filter(id=self.cats.id).update(
+            posts_count=7, last_post_date=None,
+        )
+        Group.objects.filter(id=self.dogs.id).update(
+            last_post_date=self.last.pub_date,
+        )
+
+        call_command('reconcile_counters', stdout=StringIO())
+        catalog = self.get_catalog()
+
+        self.assertEqual(catalog['cats']['posts_count'], 2)
+        self.assertEqual(catalog['cats']['last_post_date'], self.last.pub_date)
+        self.assertIsNone(catalog['dogs']['last_post_date'])
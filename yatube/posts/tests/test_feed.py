@@ -0,0 +1,107 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from ..feed import get_follow_feed, rebuild
+from ..models import FeedItem, Follow, Post
+
+User = get_user_model()
+
+
+class FollowFeedTests(TestCase):
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.other = User.objects.create_user(username='other')
+        self.old_post = Post.objects.create(
+            text='Пост до подписки',
+            author=self.author,
+        )
+
+    def test_follow_fills_feed_with_author_posts(self):
+        """Подписка добавляет в ленту ранее опубликованные посты автора."""
+        Follow.objects.create(user=self.reader, author=self.author)
+
+        self.assertIn(self.old_post, get_follow_feed(self.reader))
+
+    def test_new_post_fanned_out_to_followers(self):
+        """Новый пост раскладывается в ленты подписчиков."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='Новый пост', author=self.author)
+
+        self.assertTrue(
+            FeedItem.objects.filter(user=self.reader, post=post).exists()
+        )
+        self.assertNotIn(post, get_follow_feed(self.other))
+
+    def test_unfollow_clears_feed(self):
+        """Отписка убирает посты автора из ленты."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.filter(user=self.reader, author=self.author).delete()
+
+        self.assertFalse(FeedItem.objects.filter(user=self.reader).exists())
+        self.assertNotIn(self.old_post, get_follow_feed(self.reader))
+
+    def test_edited_post_follows_new_author(self):
+        """Смена автора поста переносит его в ленты подписчиков автора."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.old_post.author = self.other
+        self.old_post.save()
+
+        self.assertNotIn(self.old_post, get_follow_feed(self.reader))
+
+    def test_text_edit_skips_fan_out(self):
+        """Правка текста поста не трогает ленты подписчиков."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.old_post.text = 'Исправленный текст'
+
+        with CaptureQueriesContext(connection) as queries:
+            self.old_post.save()
+
+        self.assertFalse([
+            query for query in queries if 'posts_feeditem' in query['sql']
+        ])
+        self.assertIn(self.old_post, get_follow_feed(self.reader))
+
+    @override_settings(FEED_FANOUT_FOLLOWERS_LIMIT=1)
+    def test_popular_author_read_on_demand(self):
+        """Посты популярного автора не раскладываются, но есть в ленте."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.other, author=self.author)
+        post = Post.objects.create(text='Новый пост', author=self.author)
+
+        self.assertFalse(FeedItem.objects.filter(post=post).exists())
+        for user in (self.reader, self.other):
+            with self.subTest(user=user):
+                feed = list(get_follow_feed(user))
+                self.assertIn(post, feed)
+                self.assertEqual(len(feed), len(set(feed)))
+
+    @override_settings(FEED_FANOUT_FOLLOWERS_LIMIT=1)
+    def test_author_below_limit_fanned_out_again(self):
+        """Автор, переставший быть популярным, снова раскладывает посты."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.other, author=self.author)
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        Follow.objects.filter(user=self.other).delete()
+
+        self.assertTrue(
+            FeedItem.objects.filter(user=self.reader, post=post).exists()
+        )
+
+    def test_rebuild_restores_feeds(self):
+        """Пересборка заполняет ленты так же, как сигналы."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.other, author=self.reader)
+        Post.objects.create(text='Новый пост', author=self.author)
+        expected = set(FeedItem.objects.values_list(
+            'user_id', 'post_id', 'pub_date',
+        ))
+        FeedItem.objects.all().delete()
+
+        self.assertEqual(rebuild(), 2)
+        self.assertEqual(set(FeedItem.objects.values_list(
+            'user_id', 'post_id', 'pub_date',
+        )), expected)
@@ -0,0 +1,80 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.lazy_loads import LazyLoadError
+from ..listings import get_listing
+from ..models import Follow, Group, Post
+
+User = get_user_model()
+
+
+class ListingTests(TestCase):
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание',
+        )
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.client.force_login(self.reader)
+        self.create_posts(2)
+
+    def create_posts(self, count):
+        for number in range(count):
+            Post.objects.create(
+                text=f'Пост {number}', author=self.author, group=self.group,
+            )
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_listing_queries_do_not_depend_on_posts(self):
+        """Число запросов ленты не растет с числом постов на странице."""
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.author.username]),
+            reverse('posts:follow_index'),
+            f"{reverse('posts:search')}?q=пост",
+        ]
+        before = [self.count_queries(url) for url in urls]
+
+        self.create_posts(8)
+
+        self.assertEqual([self.count_queries(url) for url in urls], before)
+
+    @override_settings(LAZY_LOAD_GUARD=True)
+    def test_guard_raises_on_lazy_loads(self):
+        post = get_listing().first()
+
+        with self.assertRaises(LazyLoadError):
+            post.comments_count
+        with self.assertRaises(LazyLoadError):
+            post.author.email
+        with self.assertRaises(LazyLoadError):
+            post.author.stats
+
+        self.assertEqual(post.author.username, 'author')
+        self.assertEqual(Post.objects.first().author.email, '')
+
+    def test_guard_enabled_by_test_runner(self):
+        post = get_listing().first()
+
+        with self.assertRaises(LazyLoadError):
+            post.group.description
+
+    @override_settings(LAZY_LOAD_GUARD=False)
+    def test_guard_can_be_disabled(self):
+        post = get_listing().first()
+
+        self.assertEqual(post.comments_count, 0)
+        self.assertEqual(post.author.stats.posts_count, 2)
@@ -1,7 +1,10 @@
+from unittest import skipUnless
+
 from django.contrib.auth import get_user_model
+from django.db import IntegrityError, connection, transaction
 from django.test import TestCase
 
-from ..models import Group, Post
+from ..models import Comment, Follow, Group, Post
 
 User = get_user_model()
 
@@ -62,3 +65,58 @@ class PostModelTest(TestCase):
                     self.post._meta.get_field(help_text).help_text,
                     expected_text,
                 )
+
+
+@skipUnless(connection.vendor == 'sqlite', 'План запроса в формате SQLite')
+class ListingIndexesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            group=cls.group,
+            text='Тестовый пост',
+        )
+
+    def assert_uses_index(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_listing_queries_use_composite_indexes(self):
+        """Выборки лент идут по составным индексам без сортировки."""
+        listings = (
+            (self.user.posts.all(), 'post_author_pub_date_idx'),
+            (self.group.posts.all(), 'post_group_pub_date_idx'),
+            (
+                Comment.objects.filter(post=self.post),
+                'comment_post_created_idx',
+            ),
+        )
+        for queryset, index_name in listings:
+            with self.subTest(index_name=index_name):
+                self.assert_uses_index(queryset, index_name)
+
+    def test_follow_lookup_uses_unique_index(self):
+        """Проверка подписки идет по уникальному индексу (user, author)."""
+        plan = Follow.objects.filter(
+            user=self.reader,
+            author=self.user,
+        ).explain()
+
+        self.assertIn('INDEX', plan)
+        self.assertNotIn('SCAN', plan)
+
+    def test_follow_is_unique(self):
+        """Повторная подписка на автора запрещена на уровне БД."""
+        Follow.objects.create(user=self.reader, author=self.user)
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Follow.objects.create(user=self.reader, author=self.user)
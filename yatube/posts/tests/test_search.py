@@ -0,0 +1,125 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from core.stemmer import get_terms, stem
+from ..models import Post, SearchTerm
+from ..search import FTSIndex, TermIndex, get_index, search_posts
+
+User = get_user_model()
+
+
+class StemmerTests(TestCase):
+
+    def test_stem_reduces_word_forms(self):
+        """Формы слова приводятся к одной основе."""
+        for words, expected in (
+            (('книга', 'книги', 'книгами'), 'книг'),
+            (('красивая', 'красивые', 'красивейшие'), 'красив'),
+            (('читала', 'читают', 'читавшись'), 'чита'),
+        ):
+            for word in words:
+                with self.subTest(word=word):
+                    self.assertEqual(stem(word), expected)
+
+    def test_get_terms_keeps_non_russian_words(self):
+        self.assertEqual(
+            get_terms('Ёлки, Python 3!'), ['елк', 'python', '3'],
+        )
+
+
+class SearchTests(TestCase):
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.books = Post.objects.create(
+            text='Читаю новые книги про книги', author=self.author,
+        )
+        self.book = Post.objects.create(
+            text='Интересная книга о море', author=self.author,
+        )
+        self.sea = Post.objects.create(
+            text='Фотографии моря', author=self.author,
+        )
+
+    def test_sqlite_uses_fts_index(self):
+        self.assertIsInstance(get_index(), FTSIndex)
+
+    def test_search_matches_word_forms_and_ranks(self):
+        """Поиск находит формы слова, частые вхождения выше."""
+        self.assertEqual(
+            search_posts('книгу'), [self.books.id, self.book.id],
+        )
+        self.assertEqual(search_posts('книга море'), [self.book.id])
+        self.assertEqual(search_posts('космос'), [])
+        self.assertEqual(search_posts('?!'), [])
+
+    def test_filter_by_subquery(self):
+        """Оба индекса отбирают посты со всеми основами подзапросом."""
+        index = TermIndex()
+        index.add(Post.objects.values_list('id', 'text'))
+        posts = Post.objects.order_by('id')
+        for search in (get_index().filter, index.filter):
+            with self.subTest(index=search.__self__):
+                self.assertEqual(
+                    list(search(posts, ['книг'])), [self.books, self.book],
+                )
+                self.assertEqual(
+                    list(search(posts, ['книг', 'мор'])), [self.book],
+                )
+
+    def test_index_follows_edit_and_delete(self):
+        """Индекс обновляется при изменении и удалении поста."""
+        self.sea.text = 'Фотографии космоса'
+        self.sea.save()
+        self.book.delete()
+
+        self.assertEqual(search_posts('море'), [])
+        self.assertEqual(search_posts('космос'), [self.sea.id])
+
+    def test_term_index_fallback(self):
+        """Обратный индекс в таблице дает тот же результат, что FTS5."""
+        index = TermIndex()
+        index.add(Post.objects.values_list('id', 'text'))
+
+        self.assertEqual(
+            index.search(['книг'], 10), [self.books.id, self.book.id],
+        )
+        self.assertEqual(index.search(['книг', 'мор'], 10), [self.book.id])
+        index.remove([self.book.id])
+        self.assertEqual(index.search(['мор'], 10), [self.sea.id])
+        self.assertFalse(
+            SearchTerm.objects.filter(post=self.book).exists()
+        )
+
+    def test_rebuild_search_index(self):
+        get_index().clear()
+
+        call_command('rebuild_search_index', stdout=StringIO())
+
+        self.assertEqual(search_posts('моря'), [self.sea.id, self.book.id])
+
+    def test_search_page(self):
+        response = self.client.get(reverse('posts:search'), {'q': 'книги'})
+
+        self.assertTemplateUsed(response, 'posts/search.html')
+        self.assertEqual(
+            list(response.context['page_obj']), [self.books, self.book],
+        )
+
+    def test_admin_search_uses_index(self):
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass',
+        )
+        self.client.force_login(admin)
+
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'фотографию'},
+        )
+
+        self.assertEqual(
+            list(response.context['cl'].result_list), [self.sea],
+        )
@@ -0,0 +1,50 @@
+from django.test import TestCase, TransactionTestCase
+
+from .. import loadtest, seeding
+from ..models import Comment, FeedItem, Follow, Post, UserStats
+
+
+class SeedingTests(TestCase):
+
+    def setUp(self):
+        self.created = seeding.seed(
+            50, posts_per_user=10, comments_per_post=2, follows_per_user=5,
+        )
+
+    def test_seed_volumes(self):
+        self.assertEqual(self.created['user'], 50)
+        self.assertEqual(self.created['group'], 1)
+        self.assertEqual(Post.objects.count(), 500)
+        self.assertEqual(Comment.objects.count(), 1000)
+        self.assertTrue(Follow.objects.exists())
+        self.assertTrue(FeedItem.objects.exists())
+
+    def test_activity_is_skewed(self):
+        """Самый активный автор пишет больше, чем авторы в среднем."""
+        posts_counts = list(UserStats.objects.order_by(
+            '-posts_count',
+        ).values_list('posts_count', flat=True))
+
+        self.assertGreater(posts_counts[0], 5 * 500 / 50)
+        self.assertEqual(posts_counts[-1], 0)
+
+    def test_comments_after_posts(self):
+        comment = Comment.objects.select_related('post').first()
+
+        self.assertGreaterEqual(comment.created, comment.post.pub_date)
+
+
+class LoadTestTests(TransactionTestCase):
+
+    def test_run_reports_scenarios(self):
+        seeding.seed(10, posts_per_user=2, comments_per_post=1)
+
+        # в общей памяти тестовой БД SQLite одновременные записи
+        # не ждут блокировку, поэтому пользователь один
+        result = loadtest.run(concurrency=1, duration=0.5)
+
+        self.assertEqual(result['errors'], 0)
+        self.assertGreater(result['requests_per_s'], 0)
+        self.assertLessEqual(
+            set(result['scenarios']), set(loadtest.TRAFFIC_MIX),
+        )
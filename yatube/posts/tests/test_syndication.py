@@ -0,0 +1,119 @@
+from http import HTTPStatus
+from xml.etree import ElementTree
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils.feedgenerator import rfc3339_date
+
+from ..models import Group, Post
+from ..syndication import FEED_ITEMS_LIMIT
+
+User = get_user_model()
+ATOM = '{http://www.w3.org/2005/Atom}'
+
+
+class SyndicationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Классика', slug='classic', description='Описание',
+        )
+        Post.objects.bulk_create(
+            Post(text=f'Пост {number}', author=cls.author, group=cls.group)
+            for number in range(FEED_ITEMS_LIMIT + 5)
+        )
+        cls.other = Post.objects.create(text='Вне группы', author=cls.author)
+
+    def tearDown(self):
+        cache.clear()
+
+    def get_feed(self, url, **headers):
+        response = self.client.get(url, **headers)
+        if response.streaming:
+            content = b''.join(response.streaming_content)
+        else:
+            content = response.content
+        return response, content
+
+    def test_atom_feed_lists_latest_posts(self):
+        response, content = self.get_feed(
+            reverse('posts:index_feed', args=['atom']),
+        )
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(
+            response['Content-Type'], 'application/atom+xml; charset=utf-8',
+        )
+        entries = ElementTree.fromstring(content).findall(f'{ATOM}entry')
+        self.assertEqual(len(entries), FEED_ITEMS_LIMIT)
+        self.assertEqual(
+            entries[0].find(f'{ATOM}summary').text, self.other.text,
+        )
+
+    def test_feed_updated_by_latest_edit(self):
+        """Дата обновления ленты - последнее изменение любого ее поста."""
+        edited = Post.objects.filter(group=self.group).latest('id')
+        edited.text = 'Исправленный пост'
+        edited.save()
+
+        response, content = self.get_feed(
+            reverse('posts:index_feed', args=['atom']),
+        )
+
+        self.assertEqual(
+            ElementTree.fromstring(content).find(f'{ATOM}updated').text,
+            rfc3339_date(edited.updated),
+        )
+
+    def test_posts_read_inside_view(self):
+        """Посты читаются до отдачи ответа, отдача не обращается к БД."""
+        response = self.client.get(reverse('posts:index_feed', args=['rss']))
+
+        with self.assertNumQueries(0):
+            b''.join(response.streaming_content)
+
+    def test_rss_group_feed(self):
+        """Лента сообщества содержит только посты сообщества."""
+        _, content = self.get_feed(
+            reverse('posts:group_feed', args=[self.group.slug, 'rss']),
+        )
+
+        items = ElementTree.fromstring(content).findall('channel/item')
+        self.assertEqual(len(items), FEED_ITEMS_LIMIT)
+        self.assertNotIn(
+            self.other.text, [item.find('description').text for item in items],
+        )
+
+    def test_missing_feeds(self):
+        for url in (
+            reverse('posts:index_feed', args=['json']),
+            reverse('posts:group_feed', args=['missing', 'rss']),
+            reverse('posts:profile_feed', args=['missing', 'atom']),
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_feed_cached_and_conditional(self):
+        """Лента берется из кэша, совпавший ETag получает 304 без БД."""
+        url = reverse('posts:profile_feed', args=[self.author.username, 'rss'])
+        response, content = self.get_feed(url)
+
+        with self.assertNumQueries(0):
+            cached, cached_content = self.get_feed(url)
+            not_modified, _ = self.get_feed(
+                url, HTTP_IF_NONE_MATCH=response['ETag'],
+            )
+        self.assertEqual(cached_content, content)
+        self.assertEqual(not_modified.status_code, HTTPStatus.NOT_MODIFIED)
+
+        Post.objects.create(text='Новый пост', author=self.author)
+        response, content = self.get_feed(
+            url, HTTP_IF_NONE_MATCH=response['ETag'],
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertIn('Новый пост', content.decode())
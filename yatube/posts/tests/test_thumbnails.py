@@ -0,0 +1,91 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from .. import thumbnails
+from ..models import Post
+from .shortcuts import TestCaseExtended
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_ASYNC=False)
+class ThumbnailsTests(TestCaseExtended):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='noname')
+        self.post = Post.objects.create(
+            text='Пост с картинкой',
+            author=self.user,
+            image=self.get_image(),
+        )
+
+    def tearDown(self):
+        cache.clear()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_page_shows_placeholder_until_thumbnail_ready(self):
+        """Страница не создает миниатюру сама и показывает заглушку."""
+        with mock.patch.object(
+            thumbnails.backend, 'get_thumbnail',
+        ) as get_thumbnail:
+            response = self.client.get(f'/posts/{self.post.id}/')
+
+        get_thumbnail.assert_not_called()
+        self.assertContains(response, 'Изображение обрабатывается')
+
+    def test_generated_thumbnail_shown_on_pages(self):
+        """Созданная в фоне миниатюра появляется на страницах."""
+        self.client.get('/')
+        with CaptureQueriesContext(connection) as queries:
+            thumbnails.generate_thumbnail(self.post.id, self.post.image.name)
+
+        # пост ищется по первичному ключу, а не по неиндексированной картинке
+        post_queries = [
+            query['sql'] for query in queries
+            if 'FROM "posts_post"' in query['sql']
+        ]
+        self.assertEqual(len(post_queries), 1)
+        self.assertIn('"posts_post"."id" =', post_queries[0])
+
+        thumbnail = thumbnails.get_ready_thumbnail(self.post)
+        self.assertIsNotNone(thumbnail)
+        for url in ('/', f'/posts/{self.post.id}/'):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertContains(response, thumbnail.url)
+
+    def test_feed_page_looks_up_thumbnails_in_one_query(self):
+        """Миниатюры всей страницы ленты ищутся одним запросом."""
+        for number in range(3):
+            Post.objects.create(
+                text=f'Еще пост {number}',
+                author=self.user,
+                image=self.get_image(),
+            )
+        for post in Post.objects.all():
+            thumbnails.generate_thumbnail(post.id, post.image.name)
+        cache.clear()
+
+        with mock.patch.object(
+            thumbnails.KVStoreModel.objects, 'filter',
+            wraps=thumbnails.KVStoreModel.objects.filter,
+        ) as kvstore_filter:
+            response = self.client.get('/')
+
+        kvstore_filter.assert_called_once()
+        for post in response.context.get('page_obj'):
+            with self.subTest(post=post):
+                self.assertIsNotNone(post.ready_thumbnail)
@@ -0,0 +1,170 @@
+import io
+import os
+import tempfile
+from datetime import datetime, timezone
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from .. import transfer
+from ..models import Comment, FeedItem, Follow, Group, Post
+
+User = get_user_model()
+
+PUB_DATE = datetime(2020, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+
+
+class TransferTests(TestCase):
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание',
+        )
+        self.post = Post.objects.create(
+            text='Пост, с "кавычками"\nи переносом',
+            author=self.author,
+            group=self.group,
+        )
+        Post.objects.filter(id=self.post.id).update(pub_date=PUB_DATE)
+        Post.objects.create(text='Пост без группы', author=self.author)
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Комментарий',
+        )
+        Follow.objects.create(user=self.reader, author=self.author)
+
+    def export_all(self, file_format):
+        files = {}
+        for name in transfer.MODELS:
+            files[name] = io.StringIO()
+            transfer.export_data(name, files[name], file_format)
+            files[name].seek(0)
+        return files
+
+    def import_all(self, files, file_format):
+        for name, stream in files.items():
+            transfer.import_data(name, stream, file_format, batch_size=1)
+        transfer.finish_import()
+
+    def assert_round_trip(self, file_format):
+        posts = list(Post.objects.order_by('id').values_list(
+            'id', 'author__username', 'group__slug', 'text', 'pub_date',
+        ))
+        files = self.export_all(file_format)
+        User.objects.all().delete()
+        Group.objects.all().delete()
+
+        self.import_all(files, file_format)
+
+        self.assertEqual(list(Post.objects.order_by('id').values_list(
+            'id', 'author__username', 'group__slug', 'text', 'pub_date',
+        )), posts)
+        self.assertEqual(Comment.objects.get().author.username, 'reader')
+        self.assertTrue(Follow.objects.filter(
+            user__username='reader', author__username='author',
+        ).exists())
+        post = Post.objects.get(id=self.post.id)
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(post.author.stats.posts_count, 2)
+        self.assertEqual(FeedItem.objects.count(), 2)
+        self.assertFalse(post.author.has_usable_password())
+
+    def test_jsonl_round_trip(self):
+        self.assert_round_trip('jsonl')
+
+    def test_csv_round_trip(self):
+        self.assert_round_trip('csv')
+
+    def test_repeated_import_skips_existing(self):
+        files = self.export_all('jsonl')
+
+        self.import_all(files, 'jsonl')
+
+        self.assertEqual(Post.objects.count(), 2)
+        self.assertEqual(Comment.objects.count(), 1)
+        self.assertEqual(Follow.objects.count(), 1)
+
+    def test_new_posts_get_ids_after_imported(self):
+        files = self.export_all('jsonl')
+        Post.objects.all().delete()
+        self.import_all({'posts': files['posts']}, 'jsonl')
+
+        post = Post.objects.create(text='Новый', author=self.author)
+
+        self.assertGreater(post.id, self.post.id)
+
+    def test_dates_kept_without_changing_fields(self):
+        """Даты берутся из файла и для записей без id."""
+        stream = io.StringIO(
+            '{"author": "author", "group": null, "text": "Без id", '
+            f'"pub_date": "{PUB_DATE.isoformat()}", '
+            f'"updated": "{PUB_DATE.isoformat()}"}}\n'
+        )
+
+        transfer.import_data('posts', stream, 'jsonl')
+
+        post = Post.objects.get(text='Без id')
+        self.assertEqual((post.pub_date, post.updated), (PUB_DATE, PUB_DATE))
+        self.assertTrue(Post._meta.get_field('updated').auto_now)
+
+    def test_insert_dated_writes_rows_once(self):
+        """Одна вставка на пачку, даты объектов не заменяются."""
+        posts = [
+            Post(id=1000, text='С id', author=self.author,
+                 pub_date=PUB_DATE, updated=PUB_DATE),
+            Post(id=self.post.id, text='Уже есть', author=self.author,
+                 pub_date=PUB_DATE, updated=PUB_DATE),
+            Post(text='Без id', author=self.author,
+                 pub_date=PUB_DATE, updated=PUB_DATE),
+        ]
+
+        with self.assertNumQueries(2):
+            transfer.insert_dated(Post, posts)
+
+        self.assertEqual(
+            set(Post.objects.filter(
+                text__in=['С id', 'Уже есть', 'Без id'],
+            ).values_list('text', 'pub_date', 'updated')),
+            {('С id', PUB_DATE, PUB_DATE), ('Без id', PUB_DATE, PUB_DATE)},
+        )
+
+    def test_unknown_group_is_reported(self):
+        stream = io.StringIO(
+            '{"author": "author", "group": "missing", "text": "Пост", '
+            '"pub_date": null}\n'
+        )
+
+        with self.assertRaisesMessage(
+            transfer.TransferError, 'Нет групп: missing',
+        ):
+            transfer.import_data('posts', stream, 'jsonl')
+
+    def test_commands(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'posts.csv')
+            call_command(
+                'export_data', 'posts', format='csv', output=path,
+                stdout=io.StringIO(),
+            )
+            Post.objects.all().delete()
+
+            call_command(
+                'import_data', 'posts', path, format='csv',
+                stdout=io.StringIO(),
+            )
+
+        self.assertEqual(Post.objects.count(), 2)
+        self.assertEqual(
+            User.objects.get(id=self.author.id).stats.posts_count, 2,
+        )
+
+    def test_export_command_writes_to_stdout(self):
+        output = io.StringIO()
+
+        call_command('export_data', 'follows', stdout=output)
+
+        self.assertEqual(
+            output.getvalue(), '{"user": "reader", "author": "author"}\n',
+        )
@@ -45,6 +45,7 @@ class PostsURLTests(TestCaseExtended):
             self.index_view,
             self.profile_view,
             self.post_detail_view,
+            self.group_index_view,
             self.group_list_view,
         )
         self.private_urls = (
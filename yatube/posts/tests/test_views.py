@@ -1,15 +1,21 @@
 import shutil
 import tempfile
+from http import HTTPStatus
+from unittest import mock
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
+from django.db import connection, transaction
 from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
+from core.cache import get_versions
+from ..cache_tags import prime_card_versions
 from ..forms import CommentForm, PostForm
 from ..models import Comment, Follow, Group, Post
-from .shortcuts import TestCaseExtended
+from .shortcuts import TestCaseExtended, run_on_commit
 
 User = get_user_model()
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
@@ -109,6 +115,52 @@ class PostsViewsTests(TestCaseExtended):
                 page = response.context.get('page_obj')
                 self.assertEqual(len(page), 10)
 
+    def test_cursor_pagination_walks_all_posts(self):
+        """Курсорная пагинация обходит все посты без повторов и пропусков."""
+        seen = []
+        cursor = ''
+        while cursor is not None:
+            response = self.auth_client1.get(
+                self.index_view[0], {'cursor': cursor}
+            )
+            page = response.context.get('page_obj')
+            self.assertLessEqual(len(page), 10)
+            seen.extend(page)
+            cursor = page.next_cursor
+
+        expected = list(Post.objects.order_by('-pub_date', '-id'))
+        self.assertEqual(seen, expected)
+
+    def test_cursor_pagination_previous_page(self):
+        """Курсор предыдущей страницы возвращает ту же первую страницу."""
+        first = self.auth_client1.get(self.index_view[0], {'cursor': ''})
+        first_page = first.context.get('page_obj')
+        second = self.auth_client1.get(
+            self.index_view[0], {'cursor': first_page.next_cursor}
+        )
+        second_page = second.context.get('page_obj')
+        back = self.auth_client1.get(
+            self.index_view[0], {'cursor': second_page.previous_cursor}
+        )
+        back_page = back.context.get('page_obj')
+
+        self.assertFalse(first_page.has_previous())
+        self.assertTrue(second_page.has_previous())
+        self.assertEqual(list(back_page), list(first_page))
+        self.assertFalse(back_page.has_previous())
+
+    def test_cursor_pagination_invalid_cursor(self):
+        """Некорректный курсор ведет на первую страницу."""
+        response = self.auth_client1.get(
+            self.index_view[0], {'cursor': 'не-курсор'}
+        )
+        page = response.context.get('page_obj')
+
+        self.assertEqual(
+            list(page),
+            list(Post.objects.order_by('-pub_date', '-id')[:10]),
+        )
+
     def test_group_list_page_context(self):
         """
         Страница постов сообщества содержит посты только выбраной группы.
@@ -176,6 +228,39 @@ class PostsViewsTests(TestCaseExtended):
         self.assertIsInstance(form, PostForm)
         self.assertFalse(form.initial)
 
+    def test_group_index_context(self):
+        """Страница сообществ показывает группы по убыванию числа постов."""
+        response = self.client.get(self.group_index_view[0])
+        groups = list(response.context.get('page_obj'))
+
+        self.assertEqual(
+            [group['slug'] for group in groups],
+            [self.group1.slug, self.group2.slug],
+        )
+        self.assertEqual(
+            groups[0]['posts_count'],
+            Post.objects.filter(group=self.group1).count(),
+        )
+        self.assertEqual(
+            groups[0]['last_post_date'],
+            Post.objects.filter(group=self.group1).latest('pub_date').pub_date,
+        )
+
+    def test_post_form_pages_do_not_query_groups(self):
+        """Формы поста берут список групп из кэшированного каталога."""
+        self.auth_client1.get(self.post_create_view[0])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.auth_client1.get(self.post_create_view[0])
+
+        self.assertFalse([
+            query for query in queries
+            if 'posts_group' in query['sql']
+        ])
+        self.assertEqual(
+            [group['id'] for group in response.context.get('groups')],
+            [self.group1.id, self.group2.id],
+        )
+
     def test_post_appears_in_index_group_list_profile_followings(self):
         """
         Пост с группой фигурирует на страницах группы, польз., подписок.
@@ -235,13 +320,209 @@ class PostsViewsTests(TestCaseExtended):
         )
 
     def test_index_page_cached(self):
+        """Главная страница отдается из кэша, пока посты не менялись."""
         response = self.auth_client1.get(self.index_view[0])
         cached_content = response.content
 
-        self.post.delete()
         cached_response = self.auth_client1.get(self.index_view[0])
+        self.assertIsNone(cached_response.context)
         self.assertEqual(cached_response.content, cached_content)
 
-        cache.clear()
+        self.post.delete()
         db_response = self.auth_client1.get(self.index_view[0])
+        self.assertIsNotNone(db_response.context)
         self.assertNotEqual(db_response.content, cached_content)
+
+    def test_cached_pages_invalidated_on_post_edit(self):
+        """Редактирование поста сбрасывает кэш страниц, где он показан."""
+        views = (
+            self.index_view,
+            self.group_list_view,
+            self.profile_view,
+            self.post_detail_view,
+        )
+        for url, html, redirect in views:
+            self.client.get(url)
+
+        self.post.text = 'Отредактированный пост'
+        self.post.save()
+
+        for url, html, redirect in views:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertContains(response, 'Отредактированный пост')
+
+    def test_post_card_fragment_refreshed_on_author_and_group_change(self):
+        """Карточки постов обновляются при изменении автора и группы."""
+        self.client.get(self.index_view[0])
+        updated = self.post.updated
+        self.user1.first_name = 'Лев'
+        self.user1.last_name = 'Толстой'
+        self.user1.save()
+        self.group1.title = 'Переименованная группа'
+        self.group1.save()
+
+        response = self.client.get(self.index_view[0])
+
+        self.assertContains(response, 'Лев Толстой')
+        self.assertContains(response, 'Переименованная группа')
+        # дата изменения поста при этом не меняется
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.updated, updated)
+
+    def test_post_card_version_ignores_new_posts_and_follows(self):
+        """Новые посты и подписки не меняют версию карточек постов."""
+        posts = [self.post]
+        prime_card_versions(posts)
+        version = self.post.card_version
+
+        Post.objects.create(
+            text='Новый пост', author=self.user1, group=self.group1,
+        )
+        reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=reader, author=self.user1)
+        prime_card_versions(posts)
+
+        self.assertEqual(self.post.card_version, version)
+
+    def test_post_card_versions_fetched_once_per_page(self):
+        """Версии карточек страницы читаются из кэша одним запросом."""
+        Post.objects.create(
+            text='Второй пост', author=self.user2, group=self.group2,
+        )
+        with mock.patch.object(
+            cache, 'get_many', wraps=cache.get_many,
+        ) as get_many:
+            self.client.get(self.index_view[0])
+
+        card_calls = [
+            call for call in get_many.call_args_list
+            if any('user:' in key for key in call[0][0])
+        ]
+        self.assertEqual(len(card_calls), 1)
+
+    def test_cache_invalidated_again_after_commit(self):
+        """Кэш страниц поста сбрасывается еще раз после фиксации."""
+        tags = ['posts', f'post:{self.post.id}']
+        before = get_versions(tags)
+
+        with run_on_commit():
+            with transaction.atomic():
+                self.post.text = 'Отредактированный пост'
+                self.post.save()
+                in_transaction = get_versions(tags)
+
+        self.assertNotEqual(in_transaction, before)
+        self.assertNotEqual(get_versions(tags), in_transaction)
+
+    def test_post_detail_cache_invalidated_on_comment(self):
+        """Новый комментарий сбрасывает кэш страницы поста."""
+        self.client.get(self.post_detail_view[0])
+        Comment.objects.create(
+            text='Свежий комментарий',
+            post=self.post,
+            author=self.user2,
+        )
+
+        response = self.client.get(self.post_detail_view[0])
+        self.assertContains(response, 'Свежий комментарий')
+
+    def test_repeat_visit_gets_not_modified(self):
+        """Повторный запрос с ETag получает 304, пока данные не менялись."""
+        views = (
+            self.index_view,
+            self.group_list_view,
+            self.profile_view,
+            self.post_detail_view,
+        )
+        etags = {}
+        for url, html, redirect in views:
+            with self.subTest(url=url):
+                etags[url] = self.client.get(url)['ETag']
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etags[url])
+                self.assertEqual(
+                    response.status_code, HTTPStatus.NOT_MODIFIED,
+                )
+                self.assertEqual(response.content, b'')
+
+        self.post.text = 'Отредактированный пост'
+        self.post.save()
+
+        for url, html, redirect in views:
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etags[url])
+                self.assertContains(response, 'Отредактированный пост')
+                self.assertNotEqual(response['ETag'], etags[url])
+
+    def test_etag_depends_on_user(self):
+        """У гостя и пользователя разные ETag, ответ пользователя private."""
+        url = self.index_view[0]
+        anonymous = self.client.get(url)
+        authorized = self.auth_client1.get(url)
+
+        self.assertNotEqual(anonymous['ETag'], authorized['ETag'])
+        self.assertEqual(
+            self.auth_client1.get(
+                url, HTTP_IF_NONE_MATCH=anonymous['ETag'],
+            ).status_code,
+            HTTPStatus.OK,
+        )
+        self.assertIn('private', authorized['Cache-Control'])
+        self.assertIn('no-cache', anonymous['Cache-Control'])
+        self.assertIn('Cookie', anonymous['Vary'])
+
+    def test_post_comments_cursor_pages(self):
+        """JSON комментариев отдает все комментарии постранично."""
+        Comment.objects.bulk_create(
+            Comment(text=f'Комментарий {number}', post=self.post,
+                    author=self.user1)
+            for number in range(14)
+        )
+        url = reverse('posts:post_comments', args=[self.post.id])
+
+        first = self.client.get(url).json()
+        second = self.client.get(url, {'cursor': first['next']}).json()
+
+        self.assertEqual(len(first['comments']), 10)
+        self.assertIsNone(second['next'])
+        ids = [
+            comment['id']
+            for comment in first['comments'] + second['comments']
+        ]
+        self.assertEqual(
+            ids,
+            list(self.post.comment.order_by('-created', '-id').values_list(
+                'id', flat=True,
+            )),
+        )
+        self.assertEqual(
+            second['comments'][-1]['author']['username'],
+            self.user2.username,
+        )
+
+    def test_post_comments_missing_post(self):
+        response = self.client.get(
+            reverse('posts:post_comments', args=[self.post.id + 1000]),
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_post_detail_comments_constant_queries(self):
+        """
+        Страница поста показывает авторов комментариев, число запросов
+        не зависит от числа комментариев.
+        """
+        cache.clear()
+        with self.assertNumQueries(3):
+            response = self.client.get(self.post_detail_view[0])
+        self.assertContains(response, self.user2.username)
+        self.assertNotContains(response, 'Показать еще')
+
+        Comment.objects.bulk_create(
+            Comment(text=f'Комментарий {number}', post=self.post,
+                    author=self.user1)
+            for number in range(20)
+        )
+        cache.clear()
+        with self.assertNumQueries(3):
+            response = self.client.get(self.post_detail_view[0])
+        self.assertContains(response, 'Показать еще')
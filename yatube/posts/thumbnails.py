@@ -0,0 +1,201 @@
+"""
+Фоновая генерация миниатюр картинок постов.
+
+Миниатюра создается в пуле потоков сразу после сохранения поста
+с картинкой. Страницы не генерируют миниатюры сами: если миниатюра
+еще не готова, вместо нее показывается заглушка, а генерация
+ставится в очередь.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import (
+    EMPTY_VALUE,
+    KVStore as CachedDBKVStore,
+)
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from core import metrics
+from .cache_tags import invalidate_post_pages
+from .models import Post
+
+THUMBNAIL_GEOMETRY = '900x339'
+THUMBNAIL_OPTIONS = {'crop': 'center', 'upscale': True}
+THUMBNAILS_STATS_VIEW = 'thumbnails'
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = set()
+_pending_lock = threading.Lock()
+
+
+class PostThumbnailBackend(ThumbnailBackend):
+    """Умеет находить готовую миниатюру, не создавая ее."""
+
+    def get_thumbnail_file(self, file_, geometry_string, **options):
+        """
+        Файл миниатюры с теми же именем и опциями, что у get_thumbnail.
+        Наличие миниатюры не проверяется.
+        """
+        source = ImageFile(file_)
+        if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(sorl_settings, attr)
+            if value != getattr(sorl_defaults, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return ImageFile(name, default.storage)
+
+
+backend = PostThumbnailBackend()
+
+
+def get_thumbnail_file(image):
+    return backend.get_thumbnail_file(
+        image, THUMBNAIL_GEOMETRY, **THUMBNAIL_OPTIONS,
+    )
+
+
+def get_ready_thumbnail(post):
+    """
+    Готовая миниатюра картинки поста или None.
+    Отсутствующая миниатюра ставится в очередь на генерацию.
+    """
+    if not post.image:
+        return None
+    thumbnail = default.kvstore.get(get_thumbnail_file(post.image))
+    if thumbnail is None:
+        schedule_thumbnail(post)
+    return thumbnail
+
+
+def _get_many_raw(keys):
+    """
+    Значения хранилища миниатюр sorl за один запрос к кэшу
+    и не более одного запроса к БД.
+    """
+    kvstore = default.kvstore
+    if not isinstance(kvstore, CachedDBKVStore):
+        return {key: kvstore._get_raw(key) for key in keys}
+    values = kvstore.cache.get_many(keys)
+    missed = [key for key in keys if key not in values]
+    if missed:
+        stored = dict(
+            KVStoreModel.objects.filter(key__in=missed).values_list(
+                'key', 'value',
+            )
+        )
+        fetched = {key: stored.get(key, EMPTY_VALUE) for key in missed}
+        kvstore.cache.set_many(
+            fetched, sorl_settings.THUMBNAIL_CACHE_TIMEOUT,
+        )
+        values.update(fetched)
+    return {
+        key: None if value == EMPTY_VALUE else value
+        for key, value in values.items()
+    }
+
+
+def prime_thumbnails(posts):
+    """
+    Находит готовые миниатюры для всех постов страницы разом
+    и сохраняет их в post.ready_thumbnail для шаблонов.
+    """
+    posts = [post for post in posts if post.image]
+    keys = {
+        post.id: add_prefix(get_thumbnail_file(post.image).key)
+        for post in posts
+    }
+    values = _get_many_raw(list(set(keys.values())))
+    for post in posts:
+        value = values.get(keys[post.id])
+        if value:
+            post.ready_thumbnail = deserialize_image_file(value)
+        else:
+            post.ready_thumbnail = None
+            schedule_thumbnail(post)
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnails',
+            )
+    return _executor
+
+
+def generate_thumbnail(post_id, name):
+    """Создает миниатюру картинки name и сбрасывает кэш страниц поста."""
+    try:
+        if not default_storage.exists(name):
+            return
+        with metrics.timer('thumbnail_ms'):
+            backend.get_thumbnail(
+                name, THUMBNAIL_GEOMETRY, **THUMBNAIL_OPTIONS,
+            )
+        # поле image не индексировано: пост ищется по первичному ключу
+        post = Post.objects.filter(pk=post_id).values(
+            'author_id', 'group_id',
+        ).first()
+        if post:
+            invalidate_post_pages(
+                post_id, [post['author_id']], [post['group_id']],
+            )
+    except Exception:
+        logger.exception('Не удалось создать миниатюру %s', name)
+    finally:
+        with _pending_lock:
+            _pending.discard(name)
+
+
+def _generate_in_worker(post_id, name):
+    close_old_connections()
+    try:
+        # генерация вне запроса учитывается в статистике как свой view
+        with metrics.collect() as task_metrics:
+            start = time.perf_counter()
+            generate_thumbnail(post_id, name)
+        task_metrics['total_ms'] = (time.perf_counter() - start) * 1000
+        task_metrics['requests'] = 1
+        metrics.record(THUMBNAILS_STATS_VIEW, task_metrics)
+    finally:
+        close_old_connections()
+
+
+def _submit(post_id, name):
+    with _pending_lock:
+        if name in _pending:
+            return
+        _pending.add(name)
+    if settings.THUMBNAIL_ASYNC:
+        _get_executor().submit(_generate_in_worker, post_id, name)
+    else:
+        generate_thumbnail(post_id, name)
+
+
+def schedule_thumbnail(post):
+    """
+    Ставит генерацию миниатюры картинки поста в очередь после фиксации
+    транзакции.
+    """
+    post_id, name = post.id, post.image.name
+    transaction.on_commit(lambda: _submit(post_id, name))
@@ -0,0 +1,285 @@
+"""
+Выгрузка и загрузка данных posts в JSON Lines и CSV.
+
+Выгрузка читает БД итератором (iterator(chunk_size)), загрузка пишет
+пачками через bulk_create: память не зависит от объема данных.
+Пользователи указываются по username, группы по slug; отсутствующие
+пользователи создаются без пароля. Записи, которые уже есть в БД
+(тот же id, slug или подписка), пропускаются. Сигналы при загрузке
+не вызываются, поэтому после нее счетчики, ленты и поисковый индекс
+пересобираются целиком (finish_import).
+"""
+import csv
+import json
+from datetime import datetime
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core.cache import invalidate
+from . import feed, search
+from .counters import reconcile
+from .models import Comment, Follow, Group, Post, User
+
+TRANSFER_BATCH_SIZE = 500
+FORMATS = ('jsonl', 'csv')
+# колонка файла -> поле для values_list при выгрузке
+EXPORT_FIELDS = {
+    'groups': {
+        'slug': 'slug',
+        'title': 'title',
+        'description': 'description',
+    },
+    'posts': {
+        'id': 'id',
+        'author': 'author__username',
+        'group': 'group__slug',
+        'text': 'text',
+        'pub_date': 'pub_date',
+        'updated': 'updated',
+        'image': 'image',
+    },
+    'comments': {
+        'id': 'id',
+        'post': 'post_id',
+        'author': 'author__username',
+        'text': 'text',
+        'created': 'created',
+    },
+    'follows': {
+        'user': 'user__username',
+        'author': 'author__username',
+    },
+}
+MODELS = {
+    'groups': Group,
+    'posts': Post,
+    'comments': Comment,
+    'follows': Follow,
+}
+
+
+class TransferError(Exception):
+    pass
+
+
+def _dump(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def export_data(name, stream, file_format, chunk_size=TRANSFER_BATCH_SIZE):
+    """Записывает все объекты в stream. Возвращает их число."""
+    fields = EXPORT_FIELDS[name]
+    rows = MODELS[name].objects.order_by('id').values_list(*fields.values())
+    if file_format == 'csv':
+        writer = csv.DictWriter(stream, fieldnames=list(fields))
+        writer.writeheader()
+        write = writer.writerow
+    else:
+        def write(row):
+            stream.write(json.dumps(row, ensure_ascii=False) + '\n')
+    count = 0
+    for values in rows.iterator(chunk_size=chunk_size):
+        write({
+            column: _dump(value) for column, value in zip(fields, values)
+        })
+        count += 1
+    return count
+
+
+def _read_rows(stream, file_format):
+    if file_format == 'csv':
+        return csv.DictReader(stream)
+    return (json.loads(line) for line in stream if line.strip())
+
+
+def _load_id(value):
+    return int(value) if value else None
+
+
+def _load_date(value):
+    if not value:
+        return timezone.now()
+    date = parse_datetime(value)
+    if date is None:
+        raise TransferError(f'Неверная дата: {value}')
+    if timezone.is_naive(date):
+        date = timezone.make_aware(date)
+    return date
+
+
+def _user_ids(usernames):
+    """id пользователей по username; отсутствующие создаются."""
+    usernames = set(usernames)
+    User.objects.bulk_create(
+        [
+            User(username=username, password=make_password(None))
+            for username in usernames
+        ],
+        ignore_conflicts=True,
+    )
+    return dict(
+        User.objects.filter(username__in=usernames).values_list(
+            'username', 'id',
+        )
+    )
+
+
+def _group_ids(slugs):
+    slugs = set(filter(None, slugs))
+    ids = dict(
+        Group.objects.filter(slug__in=slugs).values_list('slug', 'id')
+    )
+    missing = slugs - ids.keys()
+    if missing:
+        raise TransferError(f'Нет групп: {", ".join(sorted(missing))}')
+    return ids
+
+
+def _check_posts(post_ids):
+    found = set(
+        Post.objects.filter(id__in=post_ids).values_list('id', flat=True)
+    )
+    missing = set(post_ids) - found
+    if missing:
+        raise TransferError(
+            f'Нет постов: {", ".join(map(str, sorted(missing)))}'
+        )
+
+
+def _build_groups(rows):
+    groups = [
+        Group(
+            slug=row['slug'],
+            title=row['title'],
+            description=row['description'],
+        )
+        for row in rows
+    ]
+    return groups, ['groups', *(f'group:{group.slug}' for group in groups)]
+
+
+def _build_posts(rows):
+    users = _user_ids(row['author'] for row in rows)
+    groups = _group_ids(row['group'] for row in rows)
+    posts = []
+    tags = {'posts'}
+    for row in rows:
+        pub_date = _load_date(row['pub_date'])
+        updated = row.get('updated')
+        posts.append(Post(
+            id=_load_id(row.get('id')),
+            author_id=users[row['author']],
+            group_id=groups.get(row['group']),
+            text=row['text'],
+            pub_date=pub_date,
+            updated=_load_date(updated) if updated else pub_date,
+            image=row.get('image') or '',
+        ))
+        tags.add(f"profile:{row['author']}")
+        if row['group']:
+            tags.add(f"group:{row['group']}")
+    return posts, tags
+
+
+def _build_comments(rows):
+    users = _user_ids(row['author'] for row in rows)
+    post_ids = {int(row['post']) for row in rows}
+    _check_posts(post_ids)
+    comments = [
+        Comment(
+            id=_load_id(row.get('id')),
+            post_id=int(row['post']),
+            author_id=users[row['author']],
+            text=row['text'],
+            created=_load_date(row['created']),
+        )
+        for row in rows
+    ]
+    return comments, [f'post:{post_id}' for post_id in post_ids]
+
+
+def _build_follows(rows):
+    users = _user_ids(
+        username for row in rows for username in (row['user'], row['author'])
+    )
+    follows = [
+        Follow(user_id=users[row['user']], author_id=users[row['author']])
+        for row in rows
+        if row['user'] != row['author']
+    ]
+    return follows, [f"profile:{row['author']}" for row in rows]
+
+
+BUILDERS = {
+    'groups': _build_groups,
+    'posts': _build_posts,
+    'comments': _build_comments,
+    'follows': _build_follows,
+}
+
+
+def insert_dated(model, objects):
+    """
+    Вставляет объекты пачками, пропуская уже существующие. Значения
+    полей пишутся как есть, как в loaddata (raw): auto_now
+    и auto_now_add не заменяют даты из файла текущим временем.
+    """
+    fields = model._meta.concrete_fields
+    for has_pk in (True, False):
+        group = [obj for obj in objects if (obj.pk is not None) == has_pk]
+        insert_fields = [
+            field for field in fields if has_pk or not field.primary_key
+        ]
+        # пачки по ограничению СУБД на число параметров запроса
+        size = connection.ops.bulk_batch_size(insert_fields, group) or 1
+        for start in range(0, len(group), size):
+            model._base_manager._insert(
+                group[start:start + size],
+                fields=insert_fields,
+                raw=True,
+                ignore_conflicts=True,
+            )
+
+
+def _reset_sequences(model):
+    # после вставки явных id следующий автоматический id должен быть
+    # больше загруженных (нужно, например, для PostgreSQL)
+    statements = connection.ops.sequence_reset_sql(no_style(), [model])
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def import_data(name, stream, file_format, batch_size=TRANSFER_BATCH_SIZE):
+    """
+    Загружает объекты из stream пачками по batch_size.
+    Возвращает число прочитанных записей.
+    """
+    model = MODELS[name]
+    build = BUILDERS[name]
+    rows = _read_rows(stream, file_format)
+    count = 0
+    batch = list(islice(rows, batch_size))
+    while batch:
+        with transaction.atomic():
+            objects, tags = build(batch)
+            insert_dated(model, objects)
+        invalidate(*tags)
+        count += len(batch)
+        batch = list(islice(rows, batch_size))
+    _reset_sequences(model)
+    return count
+
+
+def finish_import():
+    """Пересобирает данные, которые при загрузке обновляют сигналы."""
+    reconcile()
+    feed.rebuild()
+    search.rebuild_index()
@@ -1,6 +1,6 @@
 from django.urls import path
 
-from . import views
+from . import api, syndication, views
 
 app_name = 'posts'
 
@@ -8,6 +8,8 @@ urlpatterns = [
     path('', views.index, name='index'),
     path('create/', views.post_create, name='post_create'),
     path('follow/', views.follow_index, name='follow_index'),
+    path('search/', views.search, name='search'),
+    path('group/', views.group_index, name='group_index'),
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
     path('profile/<str:username>/', views.profile, name='profile'),
     path(
@@ -21,10 +23,35 @@ urlpatterns = [
         name='profile_unfollow'
     ),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
+    path(
+        'posts/<int:post_id>/comments/',
+        views.post_comments,
+        name='post_comments',
+    ),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
     path(
         'posts/<int:post_id>/comment/',
         views.add_comment,
         name='add_comment',
-    )
+    ),
+    path(
+        'feed/<str:feed_format>/',
+        syndication.index_feed,
+        name='index_feed',
+    ),
+    path(
+        'group/<slug:slug>/feed/<str:feed_format>/',
+        syndication.group_feed,
+        name='group_feed',
+    ),
+    path(
+        'profile/<str:username>/feed/<str:feed_format>/',
+        syndication.profile_feed,
+        name='profile_feed',
+    ),
+    path('api/posts/', api.index, name='api_index'),
+    path('api/follow/', api.follow_index, name='api_follow_index'),
+    path('api/group/<slug:slug>/', api.group_posts, name='api_group_list'),
+    path('api/profile/<str:username>/', api.profile, name='api_profile'),
+    path('api/posts/<int:post_id>/', api.post_detail, name='api_post_detail'),
 ]
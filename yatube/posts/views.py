@@ -1,20 +1,44 @@
+from urllib.parse import urlencode
+
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
-
-from core.utils import get_page_obj
+from django.urls import reverse
+
+from core.cache import add_cache_tags, cache_view
+from core.replicas import replica_reads
+from core.utils import (
+    CURSOR_PARAM,
+    CursorPaginator,
+    WindowedPaginator,
+    get_page_obj,
+)
+from .cache_tags import prime_card_versions
+from .catalog import get_group_catalog
+from .counters import get_user_stats
+from .feed import estimate_follow_feed, get_follow_feed
 from .forms import CommentForm, PostForm
+from .listings import get_listing
 from .models import Comment, Follow, Group, Post, User
+from .search import get_posts, search_posts
+from .thumbnails import prime_thumbnails
 
 POSTS_PER_PAGE_LIMIT = 10
+GROUPS_PER_PAGE_LIMIT = 50
 POST_PREVIEW_LEN_WORDS = 10
 VISIBLE_COMMENTS_LIMIT = 10
+COMMENTS_ORDERING = ('-created', '-id')
 
 
+@replica_reads
+@cache_view('posts')
 def index(request):
     """Главная страница"""
-    posts_list = Post.objects.select_related('group', 'author')
+    posts_list = get_listing()
     page_obj = get_page_obj(posts_list, POSTS_PER_PAGE_LIMIT, request)
+    prime_thumbnails(page_obj)
+    prime_card_versions(page_obj)
 
     context = {
         'page_obj': page_obj,
@@ -23,11 +47,17 @@ def index(request):
     return render(request, 'posts/index.html', context)
 
 
+@replica_reads
+@cache_view('group:{slug}')
 def group_posts(request, slug):
     """Страница сообщества"""
     group = get_object_or_404(Group, slug=slug)
-    posts_list = group.posts.all()
-    page_obj = get_page_obj(posts_list, POSTS_PER_PAGE_LIMIT, request)
+    posts_list = get_listing(group.posts.all())
+    page_obj = get_page_obj(
+        posts_list, POSTS_PER_PAGE_LIMIT, request, group.posts_count,
+    )
+    prime_thumbnails(page_obj)
+    prime_card_versions(page_obj)
 
     context = {
         'group': group,
@@ -37,11 +67,34 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@replica_reads
+# число постов в каталоге меняется без смены версии тега 'groups'
+@cache_view('groups', timeout=settings.COUNT_STALENESS)
+def group_index(request):
+    """Список сообществ, самые наполненные первыми"""
+    groups = sorted(
+        get_group_catalog(),
+        key=lambda group: group['posts_count'],
+        reverse=True,
+    )
+    paginator = WindowedPaginator(groups, GROUPS_PER_PAGE_LIMIT)
+    context = {
+        'page_obj': paginator.get_page(request.GET.get('page')),
+    }
+    return render(request, 'posts/groups.html', context)
+
+
+@replica_reads
+@cache_view('profile:{username}')
 def profile(request, username):
-    author = User.objects.get(username=username)
-    posts_list = author.posts.select_related('group')
-    posts_count = posts_list.count
-    page_obj = get_page_obj(posts_list, POSTS_PER_PAGE_LIMIT, request)
+    author = User.objects.select_related('stats').get(username=username)
+    posts_list = get_listing(author.posts.all())
+    stats = get_user_stats(author)
+    page_obj = get_page_obj(
+        posts_list, POSTS_PER_PAGE_LIMIT, request, stats.posts_count,
+    )
+    prime_thumbnails(page_obj)
+    prime_card_versions(page_obj)
     following = None
     if request.user.is_authenticated and request.user != author:
         following = Follow.objects.filter(user=request.user, author=author)
@@ -49,21 +102,27 @@ def profile(request, username):
     context = {
         'author': author,
         'page_obj': page_obj,
-        'posts_count': posts_count,
+        'posts_count': stats.posts_count,
+        'stats': stats,
         'post_trunc': POST_PREVIEW_LEN_WORDS,
         'following': following
     }
     return render(request, 'posts/profile.html', context)
 
 
+@replica_reads
+@cache_view('post:{post_id}')
 def post_detail(request, post_id):
     post = get_object_or_404(
-        Post.objects.select_related('group', 'author'),
+        Post.objects.select_related('group', 'author', 'author__stats'),
         id=post_id
     )
-    posts_count = post.author.posts.count
+    posts_count = get_user_stats(post.author).posts_count
+    add_cache_tags(request, f'profile:{post.author.username}')
+    if post.group:
+        add_cache_tags(request, f'group:{post.group.slug}')
     add_comment_form = CommentForm()
-    comments = Comment.objects.filter(post=post)[:VISIBLE_COMMENTS_LIMIT]
+    comments = get_comments_page(post.id, request.GET.get('comments'))
 
     context = {
         'post': post,
@@ -74,6 +133,63 @@ def post_detail(request, post_id):
     return render(request, 'posts/post_detail.html', context)
 
 
+def get_comments_page(post_id, cursor):
+    """Страница комментариев поста от новых к старым."""
+    comments = Comment.objects.filter(post_id=post_id).select_related(
+        'author',
+    )
+    paginator = CursorPaginator(
+        comments, VISIBLE_COMMENTS_LIMIT, ordering=COMMENTS_ORDERING,
+    )
+    return paginator.get_page(cursor)
+
+
+@replica_reads
+@cache_view('post:{post_id}')
+def post_comments(request, post_id):
+    """Комментарии поста в JSON, постранично по курсору"""
+    get_object_or_404(Post.objects.only('id'), id=post_id)
+    page = get_comments_page(post_id, request.GET.get(CURSOR_PARAM))
+    comments = [
+        {
+            'id': comment.id,
+            'author': {
+                'username': comment.author.username,
+                'name': (
+                    comment.author.get_full_name() or comment.author.username
+                ),
+                'url': reverse(
+                    'posts:profile', args=[comment.author.username],
+                ),
+            },
+            'text': comment.text,
+            'created': comment.created.isoformat(),
+        }
+        for comment in page
+    ]
+    return JsonResponse({'comments': comments, 'next': page.next_cursor})
+
+
+@replica_reads
+@cache_view('posts')
+def search(request):
+    """Поиск по текстам постов"""
+    query = request.GET.get('q', '').strip()
+    paginator = WindowedPaginator(search_posts(query), POSTS_PER_PAGE_LIMIT)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    page_obj.object_list = get_posts(page_obj.object_list)
+    prime_thumbnails(page_obj)
+    prime_card_versions(page_obj)
+
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+        'page_query': urlencode({'q': query}) + '&',
+        'post_trunc': POST_PREVIEW_LEN_WORDS,
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
 def post_create(request):
     form = PostForm(request.POST or None, files=request.FILES or None)
@@ -83,10 +199,9 @@ def post_create(request):
         form.save()
         return redirect('posts:profile', username=form.author)
 
-    groups = Group.objects.all()
     context = {
         'form': form,
-        'groups': groups,
+        'groups': get_group_catalog(),
     }
 
     return render(request, 'posts/create_post.html', context)
@@ -110,10 +225,9 @@ def post_edit(request, post_id):
         form.save()
         return redirect('posts:post_detail', post_id=post.id)
 
-    groups = Group.objects.all()
     context = {
         'form': form,
-        'groups': groups,
+        'groups': get_group_catalog(),
         'is_edit': True
     }
 
@@ -132,11 +246,19 @@ def add_comment(request, post_id):
     return redirect('posts:post_detail', post_id=post_id)
 
 
+@replica_reads
 @login_required
 def follow_index(request):
     """Страница с подписками"""
-    posts_list = Post.objects.filter(author__following__user=request.user)
-    page_obj = get_page_obj(posts_list, POSTS_PER_PAGE_LIMIT, request)
+    posts_list = get_listing(get_follow_feed(request.user))
+    page_obj = get_page_obj(
+        posts_list,
+        POSTS_PER_PAGE_LIMIT,
+        request,
+        lambda: estimate_follow_feed(request.user),
+    )
+    prime_thumbnails(page_obj)
+    prime_card_versions(page_obj)
 
     context = {
         'page_obj': page_obj,
@@ -148,12 +270,8 @@ def follow_index(request):
 @login_required
 def profile_follow(request, username):
     author = User.objects.get(username=username)
-    followed = Follow.objects.filter(
-        user=request.user,
-        author=author,
-    ).exists()
-    if request.user != author and not followed:
-        Follow.objects.create(user=request.user, author=author)
+    if request.user != author:
+        Follow.objects.get_or_create(user=request.user, author=author)
     return redirect('posts:profile', username=author)
 
 
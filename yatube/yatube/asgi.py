@@ -0,0 +1,16 @@
+"""
+ASGI config for yatube project.
+
+It exposes the ASGI callable as a module-level variable named ``application``:
+Django 2.2 views run in a bounded thread pool (core.asgi.AsgiHandler).
+"""
+
+import os
+
+from django.core.wsgi import get_wsgi_application
+
+from core.asgi import AsgiHandler
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+application = AsgiHandler(get_wsgi_application())
@@ -49,6 +49,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -56,6 +57,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.replicas.ReplicaMiddleware',
 ]
 
 ROOT_URLCONF = 'yatube.urls'
@@ -90,6 +92,45 @@ DATABASES = {
     }
 }
 
+# Реплики только для чтения (core.replicas): YATUBE_DB_REPLICAS - пути
+# к копиям БД через запятую, например поддерживаемым litestream.
+# Запись всегда идет в default, в тестах реплики - зеркала default
+DATABASE_REPLICAS = []
+for number, replica_name in enumerate(
+    filter(None, os.getenv('YATUBE_DB_REPLICAS', '').split(',')), 1,
+):
+    DATABASES[f'replica{number}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': replica_name,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica{number}')
+
+DATABASE_ROUTERS = [
+    'core.lazy_loads.LazyLoadRouter',
+    'core.replicas.ReplicaRouter',
+]
+
+# Профиль БД для продакшена (YATUBE_DB_PROFILE=production): журнал WAL,
+# чтобы писатель не блокировал читателей, и постоянные соединения.
+# Прагмы выполняются для каждого нового соединения (core.sqlite)
+PRODUCTION_SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'mmap_size': 256 * 1024 * 1024,
+    'busy_timeout': 5000,
+}
+SQLITE_PRAGMAS = {}
+if os.getenv('YATUBE_DB_PROFILE') == 'production':
+    SQLITE_PRAGMAS = PRODUCTION_SQLITE_PRAGMAS
+    for database in DATABASES.values():
+        database['CONN_MAX_AGE'] = 600
+
+# Сколько секунд реплики могут отставать от основной БД: столько
+# записавший пользователь читает из основной БД, и столько хранятся
+# ответы, отрисованные по данным реплики
+DATABASE_REPLICA_LAG = 5
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -143,8 +184,106 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'
+# Общий для всех процессов кэш выбирается переменной окружения
+# YATUBE_CACHE: locmem (только для разработки), file, memcached, redis.
+# При YATUBE_CACHE_TWO_TIER=1 перед общим кэшем ставится LRU-кэш в
+# памяти процесса с межпроцессной инвалидацией (core.cache_backends)
+CACHE_BACKEND = os.getenv('YATUBE_CACHE', 'locmem')
+CACHE_LOCATION = os.getenv('YATUBE_CACHE_LOCATION')
+
+SHARED_CACHES = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': CACHE_LOCATION or os.path.join(BASE_DIR, 'cache'),
+    },
+    'memcached': {
+        'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+        'LOCATION': CACHE_LOCATION or '127.0.0.1:11211',
+    },
+    # требует пакет django-redis
+    'redis': {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': CACHE_LOCATION or 'redis://127.0.0.1:6379/1',
+    },
+}
+
+if os.getenv('YATUBE_CACHE_TWO_TIER') == '1':
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.cache_backends.TwoTierCache',
+            'OPTIONS': {
+                'SHARED_ALIAS': 'shared',
+                'LOCAL_MAX_ENTRIES': 1000,
+                'LOCAL_TIMEOUT': 5,
+                'SYNC_INTERVAL': 1,
+            },
+        },
+        'shared': SHARED_CACHES[CACHE_BACKEND],
+    }
+else:
+    CACHES = {
+        'default': SHARED_CACHES[CACHE_BACKEND],
     }
+
+# Авторы с большим числом подписчиков не раскладывают посты по лентам
+# подписок при публикации - их посты подмешиваются в ленту при чтении
+FEED_FANOUT_FOLLOWERS_LIMIT = 1000
+
+# Срок жизни закэшированных ответов view. Раньше ответ становится
+# устаревшим при изменении данных (см. core.cache)
+VIEW_CACHE_TIMEOUT = 60 * 15
+
+# Число объектов лент (core.counting): до COUNT_EXACT_LIMIT считается
+# точно, больше - оценивается. Результат помнится COUNT_STALENESS
+# секунд: номера страниц и число постов в каталоге групп могут отставать
+# от новых постов на это время
+COUNT_EXACT_LIMIT = 1000
+COUNT_STALENESS = 60
+
+# Миниатюры картинок постов создаются в фоновом пуле потоков
+# (posts.thumbnails); при THUMBNAIL_ASYNC = False - сразу после записи.
+# В режиме отладки (и в тестах) генерация синхронная и предсказуемая
+THUMBNAIL_ASYNC = not DEBUG
+THUMBNAIL_WORKERS = 2
+
+# Потоков для view при запуске через ASGI (yatube/asgi.py): больше
+# одновременных запросов к БД процесс не делает, остальные ждут в очереди
+ASGI_THREADS = int(os.getenv('YATUBE_ASGI_THREADS', 8))
+
+# Базовые значения бенчмарка страниц (команда benchmark_views)
+BENCHMARK_BASELINE_FILE = os.path.join(BASE_DIR, 'benchmark_baseline.json')
+
+# Ленивая догрузка связанных объектов и отложенных полей у постов лент
+# выбрасывает исключение (core.lazy_loads): при разработке (DEBUG) и в тестах
+# (core.test_runner включает ее и при DEBUG = False)
+LAZY_LOAD_GUARD = DEBUG
+TEST_RUNNER = 'core.test_runner.GuardedTestRunner'
+
+# Метрики запросов (core.metrics): заголовок Server-Timing (всем при
+# SERVER_TIMING, иначе только персоналу), строка JSON в логе core.metrics
+# на каждый запрос (уровень INFO, медленнее SLOW_REQUEST_MS - WARNING)
+# и суммы по view, которые раз в VIEW_STATS_FLUSH_INTERVAL секунд
+# записываются в БД после отправки ответа (None - не писать)
+SERVER_TIMING = DEBUG
+SLOW_REQUEST_MS = 1000
+VIEW_STATS_FLUSH_INTERVAL = 60
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'core.metrics': {
+            'handlers': ['console'],
+            'level': os.getenv('YATUBE_METRICS_LOG_LEVEL', 'WARNING'),
+            'propagate': False,
+        },
+    },
 }